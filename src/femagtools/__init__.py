@@ -16,13 +16,11 @@ from .femag import Femag, ZmqFemag
 from .conductor import Conductor
 
 
-def read_bchfile(filename):
-    """Read BCH/BATCH results from file *filename*."""
-    import io
-    bchresults = Reader()
-    with io.open(filename, encoding='latin1', errors='ignore') as f:
-        bchresults.read(f.readlines())
-    return bchresults
+def read_bchfile(filename, cache=False):
+    """Read BCH/BATCH results from file *filename*.
+    (reuse results of *filename*.cache if cache is True)"""
+    from .bch import read
+    return read(filename, cache)
 
 
 def create_fsl(machine,
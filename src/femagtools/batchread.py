@@ -0,0 +1,129 @@
+"""Read the result files of many FEMAG calculations in parallel
+
+"""
+import os
+import glob
+import pathlib
+import logging
+import multiprocessing
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+# file patterns of the result files in a calculation directory
+_patterns = {
+    'bch': ('*_[0-9][0-9][0-9].B*CH',),
+    'isa7': ('*.ISA7', '*.I7'),
+    'nc': ('*.nc',),
+    'vtu': ()}
+
+
+def _resultfile(path, kind):
+    """return the result file of kind in path (directory or file)"""
+    if not os.path.isdir(path) or not _patterns[kind]:
+        return str(path)
+    for p in _patterns[kind]:
+        filelist = sorted(glob.glob(os.path.join(path, p)))
+        if filelist:
+            return filelist[-1]  # most recent
+    raise FileNotFoundError("no {} file in {}".format(kind, path))
+
+
+def _read(path, kind, func, kwargs):
+    """read the result file of kind in path and apply func (if any)"""
+    filename = _resultfile(path, kind)
+    if kind == 'bch':
+        import femagtools.bch
+        r = femagtools.bch.read(filename, **kwargs)
+    elif kind == 'isa7':
+        import femagtools.isa7
+        r = femagtools.isa7.read(filename, **kwargs)
+    elif kind == 'nc':
+        import femagtools.nc
+        r = femagtools.nc.read(filename, **kwargs)
+    else:
+        import femagtools.vtu
+        r = femagtools.vtu.read(filename, **kwargs)
+    if func:
+        return func(r)
+    return r
+
+
+def read(paths, kind='bch', func=None, processes=None, maxpending=None,
+         progress=None, **kwargs):
+    """read the results of each path (file or calculation directory)
+    in a process pool and return an iterator of (path, result) tuples
+    in completion order.
+
+    Args:
+      paths: list of result files or directories (such as the task
+        directories of a job)
+      kind: (str) type of result files: 'bch', 'isa7', 'nc' or 'vtu'
+      func: (callable) optional function applied to each result in the
+        worker process. Must be picklable (module level function).
+        Required for vtu: the VTK objects cannot be transferred.
+      processes: (int) number of worker processes (default: number of cpus)
+        The files are read in the current process if processes is 1.
+      maxpending: (int) max number of submitted unfinished reads
+        to limit memory (default: 2*processes)
+      progress: (callable) called as progress(numdone, numtotal, path)
+        after each completed read
+      kwargs: additional arguments of the read function
+        (such as cache, columnar)
+
+    Example:
+      for path, bch in batchread.read([t.directory for t in job.tasks]):
+          print(path, bch.machine['torque'])
+    """
+    if kind not in _patterns:
+        raise ValueError("unknown kind '{}' (valid: {})".format(
+            kind, ', '.join(_patterns)))
+    if kind == 'vtu' and func is None:
+        raise ValueError("vtu results require a function to extract data")
+    paths = [str(p) if isinstance(p, pathlib.PurePath) else p
+             for p in paths]
+    return _iread(paths, kind, func, processes, maxpending,
+                  progress, kwargs)
+
+
+def _iread(paths, kind, func, processes, maxpending, progress, kwargs):
+    """generator of read (arguments are checked)"""
+    numtot = len(paths)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, min(processes, numtot))
+    if processes == 1:
+        for i, p in enumerate(paths):
+            r = _read(p, kind, func, kwargs)
+            if progress:
+                progress(i+1, numtot, p)
+            yield p, r
+        return
+
+    if maxpending is None:
+        maxpending = 2*processes
+    pathiter = iter(paths)
+    numdone = 0
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        pending = {}
+        try:
+            while True:
+                for p in pathiter:
+                    pending[pool.submit(_read, p, kind, func, kwargs)] = p
+                    if len(pending) >= maxpending:
+                        break
+                if not pending:
+                    break
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for f in done:
+                    p = pending.pop(f)
+                    r = f.result()
+                    numdone += 1
+                    logger.debug("%d/%d: %s", numdone, numtot, p)
+                    if progress:
+                        progress(numdone, numtot, p)
+                    yield p, r
+        finally:
+            for f in pending:
+                f.cancel()
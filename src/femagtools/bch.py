@@ -2,7 +2,10 @@
 """read BCH/BATCH files
 
 """
+import os
 import sys
+import json
+import hashlib
 import numpy as np
 import re
 import logging
@@ -35,6 +38,20 @@ def floatnan(s):
         return float('NaN')
 
 
+def floatnan_table(rows, ncols, sep='\t'):
+    """converts text rows of ncols separated fields to float array
+    of shape (len(rows), ncols)
+    returns NaN for fields with conversion errors (such as '****')"""
+    if not rows:
+        return np.zeros((0, ncols))
+    fields = sep.join(rows).split(sep) if sep else ' '.join(rows).split()
+    try:
+        a = np.array(fields, dtype=float)
+    except ValueError:
+        a = np.array([floatnan(x) for x in fields])
+    return a.reshape((-1, ncols))
+
+
 def r1_20(r1, theta):
     return r1/(1+alpha20*(theta-20))
 
@@ -149,6 +166,34 @@ class Reader:
     """Reads a BCH/BATCH-File"""
     _numPattern = re.compile(r'([+-]?\d+(?:\.\d+)?(?:[eE][+-]\d+)?)\s*')
     _numPatternNaN = re.compile(r'([+-]?\d+(?:\.\d+)?(?:[eE][+-]\d+)?|nan)\s*')
+    # sections that are parsed on demand (lazy read):
+    # group: (attributes, section titles, groups the sections depend on)
+    _lazy_groups = {
+        'machine': (('machine', 'armatureLength', 'leak_dist_wind', 'dqPar'),
+                    ('General Machine Data', 'Machine Data',
+                     'Simulation Data', 'Machine excitation',
+                     'DQ-Parameter for open Winding Modell'), ()),
+        'flux': (('flux', 'flux_fft', 'wdg'), ('Flux observed',), ()),
+        'torque': (('torque', 'torque_fft'), ('Torque-Force',), ()),
+        'linearForce': (('linearForce', 'linearForce_fft'),
+                        ('Linear Force',), ()),
+        'ident': (('psidq', 'psidq_ldq', 'ldq', 'airgapInduction'),
+                  ('PSID-Psiq-Identification',
+                   'Ld-Lq-Identifikation aus PSID-Psiq-Identification',
+                   'Ld-Lq-Identification', 'Ld-Lq-Identification RMS-values',
+                   'Losses for speed [1/min]',
+                   'Losses from PSID-Psiq-Identification for speed [1/min]',
+                   'Airgap Induction Br'), ('machine', 'losses')),
+        'losses': (('losses',),
+                   ('Losses [W]',
+                    'Fe-Hysteresis- and Eddy current Losses[W] > 0.1 % Max'),
+                   ('ident',)),
+        'characteristics': (('characteristics',),
+                            ('** Characteristics of Permanent-Magnet-Motors **',),
+                            ()),
+        'demag': (('demag',), ('Demagnetisation', 'Demagnetization Data'), ())}
+    _lazy_titles = {t: g for g, v in _lazy_groups.items() for t in v[1]}
+    _lazy_attrs = {a: g for g, v in _lazy_groups.items() for a in v[0]}
 
     def __init__(self):
         self._fft = None
@@ -254,16 +299,28 @@ class Reader:
             return self.flux[0]['displ'][1]-self.flux[0]['displ'][0]
         return None
 
-    def read(self, content):
+    def read(self, content, lazy=False, sections=None):
         """read bch file
 
         Args:
           content (str or list of str) the text lines of the BCH file
+          lazy (bool) parse the sections of the groups in _lazy_groups
+            (machine, flux, torque, ident, losses etc.) on first
+            access of their attributes only
+          sections (list of str) names of the section groups to be parsed
+            (see _lazy_groups). The sections of all other groups
+            are skipped.
         """
         if isinstance(content, str):
             lines = content.split('\n')
         else:
             lines = content
+        # index of (title, group, owner, lines) tuples
+        # where owner is the position of the section preceding a
+        # fourier analysis (or the section itself)
+        self._sections = []
+        self._fft_state = {}
+        owner, group = 0, None
         for s in _readSections(lines):
             if not s:
                 continue
@@ -273,15 +330,96 @@ class Reader:
             logger.debug("'%s': %d", title, len(s[1:]))
             # Check if we are finished with the fourier analysis part(s)
             if title != 'Fourier Analysis':
-                self._fft = None
-            else:
-                title2 = s[0].split(':')[1].strip()
-                for k in ['Airgap Induction Br']:
-                    if k == title2[:len(k)]:
-                        title = title2[:len(k)]
-            if title in self.dispatch:
-                self.dispatch[title](self, s)
+                owner = len(self._sections)
+                group = self._lazy_titles.get(title)
+                self._sections.append((title, group, owner, s))
+                continue
+            title2 = s[0].split(':')[1].strip()
+            for k in ['Airgap Induction Br']:
+                if k == title2[:len(k)]:
+                    title = title2[:len(k)]
+            self._sections.append(
+                (title, self._lazy_titles.get(title, group), owner, s))
+
+        if not lazy and sections is None:
+            for i in range(len(self._sections)):
+                self.__parse_section(i)
+            del self._sections, self._fft_state
+            self.__calc_weight()
+            self.__check_cogging()
+            self.__check_phases()
+            return self
+
+        groups = set(self._lazy_groups)
+        if sections is not None:
+            # keep the selected groups and the groups they depend on
+            groups, selected = set(), list(sections)
+            while selected:
+                g = selected.pop()
+                if g not in groups:
+                    groups.add(g)
+                    selected += self._lazy_groups[g][2]
+        self._pending = {}
+        for g, (attrs, titles, _) in self._lazy_groups.items():
+            if g in groups:
+                self._pending[g] = {a: self.__dict__.pop(a)
+                                    for a in attrs if a in self.__dict__}
+        for i, (title, g, owner, s) in enumerate(self._sections):
+            if g is None:
+                self.__parse_section(i)
+            elif g not in groups:  # skip section
+                self._sections[i] = (title, g, owner, None)
+        self.__calc_weight()
+        if not lazy:
+            for g in sections:
+                self.__parse_group(g)
+        return self
 
+    def __parse_section(self, i):
+        """dispatch the section at position i of the section index"""
+        title, group, owner, s = self._sections[i]
+        self._sections[i] = (title, group, owner, None)
+        if owner == i:
+            self._fft = None
+        else:
+            self._fft = self._fft_state.get(owner)
+        if title in self.dispatch:
+            self.dispatch[title](self, s)
+        self._fft_state[owner] = self._fft
+
+    def __parse_group(self, group, stop=None):
+        """parse the pending sections of group (in front of position stop)
+        together with the preceding sections of the groups it depends on"""
+        if group not in self._pending:
+            return
+        attrs, _, requires = self._lazy_groups[group]
+        for i, (title, g, owner, s) in enumerate(self._sections[:stop]):
+            if g != group or self._sections[i][3] is None:
+                continue
+            for r in requires:
+                self.__parse_group(r, i)
+            # make the parsed (partial) results visible while parsing
+            for r in (group,) + requires:
+                self.__dict__.update(self._pending.get(r, {}))
+            self.__parse_section(i)
+            for r in (group,) + requires:
+                if r in self._pending:
+                    self._pending[r] = {
+                        a: self.__dict__.pop(a)
+                        for a in self._lazy_groups[r][0]
+                        if a in self.__dict__}
+        if stop is not None:
+            return
+        # the group is complete
+        self.__dict__.update(self._pending.pop(group))
+        if group == 'torque':
+            self.__check_cogging()
+        elif group == 'machine':
+            self.__check_phases()
+        if not self._pending:  # all groups are complete
+            del self._sections, self._fft_state, self._pending
+
+    def __calc_weight(self):
         if len(self.weights) > 0:
             w = list(zip(*self.weights))
             self.weight['iron'] = sum(w[0])
@@ -289,6 +427,7 @@ class Reader:
             self.weight['magnet'] = sum(w[2])
             self.weight['total'] = sum([sum(l) for l in w])
 
+    def __check_cogging(self):
         # check if cogging and fft
         try:
             if (self.type.startswith('Fast cogging')
@@ -310,6 +449,7 @@ class Reader:
         except (KeyError, IndexError, ValueError):
             pass
 
+    def __check_phases(self):
         # check number of phases
         try:
             if 'm' not in self.machine:
@@ -317,8 +457,6 @@ class Reader:
         except:
             pass
 
-        return self
-
     def __findNums(self, l):
         rec = self._numPattern.findall(l)
         if 3 * '*' in l:  # min 3 '*'
@@ -697,13 +835,12 @@ class Reader:
             for k, l in enumerate(content[i+3:]):
                 if l.startswith('[[***'):
                     break
-                rec = l.split('\t')
-                if len(rec) == 6:
-                    m.append([floatnan(x) for x in rec])
+                if l.count('\t') == 5:
+                    m.append(l)
         else:
             k = -3
         if m:
-            m = np.array(m).T
+            m = floatnan_table(m, 6).T
             ncols = len(set(m[1]))
             i1 = np.reshape(m[0], (-1, ncols)).T[0]
             nrows = len(i1)
@@ -754,7 +891,7 @@ class Reader:
 
         f = {'displ': [], 'flux_k': [], 'voltage_dpsi': [],
              'voltage_four': [], 'current_k': [], 'voltage_ir': []}
-
+        m = []
         for l in content:
             rec = l.split()
             if l.startswith('Flux-Area'):
@@ -767,15 +904,16 @@ class Reader:
                 if self.wdg not in self.flux:
                     self.flux[self.wdg] = []
             elif len(rec) == 7:
-                f['displ'].append(floatnan(rec[1].strip()))
-                f['flux_k'].append(floatnan(rec[2].strip()))
-                f['voltage_dpsi'].append(floatnan(rec[3].strip()))
-                f['voltage_four'].append(floatnan(rec[4].strip()))
-                f['current_k'].append(floatnan(rec[5].strip()))
-                f['voltage_ir'].append(floatnan(rec[6].strip()))
+                m.append(l)
             elif rec and rec[0].startswith('['):
                 f['displunit'] = re.search(r"\[([^\]]*)\]", l).group(1).strip()
 
+        if m:
+            m = floatnan_table(m, 7, sep=None).T
+            for k, v in zip(('displ', 'flux_k', 'voltage_dpsi',
+                             'voltage_four', 'current_k', 'voltage_ir'),
+                            m[1:]):
+                f[k] = v.tolist()
         self.flux[self.wdg].append(f)
         self._fft = Reader.__read_flux_fft
 
@@ -1069,13 +1207,8 @@ class Reader:
         for i, l in enumerate(content):
             if l.find('[A') > -1:
                 break
-        m = []
-        for l in content[i+2:]:
-            rec = l.split('\t')
-            if len(rec) == 7:
-                m.append([floatnan(x) for x in rec])
-
-        m = np.array(m).T
+        m = floatnan_table([l for l in content[i+2:]
+                            if l.count('\t') == 6], 7).T
         d = np.diff(m[1])
         ncols = (len(d)+1)//(len(d[d < 0])+1)
         if ncols == 1 and len(m[1]) > 1 and m[1][0] != m[1][1]:  # simple correction
@@ -1104,13 +1237,8 @@ class Reader:
         for i, l in enumerate(content):
             if l.find('[A') > -1:
                 break
-        m = []
-        for l in content[i+2:]:
-            rec = l.split('\t')
-            if len(rec) == 7:
-                m.append([floatnan(x) for x in rec])
-
-        m = np.array(m).T
+        m = floatnan_table([l for l in content[i+2:]
+                            if l.count('\t') == 6], 7).T
         d = np.diff(m[1])
         ncols = (len(d)+1)//(len(d[d < 0])+1)
         if ncols == 1 and len(m[1]) > 1 and m[1][0] != m[1][1]:  # simple correction
@@ -1151,14 +1279,13 @@ class Reader:
         m = []
         k = i+2
         for l in content[i+2:]:
-            rec = l.split('\t')
-            if len(rec) > 7:
-                m.append([floatnan(x) for x in rec[:8]])
-            elif rec and rec[0].startswith('Curr Id'):
+            if l.count('\t') > 6:
+                m.append('\t'.join(l.split('\t', 8)[:8]))
+            elif l.startswith('Curr Id'):
                 break
             k += 1
 
-        m = np.array(m).T
+        m = floatnan_table(m, 8).T
         ncols = len(set(m[1]))
         i1 = np.reshape(m[0], (-1, ncols)).T[0]
         nrows = len(i1)
@@ -1191,15 +1318,14 @@ class Reader:
         logger.info('losses for speed %f', speed)
         nl = 4
         for l in content[4:]:
-            rec = l.split('\t')
-            if len(rec) > 1:
-                if rec[0].startswith('P fe'):
+            if '\t' in l:
+                if l.startswith('P fe'):
                     break
-                m.append([floatnan(x) for x in rec])
+                m.append(l)
             nl += 1
         if not m:
             return
-        m = np.array(m).T
+        m = floatnan_table(m, m[0].count('\t')+1).T
         d = np.diff(m[1])
         if self.ldq:
             ncols = (len(d)+1)//(len(d[d > 0])+1)
@@ -1221,25 +1347,19 @@ class Reader:
             ls = {k: np.reshape(v[:mlen],
                                 (nrows, ncols)).T.tolist()
                   for k, v in zip(cols, m[2:])}
-        m = []
-        for l in content[nl+3:]:
-            rec = l.split('\t')
-            if not rec and m:
-                break
-            if len(rec) > 5:
-                m.append([floatnan(x) for x in rec])
+        m = [l for l in content[nl+3:] if l.count('\t') > 4]
 
         cols = []
         for s in subregs[:-2] + ['rotor', 'magnet']:
             cols += [s+'_hyst', s+'_eddy']
         if m:
             # FEMAG-2024.2
-            if len(m[0]) > len(subregs[:-1])*2+2:
+            if m[0].count('\t')+1 > len(subregs[:-1])*2+2:
                 cols = []
                 for s in subregs[:-2] + ['rotor', 'magnet']:
                     cols += [s+'_hyst', s+'_eddy', s+'_excess']
 
-            m = np.array(m).T
+            m = floatnan_table(m, m[0].count('\t')+1).T
             if self.ldq:
                 ls.update({k: np.reshape(v[:mlen],
                                          (nrows, ncols)).T[::-1].tolist()
@@ -1772,7 +1892,24 @@ class Reader:
         except (KeyError, IndexError, AttributeError):
             return None
 
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items()
+                if k not in ('dispatch', '_fft')}
+
+    def __setstate__(self, state):
+        self.__init__()
+        for k in self._lazy_attrs:  # keep pending groups lazy
+            self.__dict__.pop(k, None)
+        self.__dict__.update(state)
+
     def __getattr__(self, k):
+        try:
+            return self.__dict__[k]
+        except KeyError:
+            g = self._lazy_attrs.get(k)
+            if g not in self.__dict__.get('_pending', {}):
+                raise
+        self.__parse_group(g)
         return self.__dict__[k]
 
     def asdict(self):
@@ -1825,12 +1962,118 @@ class Reader:
         return self.__str__()
 
 
-def read(filename):
-    """Read BCH/BATCH results from file *filename*."""
+CACHE_SUFFIX = '.cache'
+_CACHE_VERSION = 2
+
+
+def _file_stat(filename):
+    st = os.stat(filename)
+    return st.st_size, st.st_mtime_ns
+
+
+def _file_hash(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _to_json(v):
+    """return plain json data of parsed results: tuples, dicts with
+    non-str keys and numpy values are tagged to be restored by _from_json"""
+    if isinstance(v, dict):
+        if all(isinstance(k, str) for k in v):
+            return {k: _to_json(x) for k, x in v.items()}
+        return {'__items__': [[_to_json(k), _to_json(x)]
+                              for k, x in v.items()]}
+    if isinstance(v, list):
+        return [_to_json(x) for x in v]
+    if isinstance(v, tuple):
+        return {'__tuple__': [_to_json(x) for x in v]}
+    if isinstance(v, (np.ndarray, np.generic)):
+        return {'__numpy__': v.dtype.str, 'shape': v.shape,
+                'value': v.tolist()}
+    return v
+
+
+def _from_json(d):
+    """restore the tagged objects of _to_json (json object_hook)"""
+    if '__tuple__' in d:
+        return tuple(d['__tuple__'])
+    if '__items__' in d:
+        return {k: x for k, x in d['__items__']}
+    if '__numpy__' in d:
+        a = np.array(d['value'], dtype=d['__numpy__'])
+        return a if d['shape'] else a[()]
+    return d
+
+
+def _read_cache(filename):
+    """return Reader from cache file of *filename* or None if the
+    cache is missing, outdated or unreadable"""
+    from . import __version__
+    cachefile = str(filename) + CACHE_SUFFIX
+    try:
+        with open(cachefile, encoding='utf-8') as f:
+            c = json.load(f, object_hook=_from_json)
+        if (c['version'], c['femagtools']) != (_CACHE_VERSION, __version__):
+            return None
+        if tuple(c['stat']) != _file_stat(filename):
+            if c['hash'] != _file_hash(filename):
+                return None
+            # same content, update modification time and size
+            _write_cache(filename, c['data'], c['hash'])
+        bchresults = Reader.__new__(Reader)
+        bchresults.__setstate__(c['data'])
+    except Exception as e:  # any damaged or foreign cache is a miss
+        logger.debug("Cannot read cache %s: %s", cachefile, e)
+        return None
+    logger.debug("Read cache %s", cachefile)
+    return bchresults
+
+
+def _write_cache(filename, data, hash=None):
+    """write parsed results data (dict) as json to cache file
+    of *filename*"""
+    from . import __version__
+    cachefile = str(filename) + CACHE_SUFFIX
+    c = dict(version=_CACHE_VERSION,
+             femagtools=__version__,
+             stat=_file_stat(filename),
+             hash=hash or _file_hash(filename),
+             data=_to_json(data))
+    try:
+        text = json.dumps(c)
+        tmpfile = cachefile + '.{}.tmp'.format(os.getpid())
+        with open(tmpfile, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmpfile, cachefile)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning("Cannot write cache %s: %s", cachefile, e)
+
+
+def read(filename, cache=False, lazy=False, sections=None):
+    """Read BCH/BATCH results from file *filename*.
+
+    Args:
+      filename: name of BCH/BATCH file
+      cache: (bool) reuse the parsed results stored in *filename*.cache
+        as long as the BCH/BATCH file is unchanged (by size, modification
+        time or content). The cache file is created if needed.
+      lazy: (bool) parse sections on first access of their attributes
+      sections: (list of str) names of the section groups to be parsed
+        such as 'machine', 'torque', 'losses' (see Reader.read)
+
+    The cache file is only written if all sections are parsed.
+    """
     import io
+    if cache:
+        bchresults = _read_cache(filename)
+        if bchresults is not None:
+            return bchresults
     bchresults = Reader()
     with io.open(filename, encoding='latin1', errors='ignore') as f:
-        bchresults.read(f.readlines())
+        bchresults.read(f.readlines(), lazy=lazy, sections=sections)
+    if cache and not lazy and sections is None:
+        _write_cache(filename, bchresults.__getstate__())
     return bchresults
 
 
@@ -19,30 +19,245 @@ output_filetypes = [
     "msh", "geo", "vtu"]
 
 
+def _boundary_condition(bndcnd):
+    """return physical line ids of node boundary conditions (array)"""
+    bc = np.full(np.shape(bndcnd), 6)  # no condition
+    for ids, i in (((1, 8, 9), 1),  # vpot 0
+                   ((2,), 2),  # vpot const
+                   ((3, 6), 4),  # periodic -
+                   ((4, 5), 3)):  # periodic +
+        bc[np.isin(bndcnd, ids)] = i
+    return bc
+
+
+def _mesh_arrays(isa, physical_surfaces, num_physical_lines):
+    """return points, potential, boundary lines, line ids and the
+    connectivity, physical and geometrical ids and values of the linear
+    triangle and quad elements as arrays"""
+    num_nodes = len(isa.node_xy)
+    points = np.column_stack((isa.node_xy, np.zeros(num_nodes)))
+    vpot = isa.node_vpot[:, 0]
+    bndcnd = isa.node_bndcnd
+    on_boundary = (bndcnd != 0) | (isa.node_pernod != 0)
+    outside, inner_elements, center_elements, outer_elements = \
+        isa.airgap_index()
+
+    def edges(nvert):
+        """return the vertex pairs (v, previous v) of the elements
+        with nvert vertices (in element order)"""
+        elidx = np.repeat(np.arange(len(nvert)), nvert)
+        start = np.cumsum(nvert) - nvert
+        i = np.arange(len(elidx)) - start[elidx]
+        ptr = isa.element_node_ptr[elidx]
+        return (isa.element_node_idx[ptr + i],
+                isa.element_node_idx[ptr + (i - 1) % nvert[elidx]])
+
+    def pair_code(k1, k2):
+        return np.asarray(k1, dtype=np.int64)*num_nodes + k2
+
+    # nodes linked by a nodechain
+    chain = isa.nodechain_nodes
+    a, b = np.repeat(chain, 3, axis=1).ravel(), np.tile(chain, 3).ravel()
+    chain_pairs = pair_code(a[(a >= 0) & (b >= 0)], b[(a >= 0) & (b >= 0)])
+    # edges of the airgap center elements on the outer airgap elements
+    nvert = np.diff(isa.element_node_ptr)
+    is_outer = np.zeros(len(nvert), dtype=bool)
+    is_outer[outer_elements] = True
+    outer_vertex = np.zeros(num_nodes, dtype=bool)
+    outer_vertex[isa.element_node_idx[np.repeat(is_outer, nvert)]] = True
+    is_center = np.zeros(len(nvert), dtype=bool)
+    is_center[center_elements] = True
+    a, b = edges(np.where(is_center, nvert, 0))
+    sel = outer_vertex[a] & outer_vertex[b]
+    a, b = a[sel], b[sel]
+    airgap_pairs = np.concatenate((pair_code(a, b), pair_code(b, a)))
+
+    # edges of the linear elements (in element order)
+    nvert = np.where((nvert == 3) | (nvert == 4), nvert, 0)
+    n1, n2 = edges(nvert)
+    code = pair_code(n1, n2)
+    on_airgap = np.isin(code, airgap_pairs)
+    both = on_boundary[n1] & on_boundary[n2]
+    sel = np.where(both, np.isin(code, chain_pairs), on_airgap)
+    n1, n2, on_airgap = n1[sel], n2[sel], on_airgap[sel]
+    lines = np.column_stack((n1, n2))
+    bc1, bc2 = _boundary_condition(bndcnd[n1]), _boundary_condition(bndcnd[n2])
+    line_ids = np.where(
+        on_airgap, 7,  # airgap
+        np.where((bndcnd[n1] != bndcnd[n2]) & (bc1 == 1), bc2, bc1))
+
+    # element values
+    num_elements = len(isa.element_type)
+    mag = isa.element_mag
+    reluc = isa.element_reluc[:, 0]
+    loss_density = isa.element_loss_density
+    length = isa.se_length[isa.element_se]
+    se_key = isa.element_se
+    center = isa.element_pos
+
+    def surface_id(name):
+        return physical_surfaces.index(name) + num_physical_lines + 1
+
+    physical_id = np.zeros(num_elements, dtype=int)
+    is_mag = np.any(mag != 0, axis=1)
+    physical_id[is_mag] = np.select(
+        [(mag[is_mag, 0] > 0) & (mag[is_mag, 1] > 0), mag[is_mag, 0] > 0,
+         mag[is_mag, 1] > 0],
+        [surface_id("PM1"), surface_id("PM2"), surface_id("PM3")],
+        surface_id("PM4"))
+    airgap = np.zeros(num_elements, dtype=int)
+    for i, k in ((1, inner_elements), (1, center_elements),
+                 (2, outer_elements)):
+        airgap[k] = np.where(airgap[k] == 0, i, airgap[k])
+    physical_id[~is_mag & (airgap == 1)] = surface_id("Airgap_Inner")
+    physical_id[~is_mag & (airgap == 2)] = surface_id("Airgap_Outer")
+    first_vertex = isa.element_node_idx[isa.element_node_ptr[:-1]]
+    rest = np.nonzero(physical_id == 0)[0]
+    rest = rest[np.argsort(se_key[rest], kind='stable')]
+    keys, first = np.unique(se_key[rest], return_index=True)
+    for k, rest in zip(keys, np.split(rest, first[1:])):
+        if isa.se_sr[k] == -1:
+            physical_id[rest] = np.where(outside[first_vertex[rest]],
+                                         surface_id("Air_Outer"),
+                                         surface_id("Air_Inner"))
+            continue
+        sr = isa.se_sr[k]
+        if isa.sr_wb[sr] != -1:
+            if isa.sr_curdir[sr] > 0:
+                physical_id[rest] = surface_id(
+                    "Winding_{}_-".format(isa.sr_wb[sr] + 1))
+            else:
+                physical_id[rest] = surface_id(
+                    "Winding_{}_+".format(isa.sr_wb[sr] + 1))
+        else:
+            physical_id[rest] = surface_id(isa.sr_name[sr])
+
+    # flux density (see Element.flux_density)
+    b = np.zeros((num_elements, 2),
+                 dtype=np.result_type(points, vpot, length))
+    x, y = points[:, 0], points[:, 1]
+    for n, pairs in ((3, ((0, 1, 2),)),
+                     (4, ((0, 1, 2), (2, 3, 0)))):
+        sel = np.nonzero(nvert == n)[0]
+        if not len(sel):
+            continue
+        v = isa.element_node_idx[isa.element_node_ptr[sel][:, None] +
+                                 np.arange(n)]
+        bp = []
+        for k0, k1, k2 in pairs:
+            y31 = y[v[:, k2]] - y[v[:, k0]]
+            y21 = y[v[:, k1]] - y[v[:, k0]]
+            x13 = x[v[:, k0]] - x[v[:, k2]]
+            x21 = x[v[:, k1]] - x[v[:, k0]]
+            a21 = vpot[v[:, k1]] - vpot[v[:, k0]]
+            a31 = vpot[v[:, k2]] - vpot[v[:, k0]]
+            delta = length[sel] * (y31 * x21 + y21 * x13)
+            bp.append(((x13 * a21 + x21 * a31) / delta,
+                       (y21 * a31 - y31 * a21) / delta))
+        if n == 3:
+            b[sel, 0], b[sel, 1] = bp[0]
+        else:
+            b[sel, 0] = (bp[0][0] + bp[1][0]) / 2
+            b[sel, 1] = (bp[0][1] + bp[1][1]) / 2
+
+    # demagnetization (see Element.demag_b)
+    h = np.zeros(num_elements, dtype=b.dtype)
+    magnet = (np.abs(mag[:, 0]) > 1e-5) | (np.abs(mag[:, 1]) > 1e-5)
+    if np.any(magnet):
+        magtemp = getattr(isa, 'MAGN_TEMPERATURE', 20)
+        br_temp_corr = 1. + getattr(isa, 'BR_TEMP_COEF', 0)/100*(
+            magtemp - 20.)
+        pos = np.arctan2(center[magnet, 1], center[magnet, 0])
+        b1, b2 = b[magnet, 0], b[magnet, 1]
+        br = np.cos(pos)*b1 + np.sin(pos)*b2
+        bphi = -np.sin(pos)*b1 + np.cos(pos)*b2
+        m1, m2 = mag[magnet, 0]*br_temp_corr, mag[magnet, 1]*br_temp_corr
+        magn = np.sqrt(m1**2 + m2**2)
+        alfa = np.arctan2(m2, m1) - pos
+        bpol = br * np.cos(alfa) + bphi * np.sin(alfa)
+        hpol = (bpol - magn)*(np.abs(reluc[magnet]) / (4*np.pi*1e-7 * 1000))
+        h[magnet] = np.where(hpol > 0, 0, -hpol)
+
+    perm = np.where(reluc < 1, 1/np.where(reluc < 1, reluc, 1), 1)
+    lamination = (np.any(isa.element_reluc != 1.0, axis=1) &
+                  np.all(mag == 0, axis=1))
+    iron_losses = np.where(lamination, loss_density, 0)
+    mag_losses = np.where(is_mag, loss_density, 0)
+    winding_se = (isa.se_sr >= 0) & (isa.sr_winding[isa.se_sr] >= 0)
+    wdg_losses = np.where(winding_se[se_key], loss_density, 0)
+
+    data = (physical_id, se_key, b, h, perm,
+            iron_losses, mag_losses, wdg_losses)
+    cells, cell_data = {}, tuple({} for d in data)
+    for cell_type, n in (('triangle', 3), ('quad', 4)):
+        sel = np.nonzero(nvert == n)[0]
+        cells[cell_type] = isa.element_node_idx[
+            isa.element_node_ptr[sel][:, None] + np.arange(n)]
+        for c, d in zip(cell_data, data):
+            c[cell_type] = d[sel]
+    return (points, vpot, lines, line_ids, cells) + cell_data
+
+
+def _vtk_type(dtype):
+    """return the VTK data type name of a numpy dtype"""
+    return '{}{}'.format({'f': 'Float', 'i': 'Int', 'u': 'UInt'}[dtype.kind],
+                         8*dtype.itemsize)
+
+
+def _write_vtu_appended(filename, points, cells, point_data, cell_data):
+    """write an unstructured grid vtu file with the data arrays
+    appended as raw binary data"""
+    vtk_cell_types = {'line': 3, 'triangle': 5, 'quad': 9}
+    blocks = []
+
+    def data_array(a, name=None):
+        a = np.ascontiguousarray(a, dtype=a.dtype.newbyteorder('<'))
+        attrs = ' Name="{}"'.format(name) if name else ''
+        if a.ndim > 1:
+            attrs += ' NumberOfComponents="{}"'.format(a.shape[1])
+        offset = sum(8 + b.nbytes for b in blocks)
+        blocks.append(a)
+        return '<DataArray type="{}"{} format="appended" offset="{}"/>'.format(
+            _vtk_type(a.dtype), attrs, offset)
+
+    connectivity = np.concatenate(
+        [np.ravel(c) for _, c in cells]).astype(np.int64)
+    offsets = np.cumsum(np.concatenate(
+        [np.full(len(c), np.shape(c)[1]) for _, c in cells])).astype(np.int64)
+    types = np.concatenate(
+        [np.full(len(c), vtk_cell_types[t], dtype=np.uint8)
+         for t, c in cells])
+
+    xml = ['<?xml version="1.0"?>',
+           '<VTKFile type="UnstructuredGrid" version="1.0" '
+           'byte_order="LittleEndian" header_type="UInt64">',
+           '<UnstructuredGrid>',
+           '<Piece NumberOfPoints="{}" NumberOfCells="{}">'.format(
+               len(points), len(types)),
+           '<Points>', data_array(points), '</Points>',
+           '<Cells>',
+           data_array(connectivity, 'connectivity'),
+           data_array(offsets, 'offsets'),
+           data_array(types, 'types'),
+           '</Cells>',
+           '<PointData>']
+    xml += [data_array(np.asarray(v), k) for k, v in point_data.items()]
+    xml += ['</PointData>', '<CellData>']
+    xml += [data_array(np.concatenate(v), k) for k, v in cell_data.items()]
+    xml += ['</CellData>', '</Piece>', '</UnstructuredGrid>',
+            '<AppendedData encoding="raw">']
+    with open(filename, 'wb') as f:
+        f.write('\n'.join(xml).encode())
+        f.write(b'\n_')
+        for a in blocks:
+            f.write(np.uint64(a.nbytes).tobytes())
+            a.tofile(f)
+        f.write(b'\n</AppendedData>\n</VTKFile>\n')
+
+
 def _from_isa(isa, filename, target_format,
-              extrude=0, layers=0, recombine=False):
-
-    try:
-        airgap_outer_vertices = [v for e in isa.airgap_outer_elements
-                                 for v in e.vertices]
-    except AttributeError:
-        logger.warning("airgap radius is not set in source file")
-
-    airgap_lines = []
-    for e in isa.airgap_center_elements:
-        ev = e.vertices
-        for i, v1 in enumerate(ev):
-            v2 = ev[i-1]
-            if v1 in airgap_outer_vertices and \
-               v2 in airgap_outer_vertices:
-                airgap_lines.append((v1, v2))
-
-    nodechain_links = defaultdict(list)
-    for n in isa.nodechains:
-        nodechain_links[n.node1].extend(n.nodes)
-        nodechain_links[n.node2].extend(n.nodes)
-        if n.nodemid is not None:
-            nodechain_links[n.nodemid].extend(n.nodes)
+              extrude=0, layers=0, recombine=False, binary=False,
+              appended=False):
 
     physical_lines = ["v_potential_0",
                       "v_potential_const",
@@ -52,10 +267,9 @@ def _from_isa(isa, filename, target_format,
                       "no_condition",
                       "Airgap"]
 
-    physical_surfaces = sorted(set([sr.name
-                                    for sr in isa.subregions]
-                                   + ["Winding_{}_{}".format(w.key, pol)
-                                      for w in isa.windings
+    physical_surfaces = sorted(set(isa.sr_name
+                                   + ["Winding_{}_{}".format(k + 1, pol)
+                                      for k in range(len(isa.windings))
                                       for pol in ("+", "-")]
                                    + ["Air_Inner",
                                       "Air_Outer",
@@ -131,68 +345,28 @@ def _from_isa(isa, filename, target_format,
         else:
             return (n1, n2) in airgap_lines or (n2, n1) in airgap_lines
 
-    points = [[n.x, n.y, 0] for n in isa.nodes]
-    vpot = [n.vpot[0] for n in isa.nodes]
-
-    lines = []
-    line_ids = []
-    triangles = []
-    quads = []
-    physical_ids = dict(triangle=[], quad=[])
-    geometrical_ids = dict(triangle=[], quad=[])
-    b = dict(triangle=[], quad=[])
-    h = dict(triangle=[], quad=[])
-    perm = dict(triangle=[], quad=[])
-    iron_losses = dict(triangle=[], quad=[])
-    mag_losses = dict(triangle=[], quad=[])
-    wdg_losses = dict(triangle=[], quad=[])
-    for e in isa.elements:
-        ev = e.vertices
-
-        for i, v in enumerate(ev):
-            v1, v2 = v, ev[i-1]
-            if line_on_boundary(v1, v2):
-                lines.append([v1.key - 1, v2.key - 1])
-                line_ids.append(physical_line(v1, v2))
-
-        if len(ev) == 3:
-            triangles.append([n.key - 1 for n in ev])
-            cell_type = "triangle"
-
-        elif len(ev) == 4:
-            quads.append([n.key - 1 for n in ev])
-            cell_type = "quad"
-
-        try:
-            magtemp = isa.MAGN_TEMPERATURE
-        except AttributeError:
-            magtemp = 20
-
-        physical_ids[cell_type].append(physical_surface(e))
-        geometrical_ids[cell_type].append(e.se_key)
-        b[cell_type].append(e.flux_density())
-        h[cell_type].append(e.demagnetization(magtemp))
-        perm[cell_type].append(e.permeability())
-        iron_losses[cell_type].append(e.iron_loss_density())
-        mag_losses[cell_type].append(e.mag_loss_density())
-        wdg_losses[cell_type].append(e.wdg_loss_density())
-
-    logger.info("%s: Lines %d, Triangles %d, Quads %d",
-                filename, len(lines), len(triangles), len(quads))
+    if target_format in ("msh", "vtu"):
+        (points, vpot, lines, line_ids, cells,
+         physical_ids, geometrical_ids, b, h, perm,
+         iron_losses, mag_losses, wdg_losses) = _mesh_arrays(
+             isa, physical_surfaces, len(physical_lines))
+
+        logger.info("%s: Lines %d, Triangles %d, Quads %d",
+                    filename, len(lines), len(cells['triangle']),
+                    len(cells['quad']))
 
     if target_format == "msh":
         import meshio
 
-        points = np.array(points)
-        point_data = {"potential": np.array(vpot)}
+        point_data = {"potential": vpot}
 
-        cells = []
+        mesh_cells = []
         cell_data = defaultdict(list)
 
-        if lines:
-            cells.append(("line", np.array(lines)))
-            cell_data["gmsh:geometrical"].append(np.array(line_ids))
-            cell_data["gmsh:physical"].append(np.array(line_ids))
+        if len(lines):
+            mesh_cells.append(("line", lines))
+            cell_data["gmsh:geometrical"].append(line_ids)
+            cell_data["gmsh:physical"].append(line_ids)
             cell_data["b"].append(np.zeros((len(lines), 3)))
             cell_data["h"].append(np.zeros(len(lines)))
             cell_data["Rel. Permeability"].append(np.zeros(len(lines)))
@@ -200,27 +374,18 @@ def _from_isa(isa, filename, target_format,
             cell_data["Mag. Loss Dens."].append(np.zeros(len(lines)))
             cell_data["Wdg. Loss Dens."].append(np.zeros(len(lines)))
 
-        if triangles:
-            cells.append(("triangle", np.array(triangles)))
-            cell_data["gmsh:geometrical"].append(np.array(geometrical_ids["triangle"]))
-            cell_data["gmsh:physical"].append(np.array(physical_ids["triangle"]))
-            cell_data["b"].append(np.array([i + (0,) for i in b["triangle"]]))
-            cell_data["h"].append(np.array(h["triangle"]))
-            cell_data["Rel. Permeability"].append(np.array(perm["triangle"]))
-            cell_data["Iron Loss Dens."].append(np.array(iron_losses["triangle"]))
-            cell_data["Mag. Loss Dens."].append(np.array(mag_losses["triangle"]))
-            cell_data["Wdg. Loss Dens."].append(np.array(wdg_losses["triangle"]))
-
-        if quads:
-            cells.append(("quad", np.array(quads)))
-            cell_data["gmsh:geometrical"].append(np.array(geometrical_ids['quad']))
-            cell_data["gmsh:physical"].append(np.array(physical_ids['quad']))
-            cell_data["b"].append(np.array([i + (0,) for i in b['quad']]))
-            cell_data["h"].append(np.array(h['quad']))
-            cell_data["Rel. Permeability"].append(np.array(perm['quad']))
-            cell_data["Iron Loss Dens."].append(np.array(iron_losses['quad']))
-            cell_data["Mag. Loss Dens."].append(np.array(mag_losses['quad']))
-            cell_data["Wdg. Loss Dens."].append(np.array(wdg_losses['quad']))
+        for t in ("triangle", "quad"):
+            if len(cells[t]):
+                mesh_cells.append((t, cells[t]))
+                cell_data["gmsh:geometrical"].append(geometrical_ids[t])
+                cell_data["gmsh:physical"].append(physical_ids[t])
+                cell_data["b"].append(np.column_stack(
+                    (b[t], np.zeros(len(b[t]), dtype=b[t].dtype))))
+                cell_data["h"].append(h[t])
+                cell_data["Rel. Permeability"].append(perm[t])
+                cell_data["Iron Loss Dens."].append(iron_losses[t])
+                cell_data["Mag. Loss Dens."].append(mag_losses[t])
+                cell_data["Wdg. Loss Dens."].append(wdg_losses[t])
 
         field_data = {}
         for l in physical_lines:
@@ -230,15 +395,33 @@ def _from_isa(isa, filename, target_format,
                                       + len(physical_lines), 2])
         meshio.write_points_cells(filename,
                                   points,
-                                  cells,
+                                  mesh_cells,
                                   point_data,
                                   cell_data,
                                   field_data,
                                   file_format="gmsh22",
-                                  binary=False)
+                                  binary=binary)
 
     if target_format == "geo":
         import meshio
+        airgap_outer_vertices = {v for e in isa.airgap_outer_elements
+                                 for v in e.vertices}
+        airgap_lines = set()
+        for e in isa.airgap_center_elements:
+            ev = e.vertices
+            for i, v1 in enumerate(ev):
+                v2 = ev[i-1]
+                if v1 in airgap_outer_vertices and \
+                   v2 in airgap_outer_vertices:
+                    airgap_lines.add((v1, v2))
+
+        nodechain_links = defaultdict(list)
+        for n in isa.nodechains:
+            nodechain_links[n.node1].extend(n.nodes)
+            nodechain_links[n.node2].extend(n.nodes)
+            if n.nodemid is not None:
+                nodechain_links[n.nodemid].extend(n.nodes)
+
         geo = []
         nc_nodes = set([n for c in isa.nodechains for n in c.nodes])
 
@@ -318,22 +501,15 @@ def _from_isa(isa, filename, target_format,
             f.write("\n".join(geo))
 
     if target_format == "vtu":
-        import meshio
-        assert len(points) == len(vpot)
-        assert len(lines) == len(line_ids)
-        assert len(triangles) == len(physical_ids['triangle']) == len(geometrical_ids['triangle']) == len(b['triangle']) == len(h['triangle']) == len(perm['triangle'])
-        assert len(quads) == len(physical_ids['quad']) == len(geometrical_ids['quad']) == len(b['quad']) == len(h['quad']) == len(perm['quad'])
-
-        points = np.array(points)
-        point_data = {"potential": np.array(vpot)}
+        point_data = {"potential": vpot}
 
-        cells = []
+        mesh_cells = []
         cell_data = defaultdict(list)
 
-        if lines:
-            cells.append(("line", np.array(lines)))
-            cell_data["GeometryIds"].append(np.array(line_ids))
-            cell_data["PhysicalIds"].append(np.array(line_ids))
+        if len(lines):
+            mesh_cells.append(("line", lines))
+            cell_data["GeometryIds"].append(line_ids)
+            cell_data["PhysicalIds"].append(line_ids)
             cell_data["b"].append(np.zeros((len(lines), 3)))
             cell_data["Demagnetization"].append(np.zeros(len(lines)))
             cell_data["Rel. Permeability"].append(np.zeros(len(lines)))
@@ -341,42 +517,38 @@ def _from_isa(isa, filename, target_format,
             cell_data["Mag. Loss Dens."].append(np.zeros(len(lines)))
             cell_data["Wdg. Loss Dens."].append(np.zeros(len(lines)))
 
-        if triangles:
-            cells.append(("triangle", np.array(triangles)))
-            cell_data["GeometryIds"].append(np.array(geometrical_ids['triangle']))
-            cell_data["PhysicalIds"].append(np.array(physical_ids['triangle']))
-            cell_data["b"].append(np.array([i + (0,) for i in b['triangle']]))
-            cell_data["Demagnetization"].append(np.array(h['triangle']))
-            cell_data["Rel. Permeability"].append(np.array(perm['triangle']))
-            cell_data["Iron Loss Dens."].append(np.array(iron_losses['triangle']))
-            cell_data["Mag. Loss Dens."].append(np.array(mag_losses['triangle']))
-            cell_data["Wdg. Loss Dens."].append(np.array(wdg_losses['triangle']))
-
-        if quads:
-            cells.append(("quad", np.array(quads)))
-            cell_data["GeometryIds"].append(np.array(geometrical_ids['quad']))
-            cell_data["PhysicalIds"].append(np.array(physical_ids['quad']))
-            cell_data["b"].append(np.array([i + (0,) for i in b['quad']]))
-            cell_data["Demagnetization"].append(np.array(h['quad']))
-            cell_data["Rel. Permeability"].append(np.array(perm['quad']))
-            cell_data["Iron Loss Dens."].append(np.array(iron_losses['quad']))
-            cell_data["Mag. Loss Dens."].append(np.array(mag_losses['quad']))
-            cell_data["Wdg. Loss Dens."].append(np.array(wdg_losses['quad']))
-
-        field_data = {}
-        for l in physical_lines:
-            field_data[l] = np.array([physical_lines.index(l) + 1, 1])
-        for s in physical_surfaces:
-            field_data[s] = np.array([physical_surfaces.index(s) + 1
-                                      + len(physical_lines), 2])
-        meshio.write_points_cells(filename,
-                                  points,
-                                  cells,
-                                  point_data=point_data,
-                                  cell_data=cell_data,
-                                  field_data=field_data,
-                                  file_format="vtu",
-                                  binary=True)
+        for t in ("triangle", "quad"):
+            if len(cells[t]):
+                mesh_cells.append((t, cells[t]))
+                cell_data["GeometryIds"].append(geometrical_ids[t])
+                cell_data["PhysicalIds"].append(physical_ids[t])
+                cell_data["b"].append(np.column_stack(
+                    (b[t], np.zeros(len(b[t]), dtype=b[t].dtype))))
+                cell_data["Demagnetization"].append(h[t])
+                cell_data["Rel. Permeability"].append(perm[t])
+                cell_data["Iron Loss Dens."].append(iron_losses[t])
+                cell_data["Mag. Loss Dens."].append(mag_losses[t])
+                cell_data["Wdg. Loss Dens."].append(wdg_losses[t])
+
+        if appended:
+            _write_vtu_appended(filename, points, mesh_cells,
+                                point_data, cell_data)
+        else:
+            import meshio
+            field_data = {}
+            for l in physical_lines:
+                field_data[l] = np.array([physical_lines.index(l) + 1, 1])
+            for s in physical_surfaces:
+                field_data[s] = np.array([physical_surfaces.index(s) + 1
+                                          + len(physical_lines), 2])
+            meshio.write_points_cells(filename,
+                                      points,
+                                      mesh_cells,
+                                      point_data=point_data,
+                                      cell_data=cell_data,
+                                      field_data=field_data,
+                                      file_format="vtu",
+                                      binary=True)
 
 
 def _from_jmag(designer):
@@ -541,7 +713,7 @@ def _from_nastran(source, filename):
         binary=False)
 
 
-def to_msh(source, filename, infile_type=None):
+def to_msh(source, filename, infile_type=None, binary=False):
     """
     Convert a FEMAG, NASTRAN or JMAG Model Input File to msh format.
 
@@ -549,9 +721,11 @@ def to_msh(source, filename, infile_type=None):
         source: instance of femagtools.isa7.Isa7 or name of I7/ISA7/NAS/JPLOT file
         filename: name of converted file
         infile_type: format of source file
+        binary: write binary instead of ascii msh 2.2
+          (FEMAG models only)
     """
     if isinstance(source, isa7.Isa7):
-        _from_isa(source, filename, "msh")
+        _from_isa(source, filename, "msh", binary=binary)
 
     elif type(source) == str:
         if infile_type:
@@ -561,7 +735,7 @@ def to_msh(source, filename, infile_type=None):
 
         if file_ext in ["isa7", "i7", "nc"]:
             isa = nc.read(source) if file_ext == 'nc' else isa7.read(source)
-            _from_isa(isa, filename, "msh")
+            _from_isa(isa, filename, "msh", binary=binary)
         elif file_ext == "nas":
             _from_nastran(source, filename)
         elif file_ext == "jplot":
@@ -608,7 +782,7 @@ def to_geo(source, filename, extrude=0, layers=0,
         raise ValueError("cannot convert {} to .geo".format(source))
 
 
-def to_vtu(source, filename, infile_type=None):
+def to_vtu(source, filename, infile_type=None, appended=False):
     """
     Convert a femag model to vtu format.
 
@@ -616,9 +790,11 @@ def to_vtu(source, filename, infile_type=None):
         source: instance of isa7.Isa7 or name of an I7/ISA7 or nc file
         filename: name of converted file
         infile_type: format of source file
+        appended: write the data arrays as raw appended binary data
+          instead of inline base64 (faster and smaller for large models)
     """
     if isinstance(source, isa7.Isa7):
-        _from_isa(source, filename, "vtu")
+        _from_isa(source, filename, "vtu", appended=appended)
 
     elif type(source) == str:
         if infile_type:
@@ -628,7 +804,7 @@ def to_vtu(source, filename, infile_type=None):
 
         if file_ext in ["isa7", "i7", "nc"]:
             isa = nc.read(source) if file_ext == 'nc' else isa7.read(source)
-            _from_isa(isa, filename, "vtu")
+            _from_isa(isa, filename, "vtu", appended=appended)
         else:
             raise ValueError(
                 "cannot convert files of format {} to .vtu".format(file_ext))
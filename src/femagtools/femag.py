@@ -279,7 +279,7 @@ class BaseFemag(object):
         else:
             return ''
 
-    def read_bch(self, modelname=None, offset=0):
+    def read_bch(self, modelname=None, offset=0, cache=False):
         "read most recent BCH/BATCH file and return result"
         # read latest bch file if any
         if not modelname:
@@ -289,6 +289,8 @@ class BaseFemag(object):
         bchfile = self.get_bch_file(modelname, offset)
         if bchfile:
             logger.info("Read BCH {}".format(bchfile))
+            if cache:
+                return femagtools.bch.read(bchfile, cache)
             with io.open(bchfile, encoding='latin1',
                          errors='ignore') as f:
                 result.read(f)
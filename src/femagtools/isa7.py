@@ -4,10 +4,13 @@
 """
 import re
 import sys
+import mmap
 import struct
+import functools
 from enum import Enum
 import logging
 from collections import Counter, defaultdict
+from collections.abc import Sequence
 import numpy as np
 
 logger = logging.getLogger('femagtools.isa7')
@@ -96,6 +99,76 @@ def bertotti_pfe(Bxnu, Bynu, fnu, losscoeffs, axr):
 
     return phy, pec, pex
 
+def _harmonic_amplitudes(apos, y):
+    """return amplitudes of the harmonics and the number of harmonics
+    of each row of y (as utils.fft with pmod=2, 'nue')
+
+    Args:
+      apos: positions in degrees
+      y: (n, m) array of values"""
+    ntiles = int(round(360/(apos[-1] - apos[0])))
+    yx = np.tile(y[:, :-1], ntiles)
+    N = yx.shape[1]
+    Y = np.abs(np.fft.rfft(yx - np.mean(yx, axis=1, keepdims=True),
+                           axis=1))[:, :N//2]
+    # peak (base harmonic)
+    freq = np.fft.fftfreq(N, d=360/N)[np.argmax(Y, axis=1)]
+    npoles = np.zeros(len(y), dtype=int)
+    nz = np.abs(freq) > 0
+    npoles[nz] = 2*(360/np.abs(1/freq[nz])).astype(int)
+    nmax = np.where(nz, np.minimum(9*npoles, N//2), min(18*ntiles, N//2))
+    return 2*Y/N, nmax
+
+
+def _fft_peaks(apos, y):
+    """return amplitude, period, phase of the base harmonic and
+    the amplitudes of the harmonics of each row of y
+    (as utils.fft with pmod=0)"""
+    ntiles = int(round(360/(apos[-1] - apos[0])))
+    ypos = y - np.mean(y, axis=1, keepdims=True) > 0
+    nypos = ~ypos
+    nzc = np.sum((ypos[:, :-1] & nypos[:, 1:]) |
+                 (nypos[:, :-1] & ypos[:, 1:]), axis=1)
+    negative_periodic = (nzc == 0) | (nzc % 2 == 1)
+    sign = np.where(negative_periodic[:, None],
+                    np.repeat([m % 2 or -1 for m in range(1, ntiles+1)],
+                              y.shape[1]-1), 1)
+    yx = np.tile(y[:, :-1], ntiles)*sign
+    N = yx.shape[1]
+    Y = np.fft.rfft(yx - np.mean(yx, axis=1, keepdims=True),
+                    axis=1)[:, :N//2]
+    i = np.argmax(np.abs(Y), axis=1)
+    Yi = Y[np.arange(len(y)), i]
+    freq = np.fft.fftfreq(N, d=360/N)[i]
+    T0 = np.zeros(len(y))
+    T0[freq != 0] = np.abs(1/freq[freq != 0])
+    return 2*np.abs(Yi)/N, T0, np.angle(Yi), 2*np.abs(Y)/N
+
+
+def _axis_ratios(apos, br, bt, pole_pairs):
+    """return axis ratios of the flux density of each row of br, bt
+    (see Isa7._axis_ratio)"""
+    brm = np.mean(br, axis=1, keepdims=True)
+    btm = np.mean(bt, axis=1, keepdims=True)
+    brtmax = np.array((np.max(br - brm, axis=1), np.max(bt - btm, axis=1)))
+    axr = np.zeros(len(br))
+    r = np.nonzero(~np.any(np.isclose(brtmax, 0), axis=0))[0]
+    if len(r) == 0:
+        return axr
+    ar, Tr, alfar, nuer = _fft_peaks(apos, br[r] - brm[r])
+    at, Tt, alfat, nuet = _fft_peaks(apos, bt[r] - brm[r])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = ar[:, None]*np.cos(2*np.pi*apos/Tr[:, None] + alfar[:, None])
+        y = at[:, None]*np.cos(2*np.pi*apos/Tt[:, None] + alfat[:, None])
+    rotating = ~((ar > nuer[:, pole_pairs]) | (at > nuet[:, pole_pairs]))
+    n = np.sqrt(x**2 + y**2)
+    k = np.arange(len(r))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        axr[r[rotating]] = (n[k, np.argmin(n, axis=1)] /
+                            n[k, np.argmax(n, axis=1)])[rotating]
+    return axr
+
+
 class ElType(Enum):
     LinearTriangle = 1
     LinearRectangle = 2
@@ -108,18 +181,42 @@ class MoveType(Enum):
     Linear = 1
 """Types of rotor movement"""
 
+_BLOCK_FORMATS = {'?': '=i4', 'i': '=i4', 'h': '=i2', 'f': '=f4'}
+
+
+@functools.lru_cache(maxsize=None)
+def _block_dtype(fmt):
+    """return packed numpy record dtype of struct format string fmt
+    (bool fields are named b<n>, all others f<n>)"""
+    names, formats = [], []
+    for count, code in re.findall(r"([0-9]*)([?ihfs])", fmt):
+        if code == 's':
+            fields = [('V' + (count or '1'))]
+        else:
+            fields = [_BLOCK_FORMATS[code]] * int(count or 1)
+        for f in fields:
+            names.append('{}{}'.format('b' if code == '?' else 'f',
+                                       len(names)))
+            formats.append(f)
+    return np.dtype({'names': names, 'formats': formats})
+
+
 class Reader(object):
     """
     Open and Read I7/ISA7 file
 
     Arguments:
         filename: name of I7/ISA7 file to be read
+        use_mmap: (bool) map the file into memory instead of reading it
     """
 
-    def __init__(self, filename):
+    def __init__(self, filename, use_mmap=False):
         self.BR_TEMP_COEF = 0
-        with open(filename, mode="rb") as self.file:
-            self.file = self.file.read()
+        with open(filename, mode="rb") as f:
+            if use_mmap:
+                self.file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.file = f.read()
         self.pos = 0
         (self.NUM_PNT, self.PNT_PTR, self.PNT_HIDX,
          self.NUM_LIN, self.LIN_PTR, self.LIN_HIDX,
@@ -492,50 +589,38 @@ class Reader(object):
         """
         Read binary data and return unpacked values according to format string.
 
+        Each field of the format is returned as a column (numpy array) of
+        all records in the block. Floats are converted to float64 and
+        booleans to bool, integer columns are views on the file buffer.
+
         Arguments:
             fmt: Format string (see python struct module)
         """
-
-        fmt_ = fmt.replace("?", "i")
-
+        dtype = _block_dtype(fmt)
         blockSize = struct.unpack_from("=i", self.file, self.pos)[0]
         self.pos += 4
-        unpacked = []
-        try:
-            unpacked = struct.iter_unpack("=" + fmt_,
-                                          self.file[self.pos:self.pos
-                                                    + blockSize])
-            unpacked = [x for x in unpacked]
-
-        except AttributeError:  # python 2 has no iter_unpack
-            chunksize = struct.calcsize("=" + fmt_)
-            offset = self.pos
-            for j in range(blockSize // chunksize):
-                unpacked.append(struct.unpack_from("=" + fmt_,
-                                                   self.file,
-                                                   offset))
-                offset += chunksize
-            logger.debug("%s: %d %d", fmt_, blockSize, len(unpacked))
-        except struct.error as e:
+        size = max(min(blockSize, len(self.file) - self.pos), 0)
+        if size % dtype.itemsize:
             logger.warning("Invalid Blocksize %s at pos %i",
                            blockSize, self.pos-4)
-
+            size = 0
+        records = np.frombuffer(self.file, dtype=dtype,
+                                count=size // dtype.itemsize,
+                                offset=self.pos)
         self.pos += blockSize + 4
 
-        fmt_ = ""
-        for s in re.findall(r"[0-9]*.|[0-9]*\?", fmt):
-            if len(s) > 1 and s[-1] != "s":
-                fmt_ += int(s[:-1]) * s[-1]
-            else:
-                fmt_ += s
         values = []
-        for i, dtype in enumerate(re.findall(r"\?|[0-9]*s?", fmt_)[:-1]):
-            if dtype == "?":
-                values.append([bool(u[i]) for u in unpacked])
-            elif "s" in dtype:
-                values.append([u[i].decode('latin-1') for u in unpacked])
+        for name in dtype.names:
+            col = records[name]
+            kind = dtype.fields[name][0].kind
+            if name.startswith('b'):
+                values.append(col.astype(bool))
+            elif kind == 'V':
+                values.append([bytes(u).decode('latin-1') for u in col])
+            elif kind == 'f':
+                values.append(col.astype(np.float64))
             else:
-                values.append([u[i] for u in unpacked])
+                values.append(col)
 
         if len(fmt) == 1:
             return values[0]
@@ -555,12 +640,106 @@ class Reader(object):
             skips -= 1
 
 
+def _linked_lists(ptr, keys, nxt_ptr):
+    """resolve the linked lists (1-based pointers and keys) of all
+    entities simultaneously and return them as CSR arrays
+    (ptr, 0-based indexes)"""
+    ptr = np.asarray(ptr, dtype=int)
+    keys = np.asarray(keys, dtype=int)
+    nxt_ptr = np.asarray(nxt_ptr, dtype=int)
+    k, valid = [], []
+    while np.any(ptr > 0):
+        active = ptr > 0
+        i = np.where(active, ptr - 1, 0)
+        k.append(np.where(active, keys[i], 0))
+        valid.append(active)
+        ptr = np.where(active, nxt_ptr[i], 0)
+    k = np.reshape(np.array(k, dtype=int), (len(k), len(ptr))).T
+    valid = np.reshape(valid, (len(valid), len(ptr))).T.astype(bool)
+    return (np.concatenate(([0], np.cumsum(np.sum(valid, axis=1)))),
+            k[valid] - 1)
+
+
+class _MeshFields(object):
+    """
+    Mesh fields of a reader that are needed to create the mesh objects
+    of a columnar Isa7 and are not kept in its arrays. Numeric fields are
+    stored as numpy arrays, the reader itself (and its file buffer)
+    is not referenced.
+
+    Arguments:
+        reader: Reader object of I7/ISA7 or nc file
+    """
+    # fields that are part of the columnar arrays
+    _ARRAY_FIELDS = ('NODE_ISA_NODE_REC_ND_CO_1', 'NODE_ISA_NODE_REC_ND_CO_2',
+                     'NODE_ISA_NODE_REC_ND_BND_CND',
+                     'NODE_ISA_NODE_REC_ND_PER_NOD',
+                     'NODE_ISA_NODE_REC_ND_VP_RE', 'NODE_ISA_NODE_REC_ND_VP_IM',
+                     'NDCHN_ISA_NDCHN_REC_NC_NOD_1',
+                     'NDCHN_ISA_NDCHN_REC_NC_NOD_2',
+                     'NDCHN_ISA_NDCHN_REC_NC_NOD_MID',
+                     'ELEM_ISA_EL_NOD_PNTR', 'ELE_NOD_ISA_ND_KEY',
+                     'ELE_NOD_ISA_NXT_ND_PNTR', 'ELEM_ISA_ELEM_REC_EL_TYP',
+                     'ELEM_ISA_ELEM_REC_EL_SE_KEY',
+                     'ELEM_ISA_ELEM_REC_EL_RELUC',
+                     'ELEM_ISA_ELEM_REC_EL_RELUC_2',
+                     'ELEM_ISA_ELEM_REC_EL_MAG_1', 'ELEM_ISA_ELEM_REC_EL_MAG_2',
+                     'ELEM_ISA_ELEM_REC_LOSS_DENS',
+                     'SUPEL_ISA_SUPEL_REC_SE_SR_KEY',
+                     'SUPEL_ISA_SUPEL_REC_SE_LENGHT',
+                     'SUPEL_ISA_SE_EL_PNTR', 'SE_EL_ISA_EL_KEY',
+                     'SE_EL_ISA_NXT_EL_PNTR',
+                     'SR_ISA_SR_REC_SR_NAME', 'SR_ISA_SR_REC_SR_CUR_DIR',
+                     'SR_ISA_SR_REC_SR_WB_KEY')
+
+    def __init__(self, reader):
+        self.BR_TEMP_COEF = getattr(reader, 'BR_TEMP_COEF', 0)
+        for k, v in vars(reader).items():
+            if '_ISA_' not in k or k in self._ARRAY_FIELDS:
+                continue
+            try:
+                a = np.asarray(v)
+            except ValueError:  # inhomogeneous
+                a = None
+            setattr(self, k, a if a is not None and a.dtype.kind in 'biuf'
+                    else v)
+
+
+class _MeshList(Sequence):
+    """
+    List of the mesh objects (nodes, elements ..) of an Isa7 that are
+    created on first access
+
+    Arguments:
+        size: number of objects
+        create: function that returns the object of an index
+    """
+
+    def __init__(self, size, create):
+        self.items = [None]*size
+        self._create = create
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self.items)))]
+        item = self.items[i]
+        if item is None:
+            i = range(len(self.items))[i]
+            item = self.items[i] = self._create(i)
+        return item
+
+
 class Isa7(object):
     """
     The ISA7 Femag model
 
     Arguments:
-        filename: name of I7/ISA7 file to be read
+        reader: Reader object of I7/ISA7 or nc file
+        columnar: (bool) keep the mesh as numpy arrays and create
+            each node, element, superelement .. object on first access
     """
 
     color = {1: [1.0, 0.0, 0.0],  # RED
@@ -580,214 +759,15 @@ class Isa7(object):
              15: [0.0, 0.8235294117647058, 1.0], # SKYBLUE
              16: [0.8274509803921568, 0.8274509803921568, 0.8274509803921568]} # LIGHGREY
 
-    def __init__(self, reader):
+    def __init__(self, reader, columnar=False):
         try:
             self.state_of_problem = reader.state_of_problem
         except:
             pass
-        self.points = [Point(x, y)
-                       for x, y in zip(reader.POINT_ISA_POINT_REC_PT_CO_X,
-                                       reader.POINT_ISA_POINT_REC_PT_CO_Y)]
-
-        self.lines = [Line(self.points[abs(pk1) - 1], self.points[abs(pk2) - 1])
-                      for pk1, pk2 in zip(reader.LINE_ISA_LINE_REC_LN_PNT_1,
-                                          reader.LINE_ISA_LINE_REC_LN_PNT_2)]
-        logger.debug("Nodes")
-        self.nodes = [
-            Node(n + 1,
-                 reader.NODE_ISA_NODE_REC_ND_BND_CND[n],
-                 reader.NODE_ISA_NODE_REC_ND_PER_NOD[n],
-                 reader.NODE_ISA_ND_CO_RAD[n],
-                 reader.NODE_ISA_ND_CO_PHI[n],
-                 reader.NODE_ISA_NODE_REC_ND_CO_1[n],
-                 reader.NODE_ISA_NODE_REC_ND_CO_2[n],
-                 reader.NODE_ISA_NODE_REC_ND_VP_RE[n],
-                 reader.NODE_ISA_NODE_REC_ND_VP_IM[n])
-            for n in range(len(reader.NODE_ISA_NODE_REC_ND_BND_CND))]
-
-        logger.debug("Nodechains")
-        self.nodechains = []
-        for nc in range(len(reader.NDCHN_ISA_NDCHN_REC_NC_NOD_1)):
-            nd1 = reader.NDCHN_ISA_NDCHN_REC_NC_NOD_1[nc]
-            nd2 = reader.NDCHN_ISA_NDCHN_REC_NC_NOD_2[nc]
-            ndm = reader.NDCHN_ISA_NDCHN_REC_NC_NOD_MID[nc]
-            try:
-                node1 = self.nodes[abs(nd1) - 1]
-                nodem = self.nodes[ndm - 1]
-                node2 = self.nodes[abs(nd2) - 1]
-
-                if nd1 < 0 or nd2 < 0:
-                    nodes = node1, nodem, node2
-                elif ndm > 0:
-                    nodes = node1, nodem, node2
-                else:
-                    nodes = node1, None, node2
-
-                self.nodechains.append(
-                    NodeChain(nc + 1, nodes))
-            except IndexError:
-                logger.warning('IndexError in nodes')
-                raise  # preserve the stack trace
-
-        self.elements = []
-        logger.debug("Elements")
-        for e in range(len(reader.ELEM_ISA_EL_NOD_PNTR)):
-            ndkeys = []
-            ndk = reader.ELEM_ISA_EL_NOD_PNTR[e]
-
-            while ndk > 0:
-                ndkeys.append(reader.ELE_NOD_ISA_ND_KEY[ndk - 1])
-                ndk = reader.ELE_NOD_ISA_NXT_ND_PNTR[ndk - 1]
-
-            vertices = [self.nodes[k - 1] for k in ndkeys]
-            try:
-                loss_dens = reader.ELEM_ISA_ELEM_REC_LOSS_DENS[e]
-            except (IndexError, AttributeError):
-                loss_dens = 0
-            try:
-                temperature = reader.ELEM_ISA_ELEM_REC_TEMPERATURE[e]
-            except (IndexError, AttributeError):
-                temperature = 20
-            self.elements.append(
-                Element(e + 1,
-                        ElType(reader.ELEM_ISA_ELEM_REC_EL_TYP[e]),
-                        reader.ELEM_ISA_ELEM_REC_EL_SE_KEY[e] - 1,
-                        vertices,
-                        (reader.ELEM_ISA_ELEM_REC_EL_RELUC[e],
-                         reader.ELEM_ISA_ELEM_REC_EL_RELUC_2[e]),
-                        (reader.ELEM_ISA_ELEM_REC_EL_MAG_1[e],
-                         reader.ELEM_ISA_ELEM_REC_EL_MAG_2[e]),
-                        loss_dens,  # in W/m³
-                        reader.BR_TEMP_COEF/100,
-                        temperature)   # in 1/K
-            )
-
-        logger.debug("SuperElements")
-        self.superelements = []
-        for se in range(len(reader.SUPEL_ISA_SE_NDCHN_PNTR)):
-            nc_keys = []
-            nc_ptr = reader.SUPEL_ISA_SE_NDCHN_PNTR[se]
-
-            while nc_ptr > 0:
-                nc_keys.append(reader.SE_NDCHN_ISA_NC_KEY[nc_ptr - 1])
-                nc_ptr = reader.SE_NDCHN_ISA_NXT_NC_PNTR[nc_ptr - 1]
-
-            nodechains = []
-            for nck in nc_keys:
-                if nck > 0:
-                    nodechains.append(self.nodechains[abs(nck) - 1])
-                else:
-                    nodechains.append(self.nodechains[abs(nck) - 1].reverse())
-
-            el_keys = []
-            el_ptr = reader.SUPEL_ISA_SE_EL_PNTR[se]
-
-            while el_ptr > 0:
-                el_keys.append(reader.SE_EL_ISA_EL_KEY[el_ptr - 1])
-                el_ptr = reader.SE_EL_ISA_NXT_EL_PNTR[el_ptr - 1]
-
-            elements = [self.elements[elk - 1]
-                        for elk in el_keys]
-            try:
-                fillfactor = reader.SUPEL_ISA_SUPEL_REC_SE_FILLFACTOR[se]
-            except:
-                fillfactor = 1
-            try:
-                temp_coef = reader.SUPEL_ISA_SUPEL_REC_SE_TEMP_COEF[se]
-            except:
-                temp_coef = 0
-            try:
-                temperature = reader.SUPEL_ISA_SUPEL_REC_SE_TEMPERATURE[se]
-            except:
-                temperature = 20
-            self.superelements.append(
-                SuperElement(se + 1,
-                             reader.SUPEL_ISA_SUPEL_REC_SE_SR_KEY[se] - 1,
-                             elements,
-                             nodechains,
-                             reader.SUPEL_ISA_SUPEL_REC_SE_COL[se],
-                             nc_keys,
-                             reader.SUPEL_ISA_SUPEL_REC_SE_MCV_TYP[se],
-                             reader.SUPEL_ISA_SUPEL_REC_SE_COND_TYP[se],
-                             reader.SUPEL_ISA_SUPEL_REC_SE_CONDUC[se],
-                             reader.SUPEL_ISA_SUPEL_REC_SE_LENGHT[se],
-                             reader.SUPEL_ISA_SUPEL_REC_SE_VEL_SYS[se],
-                             reader.SUPEL_ISA_SUPEL_REC_SE_VELO_1[se],
-                             reader.SUPEL_ISA_SUPEL_REC_SE_VELO_2[se],
-                             reader.SUPEL_ISA_SUPEL_REC_SE_CURD_RE[se],
-                             reader.SUPEL_ISA_SUPEL_REC_SE_CURD_IM[se],
-                             fillfactor, temp_coef, temperature))
-
-        logger.debug("Subregions")
-        self.subregions = []
-        for sr in range(len(reader.SR_ISA_SR_SE_PNTR)):
-            se_keys = []
-            se_ptr = reader.SR_ISA_SR_SE_PNTR[sr]
-
-            while se_ptr > 0:
-                se_keys.append(reader.SR_SE_ISA_SE_KEY[se_ptr - 1])
-                se_ptr = reader.SR_SE_ISA_NXT_SE_PNTR[se_ptr - 1]
-
-            superelements = [self.superelements[sek - 1]
-                             for sek in se_keys]
-
-            nodechains = []
-            nc_keys = []
-            for se in superelements:
-                nc_keys.extend([abs(nc.key) for nc in se.nodechains])
-            nc_keys = [nck for nck, count
-                       in Counter(nc_keys).items() if count < 2]
-            for se in superelements:
-                nodechains.extend([nc
-                                   for nc in se.nodechains
-                                   if abs(nc.key) in nc_keys])
-
-            self.subregions.append(
-                SubRegion(sr + 1,
-                          reader.SR_ISA_SR_REC_SR_TYP[sr],
-                          reader.SR_ISA_SR_REC_SR_COL[sr],
-                          reader.SR_ISA_SR_REC_SR_NAME[sr].strip(),
-                          reader.SR_ISA_SR_REC_SR_NTURNS[sr],
-                          reader.SR_ISA_SR_REC_SR_CUR_DIR[sr],
-                          reader.SR_ISA_SR_REC_SR_WB_KEY[sr] - 1,
-                          superelements,
-                          nodechains))
-
-        logger.debug("Windings")
-        self.windings = []
-        try:
-            for wd in range(len(reader.WB_ISA_WB_SR_PNTR)):
-                sr_keys = []
-                sr_ptr = reader.WB_ISA_WB_SR_PNTR[wd]
-
-                while sr_ptr > 0:
-                    sr_keys.append(reader.WB_SR_ISA_SR_KEY[sr_ptr - 1])
-                    sr_ptr = reader.WB_SR_ISA_NXT_SR_PNTR[sr_ptr - 1]
-
-                subregions = [self.subregions[srk - 1]
-                              for srk in sr_keys]
-
-                self.windings.append(
-                    Winding(wd + 1,
-                            reader.WB_ISA_WB_REC_WB_NAME[wd],
-                            subregions,
-                            reader.WB_ISA_WB_REC_WB_TURN[wd],
-                            reader.WB_ISA_WB_REC_WB_GCUR_RE[wd],
-                            reader.WB_ISA_WB_REC_WB_GCUR_IM[wd],
-                            reader.WB_ISA_WB_REC_WB_IMPDZ_RE[wd],
-                            reader.WB_ISA_WB_REC_WB_IMPDZ_IM[wd],
-                            reader.WB_ISA_WB_REC_WB_VOLT_RE[wd],
-                            reader.WB_ISA_WB_REC_WB_VOLT_IM[wd]))
-        except:
-            pass
+        self._init_arrays(reader)
         logger.info("Total nodes %d elements %d superelements %d subregions %d",
-                    len(self.nodes), len(self.elements),
-                    len(self.superelements),
-                    len(self.subregions))
-
-        # positions of all elements
-        self.element_pos = np.array([e.center
-                                     for e in self.elements])
+                    len(self.node_xy), len(self.element_type),
+                    len(self.se_sr), len(reader.SR_ISA_SR_SE_PNTR))
 
         for a in ('FC_RADIUS', 'pole_pairs', 'poles_sim', 'move_action',
                   'layers', 'coil_span', 'delta_node_angle', 'speed',
@@ -807,81 +787,13 @@ class Isa7(object):
             # missing arm_length
             pass
 
-        self.airgap_inner_elements = [] # used for rotate
-        self.airgap_outer_elements = []
-        if getattr(self, 'FC_RADIUS', 0) > 0:  # Note: cosys r/phi only
-            # TODO: handle multiple airgaps
-            airgap_center_elements = []
-            for n in self.nodes:
-                n.outside = np.linalg.norm(n.xy) > self.FC_RADIUS
-
-            for e in self.elements:
-                outside = [v.outside
-                           for v in e.vertices]
-                if all(outside):
-                    self.airgap_outer_elements.append(e)
-                elif any(outside):
-                    airgap_center_elements.append(e)
-                else:
-                    self.airgap_inner_elements.append(e)
-
-            self.airgap_center_elements = sorted(airgap_center_elements,
-                                                 key=lambda e: np.arctan2(
-                                                     e.center[1], e.center[0]))
-        else:  # assume a linear machine
-            # TODO read and check pole_width
-            airgap_positions = []
-            self.airgap_center_elements = []
-            nxy = np.array([n.xy for n in self.nodes])
-            # width and height of model:
-            w, h = np.max(nxy[:, 0])-np.min(nxy[:, 0]), np.max(nxy[:, 1])-np.min(nxy[:, 1])
-            for se in self.superelements:
-                if (se.subregion is None and se.elements and not (
-                        se.elements[0].is_magnet() or
-                        se.elements[0].is_lamination()) and
-                    se.elements[0].el_type == ElType.LinearRectangle):
-                    axy = np.array([n.xy for e in se.elements
-                                    for n in e.vertices])
-                    # width and height of superelement
-                    sew = np.max(axy[:, 0])-np.min(axy[:, 0])
-                    seh = np.max(axy[:, 1])-np.min(axy[:, 1])
-                    if np.isclose(sew, w) or np.isclose(seh, h):
-                        horiz = sew > seh
-                        if horiz:
-                            airgap_positions.append(axy[0][1])
-                        else:
-                            airgap_positions.append(axy[0][0])
-                        self.airgap_center_elements.append(se.elements)
-
-            if self.airgap_center_elements:
-                # TODO check airgap center
-                self.airgap_center_elements = self.airgap_center_elements[-1]
-                if horiz:
-                    airgap_positions.append(np.min(nxy[:, 1]))
-                else:
-                    airgap_positions.append(np.max(nxy[:, 0]))
-            if airgap_positions:
-                amin, amax = min(airgap_positions), max(airgap_positions)
-
-                def is_outside(n):
-                    if horiz:
-                        return (n.y > amax or n.y < amin)
-                    return (n.x > amax or n.x < amin)
-
-                for n in self.nodes:
-                    n.outside = is_outside(n)
-
-                for e in self.elements:
-                    outside = [v.outside
-                               for v in e.vertices]
-                    if all(outside):
-                        self.airgap_outer_elements.append(e)
-                    elif not all(outside):
-                        self.airgap_inner_elements.append(e)
-
-        for se in self.superelements:
-            if se.nodechains:
-                se.outside = se.nodechains[0].node1.outside
+        if columnar:
+            # objects are created on first access (see _MeshList)
+            # from the arrays and the remaining mesh fields only
+            self._mesh = _MeshFields(reader)
+            self._init_mesh_lists(self._mesh)
+        else:
+            self._init_objects(reader)
 
         self.pos_el_fe_induction = np.asarray(reader.pos_el_fe_induction)
         if self.pos_el_fe_induction.shape[0]:
@@ -911,41 +823,56 @@ class Isa7(object):
         except AttributeError:
             pass
 
-        try:
-            flx_fac = 1000
-            if isinstance(reader.el_fe_induction_1, list):
-                pass
-            else:
-                if reader.el_fe_induction_1.dtype == 'int16':
-                    flx_fac = 1000
+        if getattr(reader, 'lazy', False) and \
+           not isinstance(reader.el_fe_induction_1, list):
+            # the arrays are read on demand (see nc.Variable)
+            el_fe_ind = [reader.el_fe_induction_1, reader.el_fe_induction_2]
+            eddy_cu_vpot = reader.eddy_cu_vpot
+            if isinstance(eddy_cu_vpot, list):
+                eddy_cu_vpot = np.array(eddy_cu_vpot)
+            pdim = self.pos_el_fe_induction.shape[0]
+            for v in el_fe_ind + [eddy_cu_vpot]:
+                if len(v.shape) == 4:
+                    v.limit(pdim, axis=1)
+            # the variables of the open file (see close)
+            self._lazy = [v for v in el_fe_ind + [eddy_cu_vpot]
+                          if not isinstance(v, np.ndarray)]
+        else:
+            try:
+                flx_fac = 1000
+                if isinstance(reader.el_fe_induction_1, list):
+                    pass
                 else:
-                    flx_fac = 1
-            el_fe_ind = [np.array(reader.el_fe_induction_1).T/flx_fac,
-                        np.array(reader.el_fe_induction_2).T/flx_fac]
-            eddy_cu_vpot = np.array(reader.eddy_cu_vpot).T/1000
-            if len(el_fe_ind[0].shape) == 4:
-                pdim = self.pos_el_fe_induction.shape[0]
-                if pdim < el_fe_ind[0].shape[1]:
-                    el_fe_ind = [el_fe_ind[0][:,:pdim, :, :],
-                                 el_fe_ind[1][:,:pdim, :, :]]
-                    eddy_cu_vpot = eddy_cu_vpot[:,:pdim, :, :]
-        except (ValueError, TypeError) as e:
-            # inhomogenous array
-            l = len(reader.el_fe_induction_1[0][0])
-            shape = []
-            for i in reader.el_fe_induction_1:
-                for j in i:
-                    n = 0
-                    for k in j:
-                        if len(k) < l:
-                            break
-                        n += 1
-                    if n > 0:
-                        shape.append(n)
-
-            el_fe_ind = [np.array([[reader.el_fe_induction_1[0][0][:shape[0]]]]).T/flx_fac,
-                        np.array([[reader.el_fe_induction_2[0][0][:shape[0]]]]).T/flx_fac]
-            eddy_cu_vpot = np.array([[reader.eddy_cu_vpot[0][0][:shape[0]]]]).T/1000
+                    if reader.el_fe_induction_1.dtype == 'int16':
+                        flx_fac = 1000
+                    else:
+                        flx_fac = 1
+                el_fe_ind = [np.array(reader.el_fe_induction_1).T/flx_fac,
+                            np.array(reader.el_fe_induction_2).T/flx_fac]
+                eddy_cu_vpot = np.array(reader.eddy_cu_vpot).T/1000
+                if len(el_fe_ind[0].shape) == 4:
+                    pdim = self.pos_el_fe_induction.shape[0]
+                    if pdim < el_fe_ind[0].shape[1]:
+                        el_fe_ind = [el_fe_ind[0][:,:pdim, :, :],
+                                     el_fe_ind[1][:,:pdim, :, :]]
+                        eddy_cu_vpot = eddy_cu_vpot[:,:pdim, :, :]
+            except (ValueError, TypeError) as e:
+                # inhomogenous array
+                l = len(reader.el_fe_induction_1[0][0])
+                shape = []
+                for i in reader.el_fe_induction_1:
+                    for j in i:
+                        n = 0
+                        for k in j:
+                            if len(k) < l:
+                                break
+                            n += 1
+                        if n > 0:
+                            shape.append(n)
+
+                el_fe_ind = [np.array([[reader.el_fe_induction_1[0][0][:shape[0]]]]).T/flx_fac,
+                            np.array([[reader.el_fe_induction_2[0][0][:shape[0]]]]).T/flx_fac]
+                eddy_cu_vpot = np.array([[reader.eddy_cu_vpot[0][0][:shape[0]]]]).T/1000
 
         self.el_fe_induction_1 = el_fe_ind[0]
         self.el_fe_induction_2 = el_fe_ind[1]
@@ -958,6 +885,420 @@ class Isa7(object):
         self.iron_loss_coefficients = getattr(
             reader, 'iron_loss_coefficients', [])
 
+    def _init_arrays(self, reader):
+        """create the columnar mesh model: node coordinates,
+        element-node connectivity (CSR), element and superelement index arrays
+        and the node and element values"""
+        self.node_xy = np.column_stack(
+            (np.asarray(reader.NODE_ISA_NODE_REC_ND_CO_1),
+             np.asarray(reader.NODE_ISA_NODE_REC_ND_CO_2)))
+
+        self.element_node_ptr, self.element_node_idx = _linked_lists(
+            reader.ELEM_ISA_EL_NOD_PNTR, reader.ELE_NOD_ISA_ND_KEY,
+            reader.ELE_NOD_ISA_NXT_ND_PNTR)
+
+        self.element_type = np.asarray(reader.ELEM_ISA_ELEM_REC_EL_TYP,
+                                       dtype=int)
+        self.element_se = np.asarray(reader.ELEM_ISA_ELEM_REC_EL_SE_KEY,
+                                     dtype=int) - 1
+        self.se_sr = np.asarray(reader.SUPEL_ISA_SUPEL_REC_SE_SR_KEY,
+                                dtype=int) - 1
+        self.se_length = np.asarray(reader.SUPEL_ISA_SUPEL_REC_SE_LENGHT)
+        self.se_element_ptr, self.se_element_idx = _linked_lists(
+            reader.SUPEL_ISA_SE_EL_PNTR, reader.SE_EL_ISA_EL_KEY,
+            reader.SE_EL_ISA_NXT_EL_PNTR)
+
+        # node indexes of the nodechains (-1: no mid node)
+        nd1 = np.asarray(reader.NDCHN_ISA_NDCHN_REC_NC_NOD_1, dtype=int)
+        nd2 = np.asarray(reader.NDCHN_ISA_NDCHN_REC_NC_NOD_2, dtype=int)
+        ndm = np.asarray(reader.NDCHN_ISA_NDCHN_REC_NC_NOD_MID, dtype=int)
+        self.nodechain_nodes = np.column_stack(
+            (np.abs(nd1) - 1,
+             np.where((ndm > 0) | (nd1 < 0) | (nd2 < 0),
+                      (ndm - 1) % max(len(self.node_xy), 1), -1),
+             np.abs(nd2) - 1))
+
+        # subregion names, current directions and winding keys
+        self.sr_name = [n.strip() for n in reader.SR_ISA_SR_REC_SR_NAME]
+        self.sr_curdir = np.asarray(reader.SR_ISA_SR_REC_SR_CUR_DIR,
+                                    dtype=int)
+        self.sr_wb = np.asarray(reader.SR_ISA_SR_REC_SR_WB_KEY, dtype=int) - 1
+        # winding indexes of the subregions (-1: none)
+        self.sr_winding = np.full(len(self.sr_name), -1)
+        try:
+            ptr, idx = _linked_lists(reader.WB_ISA_WB_SR_PNTR,
+                                     reader.WB_SR_ISA_SR_KEY,
+                                     reader.WB_SR_ISA_NXT_SR_PNTR)
+            self.sr_winding[idx] = np.repeat(np.arange(len(ptr) - 1),
+                                             np.diff(ptr))
+        except (AttributeError, IndexError):
+            pass
+
+        # node and element values
+        self.node_bndcnd = np.asarray(reader.NODE_ISA_NODE_REC_ND_BND_CND,
+                                      dtype=int)
+        self.node_pernod = np.asarray(reader.NODE_ISA_NODE_REC_ND_PER_NOD,
+                                      dtype=int)
+        self.node_vpot = np.column_stack(
+            (np.asarray(reader.NODE_ISA_NODE_REC_ND_VP_RE),
+             np.asarray(reader.NODE_ISA_NODE_REC_ND_VP_IM)))
+        self.element_reluc = np.column_stack(
+            (np.asarray(reader.ELEM_ISA_ELEM_REC_EL_RELUC),
+             np.asarray(reader.ELEM_ISA_ELEM_REC_EL_RELUC_2)))
+        self.element_mag = np.column_stack(
+            (np.asarray(reader.ELEM_ISA_ELEM_REC_EL_MAG_1),
+             np.asarray(reader.ELEM_ISA_ELEM_REC_EL_MAG_2)))
+        self.element_loss_density = np.zeros(len(self.element_type))
+        loss_dens = np.asarray(
+            getattr(reader, 'ELEM_ISA_ELEM_REC_LOSS_DENS', []))
+        n = min(len(loss_dens), len(self.element_type))
+        self.element_loss_density[:n] = loss_dens[:n]
+
+        # positions of all elements
+        nvert = np.diff(self.element_node_ptr)
+        self.element_pos = np.empty((len(nvert), 2), dtype=self.node_xy.dtype)
+        for n in np.unique(nvert):
+            sel = np.nonzero(nvert == n)[0]
+            self.element_pos[sel] = np.sum(
+                self.node_xy[self._vertex_index(sel, n)], axis=1)/int(n)
+
+    def _vertex_index(self, sel, n):
+        """return node indexes of the first n vertices of elements sel"""
+        return self.element_node_idx[
+            self.element_node_ptr[sel][:, None] + np.arange(n)]
+
+    def element_area(self):
+        """return areas of all elements (same order as elements)"""
+        try:
+            return self._element_area
+        except AttributeError:
+            pass
+        self._element_area = np.full(len(self.element_type), np.nan,
+                                     dtype=self.node_xy.dtype)
+        for eltype, n in ((ElType.LinearTriangle, 3),
+                          (ElType.LinearRectangle, 4),
+                          (ElType.SquareTriangle, 6),
+                          (ElType.SquareRectangle, 8)):
+            sel = np.nonzero(self.element_type == eltype.value)[0]
+            if len(sel) == 0:
+                continue
+            v = self._vertex_index(sel, n)
+            x, y = self.node_xy[v, 0], self.node_xy[v, 1]
+            if eltype == ElType.LinearTriangle:
+                a = ((x[:, 2] - x[:, 1]) * (y[:, 0] - y[:, 1]) -
+                     (y[:, 2] - y[:, 1]) * (x[:, 0] - x[:, 1]))/2
+            elif eltype == ElType.LinearRectangle:
+                a = ((x[:, 2] - x[:, 1]) * (y[:, 0] - y[:, 1]) -
+                     (y[:, 2] - y[:, 1]) * (x[:, 0] - x[:, 1]) +
+                     (x[:, 3] - x[:, 2]) * (y[:, 0] - y[:, 2]) -
+                     (y[:, 3] - y[:, 2]) * (x[:, 0] - x[:, 2]))/2
+            elif eltype == ElType.SquareTriangle:
+                a = ((x[:, 4] - x[:, 2]) * (y[:, 0] - y[:, 2]) -
+                     (y[:, 4] - y[:, 1]) * (x[:, 0] - x[:, 2]))/2
+            else:
+                a = ((x[:, 4] - x[:, 2]) * (y[:, 0] - y[:, 2]) -
+                     (y[:, 4] - y[:, 2]) * (x[:, 0] - x[:, 2]) +
+                     (x[:, 6] - x[:, 4]) * (y[:, 0] - y[:, 4]) -
+                     (y[:, 6] - y[:, 4]) * (x[:, 0] - x[:, 4]))/2
+            self._element_area[sel] = a
+        return self._element_area
+
+    def close(self):
+        """close the file of arrays that are read on demand
+        (see nc.read(lazy=True))"""
+        for v in getattr(self, '_lazy', []):
+            v.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def airgap_index(self):
+        """return the outside flags of all nodes and the indexes of the
+        inner, center and outer airgap elements"""
+        try:
+            return self._airgap_index
+        except AttributeError:
+            pass
+        xy = self.node_xy
+        outside = np.ones(len(xy), dtype=bool)
+        inner = center = outer = np.zeros(0, dtype=int)
+        nvert = np.diff(self.element_node_ptr)
+        elidx = np.repeat(np.arange(len(nvert)), nvert)
+        if getattr(self, 'FC_RADIUS', 0) > 0:  # Note: cosys r/phi only
+            # TODO: handle multiple airgaps
+            outside = np.linalg.norm(xy, axis=1) > self.FC_RADIUS
+            nout = np.bincount(elidx, outside[self.element_node_idx],
+                               minlength=len(nvert))
+            outer = np.nonzero(nout == nvert)[0]
+            center = np.nonzero((nout > 0) & (nout < nvert))[0]
+            inner = np.nonzero(nout == 0)[0]
+            pos = self.element_pos[center]
+            center = center[np.argsort(np.arctan2(pos[:, 1], pos[:, 0]),
+                                       kind='stable')]
+        elif len(xy):  # assume a linear machine
+            # TODO read and check pole_width
+            airgap_positions = []
+            # width and height of model:
+            w, h = np.max(xy, axis=0) - np.min(xy, axis=0)
+            mag, reluc = self.element_mag, self.element_reluc
+            ptr = self.se_element_ptr
+            for se in np.nonzero(self.se_sr == -1)[0]:
+                el = self.se_element_idx[ptr[se]:ptr[se+1]]
+                if not len(el):
+                    continue
+                is_magnet = np.any(np.abs(mag[el[0]]) > 1e-5)
+                is_lamination = (np.any(reluc[el[0]] != 1.0) and
+                                 np.all(mag[el[0]] == 0.0))
+                if (is_magnet or is_lamination or self.element_type[el[0]] !=
+                        ElType.LinearRectangle.value):
+                    continue
+                axy = xy[np.concatenate(
+                    [self.element_node_idx[self.element_node_ptr[e]:
+                                           self.element_node_ptr[e+1]]
+                     for e in el])]
+                # width and height of superelement
+                sew, seh = np.max(axy, axis=0) - np.min(axy, axis=0)
+                if np.isclose(sew, w) or np.isclose(seh, h):
+                    horiz = sew > seh
+                    airgap_positions.append(axy[0][1] if horiz
+                                            else axy[0][0])
+                    center = el
+
+            if airgap_positions:
+                # TODO check airgap center
+                if horiz:
+                    airgap_positions.append(np.min(xy[:, 1]))
+                else:
+                    airgap_positions.append(np.max(xy[:, 0]))
+                amin, amax = min(airgap_positions), max(airgap_positions)
+                c = xy[:, 1] if horiz else xy[:, 0]
+                outside = (c > amax) | (c < amin)
+                nout = np.bincount(elidx, outside[self.element_node_idx],
+                                   minlength=len(nvert))
+                outer = np.nonzero(nout == nvert)[0]
+                inner = np.nonzero(nout < nvert)[0]
+
+        self._airgap_index = outside, inner, center, outer
+        return self._airgap_index
+
+    def _init_objects(self, reader):
+        """create the object model (nodes, elements, superelements ..)"""
+        self._init_mesh_lists(reader)
+        for name in ('points', 'lines', 'nodes', 'nodechains', 'elements',
+                     'superelements', 'subregions', 'windings',
+                     'airgap_inner_elements', 'airgap_outer_elements',
+                     'airgap_center_elements'):
+            setattr(self, name, list(getattr(self, name)))
+
+    def _init_mesh_lists(self, src):
+        """create the lists of points, lines, nodes .. objects whose items
+        are created on first access from the arrays and the mesh fields src
+        (reader or _MeshFields)"""
+        _, inner, center, outer = self.airgap_index()
+        self.points = _MeshList(len(src.POINT_ISA_POINT_REC_PT_CO_X),
+                                functools.partial(self._create_point, src))
+        self.lines = _MeshList(len(src.LINE_ISA_LINE_REC_LN_PNT_1),
+                               functools.partial(self._create_line, src))
+        self.nodes = _MeshList(len(self.node_xy),
+                               functools.partial(self._create_node, src))
+        self.nodechains = _MeshList(len(self.nodechain_nodes),
+                                    self._create_nodechain)
+        self.elements = _MeshList(len(self.element_type),
+                                  functools.partial(self._create_element, src))
+        self.superelements = _MeshList(
+            len(self.se_sr), functools.partial(self._create_superelement, src))
+        self.subregions = _MeshList(
+            len(self.sr_name), functools.partial(self._create_subregion, src))
+        try:
+            num_windings = len(src.WB_ISA_WB_SR_PNTR)
+        except AttributeError:
+            num_windings = 0
+        self.windings = _MeshList(
+            num_windings, functools.partial(self._create_winding, src))
+        # used for rotate
+        self.airgap_inner_elements = _MeshList(
+            len(inner), functools.partial(self._create_airgap_element, inner))
+        self.airgap_outer_elements = _MeshList(
+            len(outer), functools.partial(self._create_airgap_element, outer))
+        self.airgap_center_elements = _MeshList(
+            len(center), functools.partial(self._create_airgap_element, center))
+
+    def _create_point(self, src, i):
+        return Point(src.POINT_ISA_POINT_REC_PT_CO_X[i],
+                     src.POINT_ISA_POINT_REC_PT_CO_Y[i])
+
+    def _create_line(self, src, i):
+        return Line(self.points[abs(src.LINE_ISA_LINE_REC_LN_PNT_1[i]) - 1],
+                    self.points[abs(src.LINE_ISA_LINE_REC_LN_PNT_2[i]) - 1])
+
+    def _create_node(self, src, n):
+        # the values keep the type of the source fields
+        node = Node(n + 1,
+                    self.node_bndcnd[n],
+                    self.node_pernod[n],
+                    src.NODE_ISA_ND_CO_RAD[n],
+                    src.NODE_ISA_ND_CO_PHI[n],
+                    *self.node_xy[n],
+                    *self.node_vpot[n])
+        node.outside = self.airgap_index()[0][n]
+        return node
+
+    def _create_nodechain(self, i):
+        nodes = [self.nodes[n] if n >= 0 else None
+                 for n in self.nodechain_nodes[i].tolist()]
+        return NodeChain(i + 1, nodes)
+
+    def _create_element(self, src, e):
+        # the element is created with its superelement
+        self.superelements[self.element_se[e]]
+        return self.elements.items[e] or self._new_element(src, e)
+
+    def _new_element(self, src, e):
+        ptr = self.element_node_ptr
+        vertices = [self.nodes[k]
+                    for k in self.element_node_idx[ptr[e]:ptr[e+1]].tolist()]
+        try:
+            temperature = src.ELEM_ISA_ELEM_REC_TEMPERATURE[e]
+        except (IndexError, AttributeError):
+            temperature = 20
+        el = Element(e + 1,
+                     ElType(self.element_type[e]),
+                     self.element_se[e].item(),
+                     vertices,
+                     tuple(self.element_reluc[e]),
+                     tuple(self.element_mag[e]),
+                     self.element_loss_density[e].item(),  # in W/m³
+                     src.BR_TEMP_COEF/100,  # in 1/K
+                     temperature)
+        self.elements.items[e] = el
+        return el
+
+    def _create_superelement(self, src, se):
+        # the superelement is created with its subregion and winding
+        superelement = self._new_superelement(src, se)
+        if self.se_sr[se] >= 0:
+            self.subregions[self.se_sr[se]]
+        return superelement
+
+    def _new_superelement(self, src, se):
+        if self.superelements.items[se] is not None:
+            return self.superelements.items[se]
+        nc_keys = []
+        nc_ptr = src.SUPEL_ISA_SE_NDCHN_PNTR[se]
+        while nc_ptr > 0:
+            nc_keys.append(src.SE_NDCHN_ISA_NC_KEY[nc_ptr - 1])
+            nc_ptr = src.SE_NDCHN_ISA_NXT_NC_PNTR[nc_ptr - 1]
+
+        nodechains = []
+        for nck in nc_keys:
+            if nck > 0:
+                nodechains.append(self.nodechains[abs(nck) - 1])
+            else:
+                nodechains.append(self.nodechains[abs(nck) - 1].reverse())
+
+        ptr = self.se_element_ptr
+        elements = [self.elements.items[e] or self._new_element(src, e)
+                    for e in self.se_element_idx[ptr[se]:ptr[se+1]].tolist()]
+        try:
+            fillfactor = src.SUPEL_ISA_SUPEL_REC_SE_FILLFACTOR[se]
+        except:
+            fillfactor = 1
+        try:
+            temp_coef = src.SUPEL_ISA_SUPEL_REC_SE_TEMP_COEF[se]
+        except:
+            temp_coef = 0
+        try:
+            temperature = src.SUPEL_ISA_SUPEL_REC_SE_TEMPERATURE[se]
+        except:
+            temperature = 20
+        superelement = SuperElement(se + 1,
+                                    self.se_sr[se].item(),
+                                    elements,
+                                    nodechains,
+                                    src.SUPEL_ISA_SUPEL_REC_SE_COL[se],
+                                    nc_keys,
+                                    src.SUPEL_ISA_SUPEL_REC_SE_MCV_TYP[se],
+                                    src.SUPEL_ISA_SUPEL_REC_SE_COND_TYP[se],
+                                    src.SUPEL_ISA_SUPEL_REC_SE_CONDUC[se],
+                                    self.se_length[se],
+                                    src.SUPEL_ISA_SUPEL_REC_SE_VEL_SYS[se],
+                                    src.SUPEL_ISA_SUPEL_REC_SE_VELO_1[se],
+                                    src.SUPEL_ISA_SUPEL_REC_SE_VELO_2[se],
+                                    src.SUPEL_ISA_SUPEL_REC_SE_CURD_RE[se],
+                                    src.SUPEL_ISA_SUPEL_REC_SE_CURD_IM[se],
+                                    fillfactor, temp_coef, temperature)
+        if nodechains:
+            superelement.outside = nodechains[0].node1.outside
+        self.superelements.items[se] = superelement
+        return superelement
+
+    def _create_subregion(self, src, sr):
+        subregion = self._new_subregion(src, sr)
+        if self.sr_winding[sr] >= 0:
+            self.windings[self.sr_winding[sr]]
+        return subregion
+
+    def _new_subregion(self, src, sr):
+        if self.subregions.items[sr] is not None:
+            return self.subregions.items[sr]
+        se_keys = []
+        se_ptr = src.SR_ISA_SR_SE_PNTR[sr]
+        while se_ptr > 0:
+            se_keys.append(src.SR_SE_ISA_SE_KEY[se_ptr - 1])
+            se_ptr = src.SR_SE_ISA_NXT_SE_PNTR[se_ptr - 1]
+
+        superelements = [self._new_superelement(src, sek - 1)
+                         for sek in se_keys]
+
+        nodechains = []
+        nc_keys = []
+        for se in superelements:
+            nc_keys.extend([abs(nc.key) for nc in se.nodechains])
+        nc_keys = [nck for nck, count
+                   in Counter(nc_keys).items() if count < 2]
+        for se in superelements:
+            nodechains.extend([nc
+                               for nc in se.nodechains
+                               if abs(nc.key) in nc_keys])
+
+        subregion = SubRegion(sr + 1,
+                              src.SR_ISA_SR_REC_SR_TYP[sr],
+                              src.SR_ISA_SR_REC_SR_COL[sr],
+                              self.sr_name[sr],
+                              src.SR_ISA_SR_REC_SR_NTURNS[sr],
+                              self.sr_curdir[sr].item(),
+                              self.sr_wb[sr].item(),
+                              superelements,
+                              nodechains)
+        self.subregions.items[sr] = subregion
+        return subregion
+
+    def _create_winding(self, src, wd):
+        sr_keys = []
+        sr_ptr = src.WB_ISA_WB_SR_PNTR[wd]
+        while sr_ptr > 0:
+            sr_keys.append(src.WB_SR_ISA_SR_KEY[sr_ptr - 1])
+            sr_ptr = src.WB_SR_ISA_NXT_SR_PNTR[sr_ptr - 1]
+
+        subregions = [self._new_subregion(src, srk - 1)
+                      for srk in sr_keys]
+        return Winding(wd + 1,
+                       src.WB_ISA_WB_REC_WB_NAME[wd],
+                       subregions,
+                       src.WB_ISA_WB_REC_WB_TURN[wd],
+                       src.WB_ISA_WB_REC_WB_GCUR_RE[wd],
+                       src.WB_ISA_WB_REC_WB_GCUR_IM[wd],
+                       src.WB_ISA_WB_REC_WB_IMPDZ_RE[wd],
+                       src.WB_ISA_WB_REC_WB_IMPDZ_IM[wd],
+                       src.WB_ISA_WB_REC_WB_VOLT_RE[wd],
+                       src.WB_ISA_WB_REC_WB_VOLT_IM[wd])
+
+    def _create_airgap_element(self, index, i):
+        return self.elements[index[i]]
+
     def get_subregion(self, name):
         """return subregion by name"""
         for s in self.subregions:
@@ -979,8 +1320,110 @@ class Isa7(object):
         """return elements which are magnets"""
         return [e for e in self.elements if e.is_magnet()]
 
+    def _element_grid(self):
+        """return uniform grid of element bounding boxes
+        (created on first call)"""
+        try:
+            return self._grid
+        except AttributeError:
+            pass
+        ptr = self.element_node_ptr
+        nvert = np.diff(ptr)
+        # corner nodes of all elements (quadratic elements: every 2nd node)
+        ncorners = np.where((self.element_type == ElType.LinearRectangle.value) |
+                            (self.element_type == ElType.SquareRectangle.value),
+                            4, 3)
+        ncorners = np.minimum(ncorners, nvert)
+        step = np.where(self.element_type > ElType.LinearRectangle.value, 2, 1)
+        corners = np.full((len(nvert), 4), -1)
+        for k in range(4):
+            c = ncorners > k
+            corners[c, k] = self.element_node_idx[ptr[:-1][c] + step[c]*k]
+
+        exy = self.node_xy[self.element_node_idx]
+        bbmin = np.minimum.reduceat(exy, ptr[:-1], axis=0)
+        bbmax = np.maximum.reduceat(exy, ptr[:-1], axis=0)
+        origin = np.min(bbmin, axis=0)
+        w, h = np.max(bbmax, axis=0) - origin
+        size = max(np.sqrt(w*h/len(nvert)), 1e-3*max(w, h), 1e-12)
+        shape = np.array((int(w/size) + 1, int(h/size) + 1))
+
+        # register each element in all cells covered by its bounding box
+        ij0 = np.minimum(((bbmin - origin)/size).astype(int), shape - 1)
+        ij1 = np.minimum(((bbmax - origin)/size).astype(int), shape - 1)
+        nij = ij1 - ij0 + 1
+        counts = nij[:, 0]*nij[:, 1]
+        el = np.repeat(np.arange(len(nvert)), counts)
+        k = np.arange(len(el)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell = ((ij0[el, 0] + k // nij[el, 1])*shape[1] +
+                ij0[el, 1] + k % nij[el, 1])
+        order = np.argsort(cell, kind='stable')
+        cell_ptr = np.searchsorted(cell[order], np.arange(shape[0]*shape[1] + 1))
+        self._grid = dict(origin=origin, size=size, shape=shape,
+                          cell_ptr=cell_ptr, cell_elements=el[order],
+                          corners=corners, step=step)
+        return self._grid
+
+    def get_elements(self, xy):
+        """return keys and barycentric weights of the elements at positions xy
+
+        Args:
+          xy: (n, 2) array of positions
+
+        Returns:
+          keys: (n,) array of element keys (0 if position is not in the mesh)
+          weights: (n, m) array of weights of the element vertices
+            (m: max number of vertices per element). Quadrilateral elements
+            are split into 2 triangles, the weights of midside nodes are 0.
+        """
+        xy = np.atleast_2d(np.asarray(xy, dtype=float))
+        n = len(xy)
+        keys = np.zeros(n, dtype=int)
+        weights = np.zeros((n, np.max(np.diff(self.element_node_ptr),
+                                      initial=0)))
+        if not len(self.element_type):
+            return keys, weights
+        grid = self._element_grid()
+        ij = np.floor((xy - grid['origin'])/grid['size']).astype(int)
+        ingrid = np.all((ij >= 0) & (ij < grid['shape']), axis=1)
+        cell = np.where(ingrid, ij[:, 0]*grid['shape'][1] + ij[:, 1], 0)
+        start = grid['cell_ptr'][cell]
+        counts = np.where(ingrid, grid['cell_ptr'][cell + 1] - start, 0)
+
+        # all pairs of positions and candidate elements
+        pt = np.repeat(np.arange(n), counts)
+        k = np.arange(len(pt)) - np.repeat(np.cumsum(counts) - counts, counts)
+        el = grid['cell_elements'][np.repeat(start, counts) + k]
+        corners = grid['corners'][el]
+        px, py = xy[pt, 0], xy[pt, 1]
+        for a, b, c in ((0, 1, 2), (0, 2, 3)):
+            valid = (corners[:, c] >= 0) & (keys[pt] == 0)
+            xa, ya = self.node_xy[corners[:, a]].T
+            xb, yb = self.node_xy[corners[:, b]].T
+            xc, yc = self.node_xy[corners[:, c]].T
+            det = (yb - yc)*(xa - xc) + (xc - xb)*(ya - yc)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                l1 = ((yb - yc)*(px - xc) + (xc - xb)*(py - yc))/det
+                l2 = ((yc - ya)*(px - xc) + (xa - xc)*(py - yc))/det
+            l3 = 1 - l1 - l2
+            eps = -1e-9
+            hit = np.nonzero(valid & (det != 0) &
+                             (l1 >= eps) & (l2 >= eps) & (l3 >= eps))[0]
+            # first matching element of each position
+            hit = hit[np.unique(pt[hit], return_index=True)[1]]
+            p, e = pt[hit], el[hit]
+            keys[p] = e + 1
+            step = grid['step'][e]
+            for v, lam in ((a, l1), (b, l2), (c, l3)):
+                weights[p, step*v] = lam[hit]
+        return keys, weights
+
     def get_element(self, x, y):
         """return element at pos x,y"""
+        keys, _ = self.get_elements((x, y))
+        if keys[0]:
+            return self.elements[keys[0] - 1]
+        # not in the mesh: take the nearest element
         k = np.argmin(np.linalg.norm(self.element_pos - (x, y), axis=1))
         return self.elements[k]
 
@@ -988,8 +1431,7 @@ class Isa7(object):
         """return superelement at pos x,y"""
         e = self.get_element(x, y)
         try:
-            return [s for s in self.superelements
-                    if e.key in [se.key for se in s.elements]][0]
+            return self.superelements[self.element_se[e.key - 1]]
         except IndexError:
             return None
 
@@ -1104,7 +1546,8 @@ class Isa7(object):
         return b/a  # ecc: np.sqrt(1-b**2/a**2))
 
 
-    def calc_iron_loss(self, icur: int, ibeta: int, pfefun, bmin=0.1) -> dict:
+    def calc_iron_loss(self, icur: int, ibeta: int, pfefun, bmin=0.1,
+                       batch=False) -> dict:
         """ calculate iron loss using last simulation results
 
         Args:
@@ -1116,6 +1559,9 @@ class Isa7(object):
             losscoeffs (dict): material properties
             axr: float (optional)
           bmin (float): lower limit of flux density amplitudes
+          batch (bool): process all elements of a material at once
+            (pfefun is called with the harmonics of all these elements
+            and must evaluate its arrays elementwise)
 
         Returns:
           loss values name of subregion (string),
@@ -1134,6 +1580,9 @@ class Isa7(object):
                if p < 2*np.pi/self.pole_pairs] + [2*np.pi/self.pole_pairs]
         apos = np.array(pos)/np.pi*180
         i = len(pos)
+        if batch:
+            return self._calc_iron_loss_batch(icur, ibeta, pfefun, bmin,
+                                              need_axratio, apos, i)
         sreg = {}
         f1 = self.speed/60
         scf = self.scale_factor()
@@ -1182,6 +1631,64 @@ class Isa7(object):
                 sreg[sr.name] = [0,0,0]
         return sreg
 
+    def _calc_iron_loss_batch(self, icur, ibeta, pfefun, bmin,
+                              need_axratio, apos, i):
+        """vectorized calc_iron_loss: one fft of all iron elements and
+        one pfefun call per material"""
+        f1 = self.speed/60
+        scf = self.scale_factor()
+        subregions = [self.get_subregion(sname)
+                      for sname in self.get_iron_subregions()]
+        keys, srk, mcv = [], [], []
+        for k, sr in enumerate(subregions):
+            for se in sr.superelements:
+                keys += [e.key - 1 for e in se.elements]
+                srk += [k]*len(se.elements)
+                mcv += [se.mcvtype]*len(se.elements)
+        keys, srk, mcv = np.array(keys, dtype=int), np.array(srk), np.array(mcv)
+        br = np.asarray(self.el_fe_induction_1[keys, 0:i+1, icur, ibeta])
+        bt = np.asarray(self.el_fe_induction_2[keys, 0:i+1, icur, ibeta])
+        b1, nmax1 = _harmonic_amplitudes(apos, br)
+        b2, nmax2 = _harmonic_amplitudes(apos, bt)
+        # harmonics beyond nmax are zero (padded) or ignored (see calc_iron_loss)
+        nue = np.arange(b1.shape[1])
+        b1[nue >= nmax1[:, None]] = 0
+        b2[nue >= nmax2[:, None]] = 0
+        blen = np.maximum(nmax1, nmax2)
+        nharm = np.where(blen > 7, blen, nmax2)
+        rows, nue = np.nonzero((nue < nharm[:, None]) &
+                               ((b1 > bmin) | (b2 > bmin)))
+        if need_axratio:
+            axr = _axis_ratios(apos, br, bt, self.pole_pairs)
+
+        losses = np.zeros((len(keys), 3))
+        for m in np.unique(mcv[rows]):
+            lc = self.iron_loss_coefficients[m-1]
+            r = rows[mcv[rows] == m]
+            n = nue[mcv[rows] == m]
+            args = (b1[r, n]/lc['fillfactor'], b2[r, n]/lc['fillfactor'],
+                    f1*n.astype(float), lc)
+            if need_axratio:
+                args = args + (axr[r],)
+            for j, p in enumerate(pfefun(*args)):
+                if np.size(p) != len(r):
+                    raise ValueError(
+                        "calc_iron_loss(batch=True) requires elementwise "
+                        "pfefun results: got size {} for {} "
+                        "harmonics".format(np.size(p), len(r)))
+                losses[:, j] += np.bincount(r, weights=np.ravel(p),
+                                            minlength=len(keys))
+        spw = np.array([self.iron_loss_coefficients[m-1]['spec_weight']
+                        for m in mcv])
+        losses *= 1e3*(spw*self.element_area()[keys])[:, None]
+
+        sreg = {}
+        for k, sr in enumerate(subregions):
+            logger.debug("%s: %s", sr.name, losses[srk == k])
+            sreg[sr.name] = (scf*self.arm_length*np.sum(
+                losses[srk == k], axis=0)).tolist()
+        return sreg
+
     def get_minmax_temp(self):
         def node_subregion(subregion_name):
             node_temperature = []
@@ -1221,8 +1728,20 @@ class Isa7(object):
         return component_temperature
 
     def flux_dens(self, x, y, icur, ibeta):
-        el = self.get_element(x, y)
-        return self.flux_density(el, icur, ibeta)
+        """return move pos and flux density (bx, by) at pos x, y
+        (x, y: scalars or arrays of positions)"""
+        if np.isscalar(x):
+            el = self.get_element(x, y)
+            return self.flux_density(el, icur, ibeta)
+        keys, _ = self.get_elements(np.column_stack((np.ravel(x),
+                                                     np.ravel(y))))
+        b1 = self.el_fe_induction_1[keys - 1, :, icur, ibeta]
+        b2 = self.el_fe_induction_2[keys - 1, :, icur, ibeta]
+        b1[keys == 0], b2[keys == 0] = np.nan, np.nan
+        return dict(
+            pos=self.pos_el_fe_induction,
+            bx=b1,
+            by=b2)
 
     def demagnetization(self, el, icur, ibeta):
         """return demagnetization Hx, Hy at element
@@ -1719,19 +2238,21 @@ class Winding(BaseEntity):
         return [e for s in self.subregions for e in s.elements()]
 
 
-def read(filename):
+def read(filename, use_mmap=False, columnar=False):
     """
     Read ISA7 file and return ISA7 object.
 
     Arguments:
         filename: name of I7/ISA7 file to be read
+        use_mmap: (bool) map the file into memory instead of reading it
+        columnar: (bool) create mesh objects on first access only
     """
     import os
     ext = os.path.splitext(filename)[-1]
     if not ext:
         ext = '.I7' if sys.platform == 'win32' else '.ISA7'
         filename += ext
-    isa = Isa7(Reader(filename))
+    isa = Isa7(Reader(filename, use_mmap), columnar)
     return isa
 
 
@@ -1,107 +1,207 @@
 import numpy as np
 import scipy.interpolate as ip
 import logging
-import multiprocessing
+import pickle
 from .utils import betai1
 from .pm import PmRelMachineLdq, PmRelMachinePsidq, PmRelMachine
 from .sm import SynchronousMachine, SynchronousMachineLdq, SynchronousMachinePsidq
+from .im import InductionMachine
 from . import create_from_eecpars
 
 logger = logging.getLogger("femagtools.effloss")
 
 
-def iqd_tmech_umax(m, u1, with_mtpa, progress, speed_torque, iq, id, iex):
-    """calculate iq, id for each load (n, T) from speed_torque at voltage u1
+# machine and result array of the worker processes of IqdPool
+_worker = {}
+
+
+def _attach(shmname):
+    """return the result array block shmname (attached once per map)"""
+    from multiprocessing import shared_memory
+    shm = _worker.get('result')
+    if shm is None or shm.name != shmname:
+        if shm is not None:
+            shm.close()
+        # the blocks are unlinked by the parent process
+        shm = _worker['result'] = shared_memory.SharedMemory(name=shmname)
+    return shm
+
+
+def _iqd_tmech_umax_task(task):
+    """calculate iq, id (and iex) or w1, psi (induction machine) of a batch
+    of loads (n, T) at voltage u1 in a worker process of IqdPool.
+    Returns the number of loads."""
+    from multiprocessing import shared_memory
+    mspec, rspec, u1, with_mtpa, start, nt = task
+    if _worker.get('machine') != mspec:
+        # new machine: load it once
+        shm = shared_memory.SharedMemory(name=mspec[0])
+        try:
+            _worker['m'] = pickle.loads(bytes(shm.buf[:mspec[1]]))
+        finally:
+            shm.close()
+        _worker['machine'] = mspec
+    m = _worker['m']
+    iqd = np.ndarray(rspec[1:], buffer=_attach(rspec[0]).buf)
+    if isinstance(m, InductionMachine):
+        iqd[:, start:start + nt.shape[1]] = m.w1_psi(
+            u1, m.psiref, nt[1], 2*np.pi*nt[0])
+    else:
+        iqd[:, start:start + nt.shape[1]] = m.iqd_tmech_umax_batch(
+            nt[1], 2*np.pi*nt[0]*m.p, u1, with_mtpa=with_mtpa)[:-1]
+    return nt.shape[1]
+
+
+class IqdPool(object):
+    """persistent pool of worker processes that calculate the currents
+    of loss and efficiency maps. The pool can be reused for several maps
+    (such as different temperatures or voltages) to avoid the process
+    start-up. The machine is passed to the workers in shared memory and
+    loaded once per worker and machine, the loads are distributed in
+    small batches and the results are written to a shared array.
+
+    Args:
+      num_proc: (int) number of worker processes
+
+    Example:
+      with IqdPool(4) as pool:
+          for u1 in (200, 230):
+              r = efficiency_losses_map(m, u1, T, temp, n, pool=pool)
+    """
+
+    def __init__(self, num_proc):
+        import concurrent.futures
+        self.num_proc = num_proc
+        self._pool = concurrent.futures.ProcessPoolExecutor(num_proc)
+        self._machine = None  # pickled machine and its shared memory
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """shut down the worker processes"""
+        self._pool.shutdown()
+        self._release_machine()
+
+    def _release_machine(self):
+        if self._machine is not None:
+            self._machine[1].close()
+            self._machine[1].unlink()
+            self._machine = None
+
+    def _share_machine(self, m):
+        """return name and size of the shared memory with machine m"""
+        from multiprocessing import shared_memory
+        data = pickle.dumps(m)
+        if self._machine is None or self._machine[0] != data:
+            self._release_machine()
+            shm = shared_memory.SharedMemory(create=True, size=len(data))
+            shm.buf[:len(data)] = data
+            self._machine = (data, shm)
+        return self._machine[1].name, len(data)
+
+    def iqd_tmech_umax(self, ntmesh, m, u1, with_mtpa, publish=0,
+                       batchsize=0):
+        """calculate iq, id (and iex) or w1, psi (InductionMachine)
+        for each load (n, T) of ntmesh at voltage u1
 
         Args:
-          m: PmRelMachine or SynchronousMachine
+          ntmesh: array of speed (1/s) and torque (Nm) values
+          m: PmRelMachine, SynchronousMachine or InductionMachine
           u1: (float) phase voltage (V)
-          speed_torque: list of (n, T) pairs
           with_mtpa: (bool) use mtpa in const flux range if True
-          progress: logging pipe
-
-    """
-    nsamples = len(speed_torque)
-    num_iv = round(nsamples/7)
-    try:
-        for i, nT in enumerate(speed_torque):
-            iqde = m.iqd_tmech_umax(
-                nT[1], 2*np.pi*nT[0]*m.p,
-                u1, with_mtpa=with_mtpa)[:-1]
-            iq[i] = iqde[0]
-            id[i] = iqde[1]
-            if len(iqde) > 2:
-                iex[i] = iqde[2]
-            if i % num_iv == 0:
-                progress.send(f"{100*i/nsamples:.1f}%")
-    except Exception as e:
-        progress.send(e)
-    finally:
-        progress.close()
-
-def iqd_tmech_umax_multi(num_proc, ntmesh, m, u1, with_mtpa, publish=0):
-    """calculate iqd for sm and pm using multiproc
-    """
-    progress_readers = []
-    chunksize = int(np.ceil(ntmesh.shape[1]/num_proc))
-    procs = []
-    iq = []
-    id = []
-    iex = []
-    iexk = []
-    k = 0
-    for i in range(0, num_proc*chunksize, chunksize):
-        prog_reader, prog_writer = multiprocessing.Pipe(duplex=False)
-        progress_readers.append(prog_reader)
-        iq.append(multiprocessing.Array('d', chunksize))
-        id.append(multiprocessing.Array('d', chunksize))
-        if isinstance(m, SynchronousMachine):
-            iex.append(multiprocessing.Array('d', chunksize))
-            iexk = iex[k]
-        p = multiprocessing.Process(target=iqd_tmech_umax,
-                                    args=(m, u1, with_mtpa,
-                                          prog_writer,
-                                          ntmesh.T[i:i+chunksize],
-                                          iq[k], id[k], iexk))
-        k += 1
-        p.start()
-        procs.append(p)
-        prog_writer.close()
-
-    i = 0
-    collected_msg = []
-    while progress_readers:
-        for r in multiprocessing.connection.wait(progress_readers):
+          publish: (optional) custom function for progress logging
+          batchsize: (int) number of loads of a task
+            (default: about 8 tasks per process)
+        """
+        import concurrent.futures
+        from multiprocessing import shared_memory
+        nsamples = ntmesh.shape[1]
+        nrows = 3 if isinstance(m, SynchronousMachine) else 2
+        if not batchsize:
+            batchsize = int(np.ceil(nsamples/self.num_proc/8))
+        mspec = self._share_machine(m)
+        shm = shared_memory.SharedMemory(create=True,
+                                         size=max(8*nrows*nsamples, 1))
+        try:
+            rspec = (shm.name, nrows, nsamples)
+            futures = [self._pool.submit(
+                _iqd_tmech_umax_task,
+                (mspec, rspec, u1, with_mtpa, i, ntmesh[:, i:i+batchsize]))
+                       for i in range(0, nsamples, batchsize)]
+            ndone = 0
+            num_iv = 0
             try:
-                collected_msg.append(r.recv())
-                i += 1
-            except EOFError:
-                progress_readers.remove(r)
-            else:
-                if i % len(progress_readers) == 0:
+                for f in concurrent.futures.as_completed(futures):
+                    ndone += f.result()
+                    workdone = round(100*ndone/nsamples)
                     if publish:
-                        numTot = len(collected_msg)
-                        numOf = f"{num_proc-numTot} of {num_proc}"
-                        workdone = sum([float(i[:-1])
-                                        for i in collected_msg]) / numTot
-                        logger.debug("numTot %d numOf %s workdone %s, %s",
-                                     numTot, numOf, workdone, collected_msg)
                         publish(('progress_logger',
-                                 f"{numTot}:{numOf}:{workdone}:"))
-                        # {' '.join(collected_msg)}"))
-                    logger.info("Losses/Eff Map: %s",
-                                ', '.join(collected_msg))
-                    collected_msg = []
-    for p in procs:
-        p.join()
-    siz = ntmesh.shape[1]
-    if iex:
-        return np.array([np.array(iq).flatten(),
-                         np.array(id).flatten(),
-                         np.array(iex).flatten()])[:, :siz]
-
-    return np.array([np.array(iq).flatten(),
-                        np.array(id).flatten()])[:, :siz]
+                                 f"{ndone}:{ndone} of {nsamples}:{workdone}"))
+                    if workdone >= num_iv:
+                        logger.info("Losses/Eff Map: %d%%", workdone)
+                        num_iv = workdone + 10
+            finally:
+                for f in futures:
+                    f.cancel()
+                concurrent.futures.wait(futures)
+            return np.ndarray((nrows, nsamples), buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+def iqd_tmech_umax_multi(num_proc, ntmesh, m, u1, with_mtpa, publish=0,
+                         pool=None, batchsize=0):
+    """calculate iqd for sm and pm (w1, psi for im) using multiproc
+
+    Args:
+      pool: (IqdPool) worker processes (a pool of num_proc processes
+        is created if None)
+      batchsize: (int) number of loads of a task (see IqdPool)
+    """
+    if pool is None:
+        with IqdPool(num_proc) as pool:
+            return pool.iqd_tmech_umax(ntmesh, m, u1, with_mtpa, publish,
+                                       batchsize)
+    return pool.iqd_tmech_umax(ntmesh, m, u1, with_mtpa, publish, batchsize)
+
+
+def _solve_chunks(solve, ntmesh, publish=0, nchunks=15):
+    """solve the loads (n, T) of ntmesh in nchunks batches and publish
+    the progress after each batch
+
+    Args:
+      solve: function of the loads of a batch and a log_fallback function
+        that returns the result rows of the batch
+      ntmesh: array of speed (1/s) and torque (Nm) values
+      publish: (optional) custom function for progress logging
+      nchunks: (int) number of batches
+    """
+    nsamples = ntmesh.shape[1]
+    ndone = 0
+    nfallback = 0
+    res = []
+
+    def log_fallback(n):
+        nonlocal nfallback
+        nfallback += n
+
+    for nt in np.array_split(ntmesh, min(nchunks, nsamples), axis=1):
+        res.append(np.array(solve(nt, log_fallback)))
+        ndone += res[-1].shape[1]
+        workdone = round(100*ndone/nsamples)
+        if publish:
+            publish(('progress_logger',
+                     f"{ndone}:{ndone} of {nsamples}:{workdone}"))
+        logger.info("Losses/Eff Map: %d%%", workdone)
+    if nfallback:
+        logger.info("Losses/Eff Map: %d of %d points solved individually",
+                    nfallback, nsamples)
+    return np.concatenate(res, axis=1)
 
 
 def rectangular_grid(ntmesh):
@@ -191,7 +291,8 @@ def _generate_mesh(n, T, nb, Tb, npoints):
 def efficiency_losses_map(eecpars, u1, T, temp, n, npoints=(60, 40),
                           with_mtpv=True, with_mtpa=True, with_pmconst=True,
                           with_tmech=True, driving_only=False,
-                          num_proc=0, progress=None, **kwargs) -> dict:
+                          num_proc=0, progress=None, pool=None,
+                          **kwargs) -> dict:
     """return speed, torque efficiency and losses
 
     Args:
@@ -207,6 +308,7 @@ def efficiency_losses_map(eecpars, u1, T, temp, n, npoints=(60, 40),
       with_mtpa -- (optional) use mtpa if True (default), disables mtpv if False
       with_tmech -- (optional) use friction and windage losses (default)
       num_proc -- (optional) number of parallel processes (default 0)
+      pool -- (optional) IqdPool of worker processes (replaces num_proc)
       progress  -- (optional) custom function for progress logging (publishing)
       with_torque_corr -- (optional) T is corrected if out of range (default False)
 
@@ -274,66 +376,47 @@ def efficiency_losses_map(eecpars, u1, T, temp, n, npoints=(60, 40),
 
     logger.info("total speed,torque samples %s", ntmesh.shape)
     if isinstance(m, (PmRelMachine, SynchronousMachine)):
-        if num_proc > 1:
+        if num_proc > 1 or pool is not None:
             iqd = iqd_tmech_umax_multi(num_proc, ntmesh, m, u1, with_mtpa,
-                                       publish=progress)
+                                       publish=progress, pool=pool)
         else:
-            class ProgressLogger:
-                def __init__(self, nsamples, publish):
-                    self.n = 0
-                    self.publish = publish
-                    self.nsamples = nsamples
-                    self.num_iv = round(nsamples/15)
-                def __call__(self, iqd):
-                    self.n += 1
-                    if self.n % self.num_iv == 0:
-                        workdone=round(100*self.n/self.nsamples)
-                        if self.publish:
-                            self.publish(
-                                ('progress_logger',
-                                 f"{self.n}:{self.n} of {self.nsamples}:{workdone}"))
-                        logger.info("Losses/Eff Map: %d%%", workdone)
-
-            progress_logger = ProgressLogger(ntmesh.shape[1], progress)
-            progress_logger.nsamples = ntmesh.shape[1]
-            progress_logger(0)  # To check conformity
-            progress_logger.n = 0
             if with_tmech:
-                iqd = np.array([
-                    m.iqd_tmech_umax(
-                        nt[1],
-                        2*np.pi*nt[0]*m.p,
-                        u1, log=progress_logger, with_mtpa=with_mtpa)[:-1]
-                    for nt in ntmesh.T]).T
+                iqd_umax = m.iqd_tmech_umax_batch
             else:
-                iqd = np.array([
-                    m.iqd_torque_umax(
-                        nt[1],
-                        2*np.pi*nt[0]*m.p,
-                        u1, log=progress_logger, with_mtpa=with_mtpa)[:-1]
-                    for nt in ntmesh.T]).T
+                iqd_umax = m.iqd_torque_umax_batch
+            iqd = _solve_chunks(
+                lambda nt, log_fallback: iqd_umax(
+                    nt[1], 2*np.pi*nt[0]*m.p, u1, with_mtpa=with_mtpa,
+                    log_fallback=log_fallback)[:-1],
+                ntmesh, progress)
 
         beta, i1 = betai1(iqd[0], iqd[1])
-        uqd = [m.uqd(2*np.pi*n*m.p, *i)
-               for n, i in zip(ntmesh[0], iqd.T)]
+        if isinstance(m, PmRelMachine):
+            uqd = np.array(m.uqd(2*np.pi*ntmesh[0]*m.p, *iqd[:2])).T
+        else:
+            uqd = [m.uqd(2*np.pi*n*m.p, *i)
+                   for n, i in zip(ntmesh[0], iqd.T)]
         u1 = np.linalg.norm(uqd, axis=1)/np.sqrt(2.0)
         f1 = ntmesh[0]*m.p
     else:
-        f1 = []
-        u1max = u1
-        r = dict(u1=[], i1=[], plfe1=[], plcu1=[], plcu2=[])
-        for nx, tq in ntmesh.T:
-            wm = 2*np.pi*nx
-            w1 = m.w1(u1max, m.psiref, tq, wm)
-            f1.append(w1/2/np.pi)
-            u1 = m.u1(w1, m.psi, wm)
-            r['u1'].append(np.abs(u1))
-            i1 = m.i1(w1, m.psi, wm)
-            r['i1'].append(np.abs(i1))
-            r['plfe1'].append(m.m*np.abs(u1)**2/m.rfe(w1, m.psi))
-            i2 = m.i2(w1, m.psi, wm)
-            r['plcu1'].append(m.m*np.abs(i1)**2*m.rstat(w1))
-            r['plcu2'].append(m.m*np.abs(i2)**2*m.rrot(w1-m.p*wm))
+        if num_proc > 1 or pool is not None:
+            w1, psi = iqd_tmech_umax_multi(num_proc, ntmesh, m, u1, with_mtpa,
+                                           publish=progress, pool=pool)
+        else:
+            w1, psi = _solve_chunks(
+                lambda nt, log_fallback: m.w1_psi(
+                    u1, m.psiref, nt[1], 2*np.pi*nt[0],
+                    log_fallback=log_fallback),
+                ntmesh, progress)
+        f1 = w1/2/np.pi
+        wm = 2*np.pi*ntmesh[0]
+        u1 = m.u1(w1, psi, wm)
+        i1 = m.i1(w1, psi, wm)
+        i2 = m.i2(w1, psi, wm)
+        r = dict(u1=np.abs(u1), i1=np.abs(i1),
+                 plfe1=m.m*np.abs(u1)**2/m.rfe(w1, psi),
+                 plcu1=m.m*np.abs(i1)**2*m.rstat(w1),
+                 plcu2=m.m*np.abs(i2)**2*m.rrot(w1-m.p*wm))
 
     if isinstance(m, PmRelMachine):
         plfe1 = m.kpfe*m.iqd_plfe1(*iqd, f1)
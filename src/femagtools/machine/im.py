@@ -6,7 +6,7 @@ import scipy.interpolate as ip
 import scipy.optimize as so
 import logging
 import pathlib
-from .utils import skin_resistance, skin_leakage_inductance, wdg_leakage_inductances
+from .utils import skin_resistance, skin_leakage_inductance, wdg_leakage_inductances, illinois
 import femagtools.windings
 import femagtools.parstudy
 import json
@@ -34,11 +34,19 @@ def log_interp1d(x, y, kind='cubic'):
     logx = np.log10(xx)
     logy = np.log10(yy)
     lin_interp = ip.interp1d(logx, logy, kind=kind, fill_value="extrapolate")
-    def log_interp(zz): return np.power(10.0, lin_interp(np.log10(zz)))
     # TODO check replace interp1d
     #lin_interp = ip.make_interp_spline(logx, logy, bc_type='not-a-knot')
     #def log_interp(zz): return np.power(10.0, lin_interp(np.log10(zz), nu=1))
-    return log_interp
+    return _LogInterp(lin_interp)
+
+
+class _LogInterp(object):
+    """logarithmic interpolation function (picklable, see log_interp1d)"""
+    def __init__(self, lin_interp):
+        self.lin_interp = lin_interp
+
+    def __call__(self, zz):
+        return np.power(10.0, self.lin_interp(np.log10(zz)))
 
 
 eecdefaults = dict(
@@ -123,15 +131,9 @@ class InductionMachine(Component):
             if hasattr(self, 'u1ref'):
                 self.psiref = self.u1ref/self.wref
         if 'lh' in parameters:
-            def imag(self, psi):
-                """magnetizing current"""
-                return psi/self.lh
-            self._imag = imag
+            self._imag = self._imag_lh
         elif 'iml' in parameters:
-            def imag(psi):
-                return (self.iml * np.abs(psi)/self.psiref +
-                        self.ims*np.power(np.abs(psi)/self.psiref, self.mexp))
-            self._imag = imag
+            self._imag = self._imag_iml
         elif 'im' in parameters:
             self._imag = log_interp1d(self.psi, self.im)
             self.psi = self.psiref
@@ -168,6 +170,13 @@ class InductionMachine(Component):
         return 2*np.pi*n*self.tfric
 
 
+    def _imag_lh(self, psi):
+        return psi/self.lh
+
+    def _imag_iml(self, psi):
+        return (self.iml * np.abs(psi)/self.psiref +
+                self.ims*np.power(np.abs(psi)/self.psiref, self.mexp))
+
     def imag(self, psi):
         """magnetizing current"""
         if np.isscalar(psi):
@@ -177,10 +186,13 @@ class InductionMachine(Component):
     def rfe(self, w, psi):
         """equivalent resistance for iron losses"""
         try:
-            if np.isclose(w, 0):
-                return 0
-            else:
+            if np.isscalar(w):
+                if np.isclose(w, 0):
+                    return 0
                 return self.m*(w*psi)**2 / self.plfe1(w, psi)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(np.isclose(w, 0), 0,
+                                self.m*(w*psi)**2 / self.plfe1(w, psi))
         except AttributeError:
             pass
         return self.rh
@@ -234,17 +246,25 @@ class InductionMachine(Component):
     def i1(self, w1, psi, wm):
         """stator current"""
         imag = self.imag(psi)+0j
-        if abs(w1) > 0:
-            imag += w1*psi/self.rfe(w1, psi)*1j
+        if np.isscalar(w1):
+            if abs(w1) > 0:
+                imag += w1*psi/self.rfe(w1, psi)*1j
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                imag = imag + np.where(np.abs(w1) > 0,
+                                       w1*psi/self.rfe(w1, psi)*1j, 0)
         return self.i2(w1, psi, wm) + imag
 
     def i2(self, w1, psi, wm):
         """rotor current"""
         w2 = w1 - self.p * wm
-        if abs(w2) > EPS:
-            z2 = (self.rrot(w2) + w2*self.lrot(w2)*1j)
-            return w2*psi*1j/z2
-        return 0
+        if np.isscalar(w2):
+            if abs(w2) > EPS:
+                z2 = (self.rrot(w2) + w2*self.lrot(w2)*1j)
+                return w2*psi*1j/z2
+            return 0
+        z2 = (self.rrot(w2) + w2*self.lrot(w2)*1j)
+        return np.where(np.abs(w2) > EPS, w2*psi*1j/z2, 0)
 
     def w1torque(self, w1, u1max, psi, wm):
         """calculate motor torque"""
@@ -296,15 +316,17 @@ class InductionMachine(Component):
     def torque(self, w1, psi, wm):
         """electric torque (in airgap)"""
         w2 = w1-self.p*wm
-        if np.isclose(w2, 0):
-            return 0.
+        if np.isscalar(w2):
+            if np.isclose(w2, 0):
+                return 0.
         r2 = self.rrot(w2)
         i2 = self.i2(w1, psi, wm)
-        return self.m*self.p/w2*r2*(i2*i2.conjugate()).real
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(np.isclose(w2, 0), 0,
+                            self.m*self.p/w2*r2*(i2*i2.conjugate()).real)[()]
 
     def tmech(self, w1, psi, wm):
         """shaft torque"""
-        u1 = self.u1(w1, psi, wm)
         return self.torque(w1, psi, wm) - self.tfric
 
     def torqueu(self, w1, u1max, wm):
@@ -356,6 +378,72 @@ class InductionMachine(Component):
             return so.fsolve(
                 lambda w1: self.w1torque(w1, u1max, psi, wm) - tload, b)[0]
 
+    def _psi_umax(self, w1, wm, u1max, psi):
+        """return the flux psi reduced where the voltage exceeds u1max
+        (vectorized)"""
+        r = np.full(np.shape(w1), float(psi))
+        sel = np.abs(self.u1(w1, psi, wm)) > u1max
+        if np.any(sel):
+            w1, wm = w1[sel], wm[sel]
+            r[sel] = illinois(
+                lambda psix: np.abs(self.u1(w1, psix, wm)) - u1max,
+                np.full(w1.shape, 1e-3*psi), r[sel], 1e-10*psi)
+        return r
+
+    def w1_psi(self, u1max, psi, tload, wm, with_tmech=True, log_fallback=0):
+        """return arrays of stator frequency and flux of the loads
+        at given speeds (vectorized w1)
+
+        Args:
+          u1max: max phase voltage (V rms)
+          psi: flux (Vs) (reduced where the voltage exceeds u1max)
+          tload: array of torque values (shaft torque if with_tmech) (Nm)
+          wm: array of mechanical angular speeds (rad/s)
+          log_fallback: called with the number of points that are solved
+            with w1
+
+        The slip frequency of each load is searched on a logarithmic grid
+        below the pull-out slip and refined by regula falsi.
+        """
+        tload, wm = np.broadcast_arrays(np.asarray(tload, dtype=float),
+                                        np.asarray(wm, dtype=float))
+        shape = tload.shape
+        tload, wm = tload.ravel(), wm.ravel()
+        tq = tload + self.tfric if with_tmech else tload
+        wsync = self.p*wm
+
+        def dtorque(w2, k):
+            """torque of slip frequencies w2 minus load of points k"""
+            w1 = wsync[k] + w2
+            return self.torque(
+                w1, self._psi_umax(w1, wm[k], u1max, psi), wm[k]) - tq[k]
+
+        w2 = np.zeros(tq.shape)
+        k = np.flatnonzero(tq != 0)
+        s = np.sign(tq[k])[:, None]
+        w2k = self.rrot(0)/self.lrot(0)
+        grid = s*w2k*np.logspace(-4, 1.5, 23)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            pos = s*dtorque(grid.ravel(), np.repeat(k, grid.shape[1])).reshape(
+                grid.shape) > 0
+            j = np.argmax(pos, axis=1)
+            rows = np.arange(len(k))
+            w2[k] = illinois(lambda x: dtorque(x, k),
+                             np.where(j > 0, grid[rows, j - 1], 0),
+                             np.where(pos[rows, j], grid[rows, j], np.nan),
+                             1e-9*w2k)
+            failed = np.flatnonzero(~np.isfinite(w2))
+            if failed.size:
+                if log_fallback:
+                    log_fallback(failed.size)
+                for i in failed:
+                    w2[i] = self.w1(u1max, psi, tload[i], wm[i],
+                                    with_tmech) - wsync[i]
+            w1 = wsync + w2
+            return (np.reshape(w1, shape),
+                    np.reshape(self._psi_umax(w1, wm, u1max, psi), shape))
+
     def wmfweak(self, u1max, psi, torque, with_tmech=True):
         """return lower speed limit of field weakening range"""
         wm0 = u1max/psi/self.p
@@ -491,29 +579,9 @@ class InductionMachine(Component):
             lambda wx: (kpo*self.pullouttorque(self.p *
                         wx, u1max) - abs(pmmax/wx)),
             wmType)[0]
-        wmtab0 = np.linspace(wmType, 3*wmPullout)
-        for wm, tq in zip(wmtab0, [pmmax/wx for wx in wmtab0]):
-            logger.debug("u1 %g psi %g tq %g wm %g",
-                         u1max, self.psiref, tq, wm)
-            try:
-                w1 = self.w1(u1max, self.psiref, tq, wm, with_tmech)
-            except ValueError:
-                wmPullout = wm
-                break
         wmMax = max(1.5*wmPullout, 3*abs(pmmax/T))
         if n:
             wmMax = 2*np.pi*n
-        if wmMax > wmPullout:
-            wmtab0 = np.linspace(wmPullout, wmMax)
-            for wm, tq in zip(wmtab0, [pmmax/wx**2
-                                       for wx in wmtab0]):
-                logger.debug("u1 %g psi %g tq %g wm %g",
-                             u1max, self.psiref, tq, wm)
-                try:
-                    w1 = self.w1(u1max, self.psiref, tq, wm, with_tmech)
-                except ValueError:
-                    wmMax = wm
-                    break
 
         logger.info("wmtype %f wpo %f wmmax %f", wmType, wmPullout, wmMax)
 
@@ -556,34 +624,29 @@ class InductionMachine(Component):
                  plfe1=[], plcu1=[], plcu2=[], f1=[])
         T = [tload2(wx) for wx in wmtab]
         tfric = self.tfric
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            for wm, tq in zip(wmtab, T):
-                logger.debug("u1 %g psi %g tq %g wm %g",
-                             u1max, self.psiref, tq, wm)
-    #            try:
-                w1 = self.w1(u1max, self.psiref, tq, wm, with_tmech)
-                r['f1'].append(w1/np.pi/2)
-                u1 = self.u1(w1, self.psi, wm)
-                r['u1'].append(np.abs(u1))
-                i1 = self.i1(w1, self.psi, wm)
-                r['i1'].append(np.abs(i1))
-                r['cosphi'].append(np.cos(np.angle(u1) - np.angle(i1)))
-                r['plfe1'].append(self.plfe1(w1, self.psi))
-                i2 = self.i2(w1, self.psi, wm)
-                r['plcu1'].append(self.m*np.abs(i1)**2*self.rstat(w1))
-                r['plcu2'].append(self.m*np.abs(i2)**2*self.rrot(w1-self.p*wm))
-                if with_tmech:
-                    r['T'].append(tq)
-                else:
-                    r['T'].append(tq - tfric)
-                r['n'].append(wm/2/np.pi)
-                r['s'].append(float((w1 - self.p * wm) / w1))
-                r['sk'].append(self.sk(w1, np.abs(u1)/w1))
-                # add n_type to result dict
-                r['n_type'] = wmType/2/np.pi
-                #            except ValueError as ex:
-                #                break
+        if len(wmtab):
+            wm = np.asarray(wmtab, dtype=float)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                w1, psi = self.w1_psi(u1max, self.psiref, T, wm, with_tmech)
+                u1 = self.u1(w1, psi, wm)
+                i1 = self.i1(w1, psi, wm)
+                i2 = self.i2(w1, psi, wm)
+                r['f1'] = (w1/np.pi/2).tolist()
+                r['u1'] = np.abs(u1).tolist()
+                r['i1'] = np.abs(i1).tolist()
+                r['cosphi'] = np.cos(np.angle(u1) - np.angle(i1)).tolist()
+                r['plfe1'] = np.broadcast_to(self.plfe1(w1, psi),
+                                             wm.shape).tolist()
+                r['plcu1'] = (self.m*np.abs(i1)**2*self.rstat(w1)).tolist()
+                r['plcu2'] = (self.m*np.abs(i2)**2 *
+                              self.rrot(w1-self.p*wm)).tolist()
+                r['T'] = T if with_tmech else [tq - tfric for tq in T]
+                r['n'] = (wm/2/np.pi).tolist()
+                r['s'] = ((w1 - self.p * wm) / w1).tolist()
+                r['sk'] = self.sk(w1, np.abs(u1)/w1).tolist()
+            # add n_type to result dict
+            r['n_type'] = wmType/2/np.pi
         r['plfw'] = [self.pfric(n) for n in r['n']]
         r['pmech'] = [2*np.pi*n*tq for n, tq in zip(r['n'], r['T'])]
         pmech = np.array(r['pmech'])
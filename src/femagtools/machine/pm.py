@@ -5,7 +5,7 @@ import logging
 import warnings
 import numpy as np
 import numpy.linalg as la
-from .utils import iqd, betai1, skin_resistance, dqparident, KTH, K, T
+from .utils import iqd, betai1, skin_resistance, dqparident, illinois, KTH, K, T
 import scipy.optimize as so
 import scipy.interpolate as ip
 import scipy.integrate as ig
@@ -14,6 +14,14 @@ from functools import partial
 logger = logging.getLogger(__name__)
 
 
+def _cubic_spline(x, y):
+    """return the not-a-knot cubic spline of x, y (same as CubicSpline,
+    make_interp_spline is faster if there are more than 3 points)"""
+    if len(x) > 3:
+        return ip.make_interp_spline(x, y, k=3)
+    return ip.CubicSpline(x, y)
+
+
 def find_peaks_and_valleys(t, iabc, tshort):
     """ return peaks and valleys of phase current with maximum amplitude
     """
@@ -32,13 +40,13 @@ def find_peaks_and_valleys(t, iabc, tshort):
     else:
         v = {'iv': [], 'tv': []}
     try:
-        cs = ip.CubicSpline(ts[peaks], Z[peaks])
+        cs = _cubic_spline(ts[peaks], Z[peaks])
         p.update({'i': cs(ts).tolist(), 't': ts.tolist()})
     except ValueError as e:
         logger.warning("no peaks in current: %d",
                        len(peaks))
     try:
-        cs = ip.CubicSpline(ts[valleys], Z[valleys])
+        cs = _cubic_spline(ts[valleys], Z[valleys])
         v.update({'i': cs(ts).tolist(), 't': ts.tolist()})
     except ValueError as e:
         logger.warning("no valleys in current: %d",
@@ -46,6 +54,48 @@ def find_peaks_and_valleys(t, iabc, tshort):
     return p, v
 
 
+def _bilinear_table(tab):
+    """return the coefficients of the bilinear interpolation of the
+    values tab[:, j, k] of a regular grid in each cell"""
+    t = tab[:, :-1, :-1]
+    return np.concatenate((t, tab[:, 1:, :-1] - t, tab[:, :-1, 1:] - t,
+                           tab[:, 1:, 1:] - tab[:, 1:, :-1]
+                           - tab[:, :-1, 1:] + t))
+
+
+def _bilinear(c, lo, step, x, y):
+    """bilinear interpolation of the cell coefficients c (see
+    _bilinear_table) of a regular x, y grid starting at lo with step
+    (linear extrapolation)"""
+    m = len(c)//4
+    nx, ny = c.shape[1:]
+    u, v = (x - lo[0])/step[0], (y - lo[1])/step[1]
+    j = np.minimum(np.maximum(u, 0), nx-1).astype(np.intp)
+    k = np.minimum(np.maximum(v, 0), ny-1).astype(np.intp)
+    u, v = u - j, v - k
+    a = np.take(c.reshape(len(c), -1), j*ny + k, axis=1)
+    return a[:m] + u*a[m:2*m] + v*(a[2*m:3*m] + u*a[3*m:])
+
+
+def _flux_ext(psiq, psid, iqrange, idrange, ls, iq, id):
+    """return the flux linkage (including the leakage ls) and its
+    jacobian of the flux splines psiq, psid extended linearly beyond
+    their current range"""
+    cq, cd = np.clip(iq, *iqrange), np.clip(id, *idrange)
+    dq, dd = iq - cq, id - cd
+    jac = np.array([[f.ev(cq, cd, dx=1), f.ev(cq, cd, dy=1)]
+                    for f in (psiq, psid)])
+    jac[0, 0] += ls
+    jac[1, 1] += ls
+    flux = (np.array([psiq.ev(cq, cd) + ls*cq, psid.ev(cq, cd) + ls*cd]) +
+            np.einsum('ij...,j...->i...', jac, [dq, dd]))
+    # the slope of the extension varies along the boundary
+    fqd = np.array([f.ev(cq, cd, dx=1, dy=1) for f in (psiq, psid)])
+    jac[:, 0] += np.where(dq == 0, fqd*dd, 0)
+    jac[:, 1] += np.where(dd == 0, fqd*dq, 0)
+    return flux, jac
+
+
 def parident(workdir, engine, temp, machine,
              magnetizingCurves, magnetMat, condMat,
              **kwargs):
@@ -282,6 +332,15 @@ class PmRelMachine(object):
     def tloss_iqd(self, iq, id, n):
         """return loss torque of d-q current, iron loss correction factor
         and friction windage losses"""
+        if np.ndim(n) > 0:
+            n = np.asarray(n)
+            f1 = self.p*n
+            plfe = self.kpfe * (self.iqd_plfe1(iq, id, f1) +
+                                self.iqd_plfe2(iq, id, f1))
+            pmag = self.kpmag * self.iqd_plmag(iq, id, f1)
+            nx = np.where(n > 1e-3, n, 1)
+            return np.where(n > 1e-3,
+                            (plfe + pmag + self.pfric(nx))/(2*np.pi*nx), 0)
         if n > 1e-3:
             f1 = self.p*n
             plfe = self.kpfe * (self.iqd_plfe1(iq, id, f1) + self.iqd_plfe2(iq, id, f1))
@@ -516,6 +575,194 @@ class PmRelMachine(object):
                          self.uqd(w1, *res.x))/np.sqrt(2))
         return res.x[0], res.x[1], self.torque_iqd(*res.x)
 
+    def iqd_tmech_umax_batch(self, torque, w1, u1max, with_mtpa=True,
+                             log_fallback=0):
+        """return arrays of d-q current and shaft torque at stator
+        frequency and max voltage with minimal current
+        (vectorized iqd_tmech_umax)
+
+        Args:
+          torque: array of shaft torque values (Nm)
+          w1: array of stator frequencies (rad/s)
+          u1max: max phase voltage (V)
+          with_mtpa: use mtpa in the const flux range if True
+          log_fallback: called with the number of points that are solved
+            with iqd_tmech_umax
+        """
+        return self._iqd_umax_batch(torque, w1, u1max, with_mtpa,
+                                    True, log_fallback)
+
+    def iqd_torque_umax_batch(self, torque, w1, u1max, with_mtpa=True,
+                              log_fallback=0):
+        """return arrays of d-q current and torque at stator
+        frequency and max voltage with minimal current
+        (vectorized iqd_torque_umax, see iqd_tmech_umax_batch)"""
+        return self._iqd_umax_batch(torque, w1, u1max, with_mtpa,
+                                    False, log_fallback)
+
+    def _iqd_umax_batch(self, torque, w1, u1max, with_mtpa, with_tmech,
+                        log_fallback=0):
+        """solve the minimal current problem of all operating points:
+        the current i1(beta) of the torque is calculated on a beta grid,
+        its minimum is refined by parabolic interpolation (mtpa) or the
+        root of the voltage limit is searched next to the feasible point
+        with minimal current. The operating points that do not converge are
+        solved with the scalar methods."""
+        torque, w1 = np.broadcast_arrays(np.asarray(torque, dtype=float),
+                                         np.asarray(w1, dtype=float))
+        shape = torque.shape
+        torque, w1 = torque.ravel(), w1.ravel()
+        n = w1/2/np.pi/self.p
+
+        def tq(iq, id, n):
+            s = iq.shape
+            iq, id, n = (np.ravel(x) for x in np.broadcast_arrays(iq, id, n))
+            t = self.torque_iqd(iq, id)
+            if with_tmech:
+                t = t - self.tloss_iqd(iq, id, n)
+            return np.reshape(t, s)
+
+        def u1(beta, i1, w1):
+            iq, id = np.sqrt(2)*i1*np.cos(beta), np.sqrt(2)*i1*np.sin(beta)
+            uq, ud = self.uqd(w1, iq, id)
+            return np.sqrt(uq**2 + ud**2)/np.sqrt(2)
+
+        betarange = getattr(self, 'betarange', (-np.pi, np.pi))
+        i1max = getattr(self, 'i1range', (0, np.inf))[1]
+        if not np.isfinite(i1max):
+            # largest current required by the torque values
+            i1max = max(la.norm(self.io)/np.sqrt(2), 1.0)
+            for k in range(40):
+                i1max *= 2
+                t = tq(*iqd(np.linspace(*betarange, 37), i1max),
+                       np.max(n))
+                if np.nanmax(np.abs(t)) > 2*np.max(np.abs(torque)):
+                    break
+
+        def i1_torque(beta, torque, n, xtol=1e-10, bracket=None):
+            """return current of torque at beta (nan if not reachable)
+            within bracket (default: full current range)"""
+            beta, torque, n = np.broadcast_arrays(beta, torque, n)
+            c, s = np.sqrt(2)*np.cos(beta), np.sqrt(2)*np.sin(beta)
+            full = np.zeros(beta.shape), np.full(beta.shape, i1max)
+            i1 = illinois(lambda i1: tq(i1*c, i1*s, n) - torque,
+                           *(bracket or full), xtol*i1max)
+            if bracket is not None:
+                retry = np.isnan(i1)
+                if np.any(retry):
+                    i1[retry] = i1_torque(beta[retry], torque[retry],
+                                          n[retry], xtol)
+            return i1
+
+        # current and voltage along the torque contour
+        nbeta = int(np.ceil((betarange[1] - betarange[0])/np.radians(3)))+1
+        betas = np.linspace(betarange[0], betarange[1], nbeta)
+        i1 = i1_torque(betas, torque[:, None], n[:, None], 1e-6)
+        u = u1(betas, i1, w1[:, None])
+        feasible = u <= u1max
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            # all-nan rows are handled by the fallback
+            k0 = np.argmin(np.where(np.isnan(i1), np.inf, i1), axis=1)
+
+        def parabolic(fun, a, b, c, niter=4):
+            """minimum of fun(beta) in a, c by successive parabolic
+            interpolation starting at a < b < c"""
+            fa, fb, fc = fun(a), fun(b), fun(c)
+            for k in range(niter):
+                p = (b - a)**2*(fb - fc) - (b - c)**2*(fb - fa)
+                q = (b - a)*(fb - fc) - (b - c)*(fb - fa)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    x = b - p/q/2
+                # bisect the larger interval if the vertex is unusable
+                bad = ~((x > a) & (x < c) & (np.abs(x - b) > 1e-12))
+                x = np.where(bad, np.where(b - a > c - b,
+                                           (a + b)/2, (b + c)/2), x)
+                fx = fun(x)
+                better = fx < fb
+                lower = x < b
+                # new left and right ends of the bracket
+                ka = np.where(better, ~lower, lower)
+                kc = np.where(better, lower, ~lower)
+                xa, fxa = np.where(better, b, x), np.where(better, fb, fx)
+                a, fa = np.where(ka, xa, a), np.where(ka, fxa, fa)
+                c, fc = np.where(kc, xa, c), np.where(kc, fxa, fc)
+                b, fb = np.where(better, x, b), np.where(better, fx, fb)
+            return b
+
+        rows = np.arange(len(torque))
+
+        def window(k):
+            """betas around grid point k and their current bracket"""
+            k = np.clip(k, 1, nbeta - 2)
+            i1w = i1[rows[:, None], np.stack((k - 1, k, k + 1), axis=1)]
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                bracket = (0.8*np.nanmin(i1w, axis=1),
+                           1.25*np.nanmax(i1w, axis=1))
+            return betas[k - 1], betas[k], betas[k + 1], bracket
+
+        if with_mtpa:
+            a, b, c, bracket = window(k0)
+            beta = parabolic(
+                lambda b: i1_torque(b, torque, n, bracket=bracket), a, b, c)
+        else:
+            beta = np.zeros(len(torque))
+        i1x = i1_torque(beta, torque, n)
+        if with_mtpa:
+            # no current at zero torque (see iqd_tmech)
+            i1x = np.where(np.abs(torque) < 1e-2, 0, i1x)
+
+        # voltage limit: root between the feasible point with
+        # minimal current and its infeasible neighbour
+        limited = ~(u1(beta, i1x, w1) <= u1max)
+        if np.any(limited):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                k1 = np.argmin(np.where(feasible & ~np.isnan(i1),
+                                        i1, np.inf), axis=1)
+                # min voltage if no grid point is feasible
+                ku = np.argmin(np.where(np.isnan(u), np.inf, u), axis=1)
+            nofeasible = ~np.any(feasible, axis=1)
+            k1 = np.where(nofeasible, ku, k1)
+            kp = np.minimum(k1 + 1, nbeta - 1)
+            km = np.maximum(k1 - 1, 0)
+            kn = np.where(
+                ~feasible[rows, kp] & (i1[rows, kp] < i1[rows, k1]),
+                kp, km)
+            bracket = window(k1)[-1]
+
+            def u1_torque(beta):
+                return u1(beta, i1_torque(beta, torque, n, bracket=bracket),
+                          w1)
+
+            a = betas[k1]
+            if np.any(limited & nofeasible):
+                a = np.where(nofeasible,
+                             parabolic(u1_torque, *window(ku)[:3]), a)
+            b = illinois(lambda b: u1_torque(b) - u1max,
+                          a, betas[kn], 1e-10)
+            beta = np.where(limited, b, beta)
+            i1x = np.where(limited, i1_torque(b, torque, n), i1x)
+
+        iq, id = np.sqrt(2)*i1x*np.cos(beta), np.sqrt(2)*i1x*np.sin(beta)
+        tx = tq(iq, id, n)
+        ok = ((np.abs(tx - torque) <= 1e-6*np.maximum(1, np.abs(torque))) &
+              (u1(beta, i1x, w1) <= u1max*(1 + 1e-6)))
+        if with_mtpa:
+            ok |= (np.abs(torque) < 1e-2) & (i1x == 0)
+        # fallback
+        iqd_umax = self.iqd_tmech_umax if with_tmech else self.iqd_torque_umax
+        failed = np.flatnonzero(~ok)
+        if log_fallback:
+            log_fallback(len(failed))
+        for k in failed:
+            logger.debug("batch: no solution for w1 %f torque %f",
+                         w1[k], torque[k])
+            iq[k], id[k], tx[k] = iqd_umax(torque[k], w1[k], u1max,
+                                           with_mtpa=with_mtpa)
+        return iq.reshape(shape), id.reshape(shape), tx.reshape(shape)
+
     def iqd_pmech_imax_umax(self, n, P, i1max, u1max, with_mtpa, with_tmech, log=0):
         """return d-q current and shaft torque at speed n, P const and max voltage"""
         T = P / n / 2 / np.pi
@@ -604,7 +851,7 @@ class PmRelMachine(object):
                 raise ValueError(
                     f"invalid betarange for maxtorque<0: {self.betarange}")
         if with_mtpa:
-            iq, id, _ = self.mtpa(i1max)
+            iq, id, _ = self.mtpa(i1max, exact=False)
         else:
             iq, id = iqd(0, i1max)
         deps = 1e-6
@@ -668,34 +915,200 @@ class PmRelMachine(object):
                             self.uqd(w1, iq, id))/np.sqrt(2))
         return iq, id, tq
 
-    def mtpa(self, i1):
-        """return iq, id, torque at maximum torque of current i1"""
+    def __setattr__(self, name, value):
+        # changed parameters invalidate the mtpa and mtpv tables
+        if not name.startswith('_') and name != 'check_extrapolation':
+            self.__dict__.pop('_tables', None)
+        object.__setattr__(self, name, value)
+
+    def clear_tables(self):
+        """remove the mtpa and mtpv tables. They are removed automatically
+        if a parameter is set but must be cleared explicitly if the flux
+        or loss functions are changed in place."""
+        self.__dict__.pop('_tables', None)
+
+    def _table(self, key, func):
+        """return memoized table key (created by func if missing)"""
+        tables = self.__dict__.setdefault('_tables', {})
+        if key not in tables:
+            tables[key] = func()
+        return tables[key]
+
+    def _torque_grid(self, beta, i1):
+        """return iq, id, psid, psiq and torque of a beta, i1 grid
+        (nan outside the range of the flux maps)"""
+        iq, id = np.sqrt(2)*i1*np.cos(beta), np.sqrt(2)*i1*np.sin(beta)
+        psid, psiq = (np.asarray(x, dtype=float)*np.ones(iq.shape)
+                      for x in self.psi(iq, id))
+        outside = np.zeros(iq.shape, dtype=bool)
+        for x, r in ((iq, getattr(self, 'iqrange', 0)),
+                     (id, getattr(self, 'idrange', 0))):
+            if r:
+                outside |= (x < r[0] - 1e-9*abs(r[0])) | (
+                    x > r[1] + 1e-9*abs(r[1]))
+        psid = np.where(outside, np.nan, psid)
+        psiq = np.where(outside, np.nan, psiq)
+        tq = self.m*self.p/2*(psid*iq - psiq*id)
+        return iq, id, psid, psiq, tq
+
+    def mtpa_table(self, maxtorque=True):
+        """return the mtpa table of motor (maxtorque=True) or generator
+        operation as dict of arrays i1, beta, T (None if the current
+        range is unbounded). The table is calculated once on a
+        beta, i1 grid and refined by parabolic interpolation."""
+        return self._table(('mtpa', maxtorque),
+                           partial(self._mtpa_table, maxtorque))
+
+    def _mtpa_table(self, maxtorque):
+        i1max = getattr(self, 'i1range', (0, np.inf))[1]
+        betarange = getattr(self, 'betarange', (-np.pi, np.pi))
+        if maxtorque:
+            b0, b1 = max(-np.pi/2, betarange[0]), min(0, betarange[1])
+        else:
+            b0, b1 = max(-np.pi, betarange[0]), min(-np.pi/2, betarange[1])
+        if not np.isfinite(i1max) or b1 <= b0:
+            return None
+        sign = 1 if maxtorque else -1
+        betas = np.linspace(b0, b1, 91)
+        i1 = np.linspace(0, i1max, 41)[1:]
+        tq = sign*self._torque_grid(betas[:, None], i1[None, :])[-1]
+        tq = np.where(np.isnan(tq), -np.inf, tq)
+        valid = np.isfinite(np.max(tq, axis=0))
+        k = np.clip(np.argmax(tq, axis=0), 1, len(betas) - 2)
+        cols = np.arange(len(i1))
+        t0, t1, t2 = tq[k - 1, cols], tq[k, cols], tq[k + 1, cols]
+        # vertex of parabola
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x = np.where(t0 - 2*t1 + t2 < 0,
+                         (t0 - t2)/(t0 - 2*t1 + t2)/2, 0)
+        dbeta = betas[1] - betas[0]
+        beta = betas[k] + np.clip(np.nan_to_num(x), -1, 1)*dbeta
+        beta, i1 = beta[valid], i1[valid]
+        if len(i1) < 2:
+            return None
+        return dict(i1=i1, beta=beta, dbeta=dbeta,
+                    T=self._torque_grid(beta, i1)[-1])
+
+    def _mtpa_beta(self, i1):
+        """return current angle of mtpa table and its resolution"""
+        i1 = float(np.squeeze(i1))  # fsolve passes arrays
+        tab = self.mtpa_table(i1 > 0)
+        if tab is None or abs(i1) > tab['i1'][-1]:
+            return None
+        return np.interp(abs(i1), tab['i1'], tab['beta']), tab['dbeta']
+
+    def _minimize_beta(self, fun, b0, bt, exact):
+        """return current angle and minimum of fun near the table value bt
+        (starting at b0 if there is no table)"""
+        if bt is not None:
+            if not exact:
+                return bt[0], fun(bt[0])
+            betarange = getattr(self, 'betarange', (-np.pi, np.pi))
+            bounds = (max(bt[0] - 2*bt[1], betarange[0]),
+                      min(bt[0] + 2*bt[1], betarange[1]))
+            res = so.minimize_scalar(fun, bounds=bounds, method='bounded',
+                                     options={'xatol': 1e-6})
+            # must be inside of the bounds or at the range limits
+            if ((bounds[0] + bt[1]/10 < res.x or
+                 bounds[0] == betarange[0]) and
+                (res.x < bounds[1] - bt[1]/10 or
+                 bounds[1] == betarange[1])):
+                return res.x, res.fun
+            b0 = res.x  # not inside: search again
+        bopt, fopt, iter, funcalls, warnflag = so.fmin(
+            fun, b0, full_output=True, disp=0)
+        return bopt[0], fopt
+
+    def mtpa(self, i1, exact=True):
+        """return iq, id, torque at maximum torque of current i1
+        (starting at the mtpa table value, see mtpa_table. The table
+        value is returned if exact is False)"""
         sign = -1 if i1 > 0 else 1
         b0 = 0 if i1 > 0 else -np.pi
-        bopt, fopt, iter, funcalls, warnflag = so.fmin(
+        bopt, fopt = self._minimize_beta(
             lambda x: sign*self.torque_iqd(*iqd(x, abs(i1))), b0,
-            full_output=True,
-            disp=0)
-        iq, id = iqd(bopt[0], abs(i1))
+            self._mtpa_beta(i1), exact)
+        iq, id = iqd(bopt, abs(i1))
         return [iq, id, sign*fopt]
 
-    def mtpa_tmech(self, i1, n):
-        """return iq, id, shaft torque at maximum torque of current i1"""
+    def mtpa_tmech(self, i1, n, exact=True):
+        """return iq, id, shaft torque at maximum torque of current i1
+        (starting at the mtpa table value, see mtpa)"""
         sign = -1 if i1 > 0 else 1
         b0 = 0 if i1 > 0 else -np.pi
-        bopt, fopt, iter, funcalls, warnflag = so.fmin(
+        bopt, fopt = self._minimize_beta(
             lambda x: sign*self.tmech_iqd(*iqd(x, abs(i1)), n), b0,
-            full_output=True,
-            disp=0)
-        iq, id = iqd(bopt[0], abs(i1))
+            self._mtpa_beta(i1), exact)
+        iq, id = iqd(bopt, abs(i1))
         return [iq, id, sign*fopt]
 
-    def mtpv(self, w1, u1, iqd0=0, maxtorque=True, i1max=0):
+    def mtpv_table(self, maxtorque=True):
+        """return the mtpv table of motor (maxtorque=True) or generator
+        operation as dict of arrays psi, iq, id, T with the currents of
+        maximum (minimum) torque at the flux amplitude psi = |uqd|/w1
+        (neglecting the resistance, None if the current range is
+        unbounded)."""
+        return self._table(('mtpv', maxtorque),
+                           partial(self._mtpv_table, maxtorque))
+
+    def _mtpv_table(self, maxtorque):
+        i1max = getattr(self, 'i1range', (0, np.inf))[1]
+        if not np.isfinite(i1max):
+            return None
+        betarange = getattr(self, 'betarange', (-np.pi, np.pi))
+        sign = 1 if maxtorque else -1
+        betas = np.linspace(*betarange, 181)
+        i1 = np.linspace(0, i1max, 61)
+        iq, id, psid, psiq, tq = self._torque_grid(betas[:, None],
+                                                   i1[None, :])
+        flux = np.sqrt((self.ls*id + psid)**2 + (self.ls*iq + psiq)**2)
+        psi = np.linspace(np.nanmin(flux), np.nanmax(flux), 42)[1:-1]
+        # torque contour crossings of the flux levels along i1
+        d = flux[None, :, :] - psi[:, None, None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x = d[:, :, :-1]/(d[:, :, :-1] - d[:, :, 1:])
+        crossing = (x >= 0) & (x <= 1)
+        x = np.where(crossing, x, 0)
+
+        def at(a):
+            return a[None, :, :-1] + x*(a[None, :, 1:] - a[None, :, :-1])
+        tc = np.where(crossing, sign*at(tq), -np.inf)
+        tc = np.where(np.isnan(tc), -np.inf, tc).reshape(len(psi), -1)
+        k = np.argmax(tc, axis=1)
+        rows = np.arange(len(psi))
+        valid = np.isfinite(tc[rows, k])
+        if np.sum(valid) < 2:
+            return None
+        return dict(psi=psi[valid],
+                    iq=at(iq).reshape(len(psi), -1)[rows, k][valid],
+                    id=at(id).reshape(len(psi), -1)[rows, k][valid],
+                    T=sign*tc[rows, k][valid])
+
+    def _mtpv_iqd(self, w1, u1, maxtorque):
+        """return d-q current of the mtpv table at frequency w1 and
+        voltage u1 (None if out of range)"""
+        tab = self.mtpv_table(maxtorque)
+        if tab is None or w1 == 0:
+            return None
+        psi = np.sqrt(2)*u1/abs(w1)
+        if not tab['psi'][0] <= psi <= tab['psi'][-1]:
+            return None
+        return (np.interp(psi, tab['psi'], tab['iq']),
+                np.interp(psi, tab['psi'], tab['id']))
+
+    def mtpv(self, w1, u1, iqd0=0, maxtorque=True, i1max=0, exact=True):
         """return d-q-current, torque for voltage and frequency
-        with maximum (maxtorque=True) or minimum torque """
+        with maximum (maxtorque=True) or minimum torque
+        (starting at the mtpv table value if iqd0 is not set, see
+        mtpv_table. The table value is returned if exact is False)"""
         sign = -1 if maxtorque else 1
         if np.isscalar(iqd0):
-            i0 = (-sign*self.i1range[1]/20, -self.i1range[1]/np.sqrt(2))
+            i0 = self._mtpv_iqd(w1, u1, maxtorque)
+            if i0 is None:
+                i0 = (-sign*self.i1range[1]/20,
+                      -self.i1range[1]/np.sqrt(2))
+            elif not exact:
+                return i0[0], i0[1], self.torque_iqd(*i0)
         else:
             i0 = iqd0
         n = w1/2/np.pi/self.p
@@ -713,15 +1126,22 @@ class PmRelMachine(object):
             return res.x[0], res.x[1], sign*res.fun
         raise ValueError(f"mtpv w1={w1} u1={u1} i0 {i0} iqd0 {iqd0} maxtorque={maxtorque} res: {res['message']}")
 
-    def mtpv_tmech(self, w1, u1, iqd0=0, maxtorque=True, i1max=0):
+    def mtpv_tmech(self, w1, u1, iqd0=0, maxtorque=True, i1max=0,
+                   exact=True):
         """return d-q-current, shaft torque for voltage and frequency
-        with maximum (maxtorque=True) or minimum torque """
+        with maximum (maxtorque=True) or minimum torque
+        (starting at the mtpv table value, see mtpv)"""
         sign = -1 if maxtorque else 1
+        n = w1/2/np.pi/self.p
         if np.isscalar(iqd0):
-            i0 = (-sign*self.i1range[1]/20, -self.i1range[1]/np.sqrt(2))
+            i0 = self._mtpv_iqd(w1, u1, maxtorque)
+            if i0 is None:
+                i0 = (-sign*self.i1range[1]/20,
+                      -self.i1range[1]/np.sqrt(2))
+            elif not exact:
+                return i0[0], i0[1], self.tmech_iqd(*i0, n)
         else:
             i0 = iqd0
-        n = w1/2/np.pi/self.p
         constraints=[{'type': 'eq',
                      'fun': lambda iqd:
                      np.sqrt(2)*u1 - la.norm(
@@ -1318,19 +1738,19 @@ class PmRelMachineLdq(PmRelMachine):
                 logger.debug("interp2d beta %s i1 %s", beta, i1)
                 return
             elif len(i1) == 1:
-                def interp(x, b, i):
-                    return ip.InterpolatedUnivariateSpline(beta, x, k=1)(b)
-                self.ld = partial(interp, ld)
-                self.psim = partial(interp, psim)
-                self.lq = partial(interp, lq)
+                def interp(spl, b, i):
+                    return spl(b)
+                self.ld, self.psim, self.lq = [
+                    partial(interp, ip.InterpolatedUnivariateSpline(
+                        beta, x, k=1)) for x in (ld, psim, lq)]
                 logger.debug("interpolatedunivariatespline beta %s", beta)
                 return
             if len(beta) == 1:
-                def interp(x, b, i):
-                    return ip.InterpolatedUnivariateSpline(i1, x, k=1)(i)
-                self.ld = partial(interp, ld)
-                self.psim = partial(interp, psim)
-                self.lq = partial(interp, lq)
+                def interp(spl, b, i):
+                    return spl(i)
+                self.ld, self.psim, self.lq = [
+                    partial(interp, ip.InterpolatedUnivariateSpline(
+                        i1, x, k=1)) for x in (ld, psim, lq)]
                 logger.debug("interpolatedunivariatespline i1 %s", i1)
                 return
 
@@ -1339,16 +1759,19 @@ class PmRelMachineLdq(PmRelMachine):
 
         self.betarange = min(beta), max(beta)
         self.i1range = (0, np.max(i1))
-        def interp(x, b, i):
-            return ip.RectBivariateSpline(beta, i1, np.asarray(x)).ev(b, i)
-        self.ld = partial(interp, ld)
-        self.psim = partial(interp, psim)
-        self.lq = partial(interp, lq)
+        # the splines are fitted once (psi is called in root finding loops)
+        self.ld, self.psim, self.lq = [
+            ip.RectBivariateSpline(beta, i1, np.asarray(x)).ev
+            for x in (ld, psim, lq)]
         logger.debug("rectbivariatespline beta %s i1 %s", beta, i1)
 
     def psi(self, iq, id, tol=1e-4):
-        """return psid, psiq of currents iq, id"""
+        """return psid, psiq of currents iq, id
+        (scalars or arrays of operating points)"""
         beta, i1 = betai1(np.asarray(iq), np.asarray(id))
+        if np.ndim(beta) > 0:
+            return self._psi_array(np.asarray(iq), np.asarray(id),
+                                   beta, i1, tol)
         if np.isclose(beta, np.pi, atol=1e-4):
             beta = -np.pi
         #logger.debug('beta %f (%f, %f) i1 %f %f',
@@ -1366,6 +1789,23 @@ class PmRelMachineLdq(PmRelMachine):
         psiq = self.lq(beta, i1)*iq
         return (psid, psiq)
 
+    def _psi_array(self, iq, id, beta, i1, tol):
+        """return psid, psiq arrays of current arrays iq, id
+        (nan if out of range)"""
+        beta = np.where(np.isclose(beta, np.pi, atol=1e-4), -np.pi, beta)
+        if self.psid:
+            psid, psiq = self.psid(beta, i1), self.psiq(beta, i1)
+        else:
+            psid = self.ld(beta, i1)*id + np.sqrt(2)*self.psim(beta, i1)
+            psiq = self.lq(beta, i1)*iq
+        if self.check_extrapolation:
+            outside = ((self.betarange[0]-tol > beta) |
+                       (self.betarange[1]+tol < beta) |
+                       (i1 > 1.01*self.i1range[1]))
+            psid = np.where(outside, np.nan, psid)
+            psiq = np.where(outside, np.nan, psiq)
+        return (psid, psiq)
+
     def iqdmin(self, i1):
         """max iq, min id for given current"""
         if self.betarange[0] <= -np.pi/2 <= self.betarange[1]:
@@ -1621,6 +2061,9 @@ class PmRelMachinePsidq(PmRelMachine):
     def transient(self, u1, tload, speed,
                   fault_type=3, # 'LLL', 'LL', 'LG',
                   tshort=0, tend=0.1, nsamples=200):
+        """return the short circuit currents and torque of an operating
+        point (see transient_batch for the arguments). The flux maps are
+        extended as in transient_batch (see _transient_flux)."""
         ns = round(tshort/tend*nsamples), round((tend-tshort)/tend*nsamples)
         w1 = 2*np.pi*self.p*speed
         i0 = self.iqd_torque(tload)
@@ -1634,8 +2077,7 @@ class PmRelMachinePsidq(PmRelMachine):
                  - la.norm(self.uqd(w1, *iqd))}))
         iqx, idx = res.x
         uq0, ud0 = self.uqd(w1, iqx, idx)
-        psid = ip.RectBivariateSpline(self.iq, self.id, self.psid, kx=3, ky=3)
-        psiq = ip.RectBivariateSpline(self.iq, self.id, self.psiq, kx=3, ky=3)
+        flux = self._table('transient_flux', self._transient_flux)[0]
         logger.info("transient: Torque %f Nm, Speed %f rpm, Curr %f A",
                     tload, speed*60, betai1(iqx, idx)[1])
         #_ld, _lq, _psim = self.ldlqpsim()
@@ -1650,11 +2092,8 @@ class PmRelMachinePsidq(PmRelMachine):
                 return (uq0, ud0) if t < tshort else (0, 0)
             def didt(t, iqd):
                 uq, ud = U(t)
-                ldd = psid(*iqd, dx=0, dy=1)[0,0]
-                lqq = psiq(*iqd, dx=1, dy=0)[0,0]
-                ldq = psid(*iqd, dx=1, dy=0)[0,0]
-                lqd = psiq(*iqd, dx=0, dy=1)[0,0]
-                psi = psid(*iqd)[0,0], psiq(*iqd)[0,0]
+                f, ((lqq, lqd), (ldq, ldd)) = flux(*iqd)
+                psi = f[1], f[0]
                 return [
                     (-ldd*psi[0]*w1 + ldd*(uq-self.r1*iqd[0])
                      - lqd*psi[1]*w1 - lqd*(ud-self.r1*iqd[1]))/(ldd*lqq - ldq*lqd),
@@ -1675,11 +2114,8 @@ class PmRelMachinePsidq(PmRelMachine):
                 gamma = w1*t
                 iqd = [2/3*i*(-np.sin(gamma) + np.sin(gamma+2*np.pi/3)),
                        2/3*i*(np.cos(gamma) + np.cos(gamma+2*np.pi/3))]
-                ldd = psid(*iqd, dx=0, dy=1)[0,0]
-                lqq = psiq(*iqd, dx=1, dy=0)[0,0]
-                ldq = psid(*iqd, dx=1, dy=0)[0,0]
-                lqd = psiq(*iqd, dx=0, dy=1)[0,0]
-                psi = psid(*iqd)[0, 0], psiq(*iqd)[0, 0]
+                f, ((lqq, lqd), (ldq, ldd)) = flux(*iqd)
+                psi = f[1], f[0]
                 A = ((ldd-lqq)*np.cos(2*gamma + np.pi/3)
                      - (ldq+lqd)*np.sin(2*gamma + np.pi/3) + lqq + ldd)
                 B = 2/3*w1*((ldd-lqq)*np.sin(2*gamma + np.pi/3)
@@ -1747,3 +2183,195 @@ class PmRelMachinePsidq(PmRelMachine):
             'peaks': peaks,
             'valleys': valleys,
             'torque': self.torque_iqd(idq[1], idq[0])}
+
+    def _transient_flux(self):
+        """return the flux model of transient and transient_batch:
+        function of iq, id returning the flux linkage psiq, psid
+        (including the leakage) and its jacobian, and the iq range.
+        Flux maps with iq >= 0 are mirrored to negative iq and all maps
+        are extended linearly beyond their current range."""
+        iq, psid, psiq = self.iq, self.psid, self.psiq
+        if iq[0] == 0:
+            iq = np.concatenate((-iq[:0:-1], iq))
+            psid = np.vstack((psid[:0:-1], psid))
+            psiq = np.vstack((-psiq[:0:-1], psiq))
+        iqrange = iq[0], iq[-1]
+        return partial(_flux_ext, ip.RectBivariateSpline(iq, self.id, psiq),
+                       ip.RectBivariateSpline(iq, self.id, psid),
+                       iqrange, self.idrange, self.ls), iqrange
+
+    def _transient_table(self, ngrid=201):
+        """return the tables of transient_batch: the flux linkage
+        (see _transient_flux) and its jacobian on a regular iq, id grid
+        and the inverse table of the q-d current on a regular psiq, psid
+        grid (coefficients of the bilinear interpolation)."""
+        flux, iqrange = self._table('transient_flux', self._transient_flux)
+
+        # flux linkage and jacobian on the current range extended by
+        # half its span
+        ilo = np.array([r[0] - (r[1] - r[0])/2
+                        for r in (iqrange, self.idrange)])
+        istep = 2*np.array([r[1] - r[0]
+                            for r in (iqrange, self.idrange)])/(ngrid - 1)
+        i = np.meshgrid(*[ilo[k] + istep[k]*np.arange(ngrid)
+                          for k in range(2)], indexing='ij')
+        f, jac = flux(*i)
+        fwd = np.concatenate((f, jac.reshape(4, ngrid, ngrid)))
+        psi = f.reshape(2, -1)
+        lo, hi = np.min(psi, axis=1), np.max(psi, axis=1)
+        step = (hi - lo)/(ngrid - 1)
+
+        # newton iteration of the unconverged points starting at the
+        # linear fit of the maps (step length limited to 1/4 of the
+        # current span, damped to break cycles at the map boundary)
+        A = np.linalg.lstsq(np.column_stack(
+            (np.ravel(i[0]), np.ravel(i[1]), np.ones(i[0].size))),
+                            psi.T, rcond=None)[0]
+        psi = np.array(np.meshgrid(*np.linspace(lo, hi, ngrid).T,
+                                   indexing='ij')).reshape(2, -1)
+        iqd = np.linalg.inv(A[:2].T).dot(psi - A[2][:, None])
+        dmax = np.array([iqrange[1] - iqrange[0],
+                         self.idrange[1] - self.idrange[0]])[:, None]/4
+        tol = 1e-9*np.max(np.abs(psi))
+        k = np.arange(psi.shape[1])
+        for n in range(200):
+            f, jac = flux(*iqd[:, k])
+            r = f - psi[:, k]
+            conv = np.max(np.abs(r), axis=0) < tol
+            k, r, jac = k[~conv], r[:, ~conv], jac[:, :, ~conv]
+            if not len(k):
+                break
+            det = jac[0, 0]*jac[1, 1] - jac[0, 1]*jac[1, 0]
+            d = np.array([jac[1, 1]*r[0] - jac[0, 1]*r[1],
+                          jac[0, 0]*r[1] - jac[1, 0]*r[0]])/det
+            d /= np.maximum(1, np.max(np.abs(d)/dmax, axis=0))
+            iqd[:, k] -= d/2 if n > 30 else d
+        else:
+            logger.debug("inverse flux table: %d unconverged points",
+                         len(k))
+        iqd = iqd.reshape(2, ngrid, ngrid)
+        return dict(flux=flux, psi=_bilinear_table(fwd),
+                    ilo=ilo, istep=istep,
+                    iqd=_bilinear_table(iqd), psilo=lo, psistep=step)
+
+    def transient_batch(self, u1, tload, speed,
+                        fault_type=3,  # 'LLL', 'LL'
+                        tshort=0, tend=0.1, nsamples=200, nper=16):
+        """return the short circuit currents and torque of many operating
+        points (vectorized transient). The equations are integrated
+        simultaneously with fixed step RK4: the 3 phase short circuit
+        with the flux linkage as state using an inverse flux table,
+        the 2 phase short circuit with the phase current as state.
+
+        Args:
+          u1: max phase voltage (V)
+          tload: load torque (Nm)
+          speed: speed (1/s)
+            u1, tload and speed are scalars or arrays of equal size
+          fault_type: 3 (3 phase) or 2 (2 phase short circuit)
+          tshort: time of short circuit (s)
+          tend: end time (s)
+          nsamples: number of time samples
+          nper: number of integration steps per period of the
+            stator frequency
+
+        Returns dict with
+          t: array of nsamples time values
+          iq, id, torque: arrays of shape (nsim, nsamples)
+          istat: array of phase currents of shape (nsim, 3, nsamples)
+          peaks, valleys: lists of nsim dicts (see find_peaks_and_valleys)
+        """
+        u1, tload, speed = (np.ravel(x) for x in np.broadcast_arrays(
+            np.asarray(u1, dtype=float), np.asarray(tload, dtype=float),
+            np.asarray(speed, dtype=float)))
+        ns = round(tshort/tend*nsamples), round((tend-tshort)/tend*nsamples)
+        w1 = 2*np.pi*self.p*speed
+        iqx, idx = np.empty(w1.shape), np.empty(w1.shape)
+        for u in np.unique(u1):
+            sel = u1 == u
+            iqx[sel], idx[sel], _ = self.iqd_tmech_umax_batch(
+                tload[sel], w1[sel], u)
+        logger.info("transient: %d operating points", len(w1))
+        tab = self._table('transient', self._transient_table)
+
+        t = np.linspace(tshort, tend, ns[1])
+        nsub = max(1, int(np.ceil(
+            np.max(w1)*(t[-1] - t[0])/max(1, ns[1] - 1)*nper/2/np.pi)))
+        h = (t[-1] - t[0])/max(1, ns[1] - 1)/nsub
+        r1 = self.r1
+        if fault_type == 3:  # 3 phase short circuit
+            def current(psi):
+                return _bilinear(tab['iqd'], tab['psilo'], tab['psistep'],
+                                 *psi)
+
+            def dydt(t, psi):
+                iq, id = current(psi)
+                return np.array([-r1*iq - w1*psi[1],
+                                 -r1*id + w1*psi[0]])
+            y = tab['flux'](iqx, idx)[0]
+            state = current
+        else:  # 2 phase short circuit
+            def iqd2(t, i):
+                gamma = w1*t
+                return (2/3*i*(-np.sin(gamma) + np.sin(gamma+2*np.pi/3)),
+                        2/3*i*(np.cos(gamma) + np.cos(gamma+2*np.pi/3)))
+
+            def dydt(t, i):
+                gamma = w1*t
+                psiq, psid, lqq, lqd, ldq, ldd = _bilinear(
+                    tab['psi'], tab['ilo'], tab['istep'], *iqd2(t, i))
+                A = ((ldd-lqq)*np.cos(2*gamma + np.pi/3)
+                     - (ldq+lqd)*np.sin(2*gamma + np.pi/3) + lqq + ldd)
+                B = 2/3*w1*((ldd-lqq)*np.sin(2*gamma + np.pi/3)
+                            + (ldq+lqd)*np.cos(2*gamma + np.pi/3)
+                            + ldq - lqd) + 2*r1
+                C = np.sqrt(3)*w1*(psid*np.sin(gamma + np.pi/6)
+                                   + psiq*np.cos(gamma + np.pi/6))
+                return -(B*i + C)/A
+            y = np.zeros(w1.shape)
+
+            def state(i):
+                return i
+
+        res = [state(y)]
+        for k in range(len(t) - 1):
+            for j in range(nsub):
+                tk = t[k] + j*h
+                k1 = dydt(tk, y)
+                k2 = dydt(tk + h/2, y + h/2*k1)
+                k3 = dydt(tk + h/2, y + h/2*k2)
+                k4 = dydt(tk + h, y + h*k3)
+                y = y + h/6*(k1 + 2*k2 + 2*k3 + k4)
+            res.append(state(y))
+        y = np.moveaxis(res, 0, -1)
+
+        t = np.linspace(0, tend, nsamples)
+        gamma = w1[:, None]*t
+        phases = (0, 2*np.pi/3, -2*np.pi/3)
+        if fault_type == 3:  # 3 phase short circuit
+            iqd = np.concatenate((np.broadcast_to(
+                np.array([iqx, idx])[:, :, None], (2, len(w1), ns[0])), y),
+                                 axis=-1)
+            iabc = np.moveaxis([iqd[1]*np.cos(gamma - a)
+                                - iqd[0]*np.sin(gamma - a)
+                                for a in phases], 0, 1)
+        else:
+            gamma0 = w1[:, None]*np.linspace(0, tshort, ns[0])
+            ip0 = [idx[:, None]*np.cos(gamma0 - a)
+                   - iqx[:, None]*np.sin(gamma0 - a)
+                   for a in phases]
+            iabc = np.concatenate((np.moveaxis(ip0, 0, 1), np.moveaxis(
+                [y, -y, np.zeros(y.shape)], 0, 1)), axis=-1)
+            iqd = 2/3*np.array(
+                [-sum(iabc[:, k]*np.sin(gamma - a)
+                      for k, a in enumerate(phases)),
+                 sum(iabc[:, k]*np.cos(gamma - a)
+                     for k, a in enumerate(phases))])
+        pv = [find_peaks_and_valleys(t, x, tshort) for x in iabc]
+        return {
+            't': t,
+            'iq': iqd[0], 'id': iqd[1],
+            'istat': iabc,
+            'peaks': [x[0] for x in pv],
+            'valleys': [x[1] for x in pv],
+            'torque': self.torque_iqd(iqd[0], iqd[1])}
@@ -3,6 +3,7 @@
 """
 import logging
 import warnings
+import inspect
 import pathlib
 import numpy as np
 import scipy.optimize as so
@@ -274,6 +275,45 @@ def _gradient_respecting_bounds(bounds, fun, eps=1e-8):
     return gradient
 
 
+# partial derivatives of RegularGridInterpolator (nu) need scipy >= 1.13
+_RGI_NU = 'nu' in inspect.signature(
+    ip.RegularGridInterpolator.__call__).parameters
+
+
+def _stacked(funcs):
+    """return a single interpolator of the values of funcs
+    (RegularGridInterpolators on the same grid)"""
+    return ip.RegularGridInterpolator(
+        funcs[0].grid, np.stack([f.values for f in funcs], axis=-1),
+        method=funcs[0].method, bounds_error=False, fill_value=None)
+
+
+def _rgi_derivatives(f, xc, jac, hess, order):
+    """return values (k, n), gradients (3, k, n) and hessians (3, 3, k, n)
+    with respect to iq, id, iex of the stacked interpolator f
+    arguments:
+    xc: (3, n) grid coordinates of the currents
+    jac: (3, 3, n) derivatives of the coordinates (axis 0)
+         with respect to the currents (axis 1)
+    hess: (3, 3, 3, n) second derivatives of the coordinates
+    order: 0: values only, 1: with gradients, 2: with hessians"""
+    xi = xc.T
+    v = f(xi).T
+    if order < 1:
+        return v, None, None
+    e = np.eye(3, dtype=int)
+    d1 = np.array([f(xi, nu=e[c]).T for c in range(3)])
+    grad = np.einsum('ckn,cvn->vkn', d1, jac)
+    if order < 2:
+        return v, grad, None
+    d2 = np.empty((3, 3) + v.shape)
+    for c in range(3):
+        for d in range(c, 3):
+            d2[c, d] = d2[d, c] = f(xi, nu=e[c] + e[d]).T
+    return v, grad, (np.einsum('cdkn,cvn,dwn->vwkn', d2, jac, jac)
+                     + np.einsum('ckn,cvwn->vwkn', d1, hess))
+
+
 class SynchronousMachine(object):
     """ represent Synchronous machine with wound rotor (EESM)
 
@@ -431,9 +471,117 @@ class SynchronousMachine(object):
     def iqd_plmag(self, iq, id, f1):
         return np.zeros(np.asarray(iq).shape)
 
-    def iqd_tmech(self, torque, n, disp=False, maxiter=500):
-        """return currents for shaft torque with minimal losses"""
-        if torque > 0:
+    def _table(self, key, func):
+        """return memoized table key (created by func if missing)"""
+        tables = self.__dict__.setdefault('_tables', {})
+        if key not in tables:
+            tables[key] = func()
+        return tables[key]
+
+    def _interpolators(self):
+        """return the interpolator of psid, psiq, the keys of the loss maps
+        and their interpolator (None if the loss maps are missing)
+        with stacked values"""
+        def create():
+            losskeys = [k for k in self._losses
+                        if isinstance(self._losses[k],
+                                      ip.RegularGridInterpolator)]
+            return (_stacked([self.psidf, self.psiqf]), losskeys,
+                    _stacked([self._losses[k] for k in losskeys])
+                    if losskeys else None)
+        return self._table('interpolators', create)
+
+    def _derivatives(self, iqde, order=1, n=None, w1=None):
+        """return the value, gradient and hessian (order 2) with respect
+        to iq, id, iex of the torque (shaft torque at speed n if n is not
+        None) and of the squared voltage amplitude at frequency w1 (if w1
+        is not None) of the currents iqde (3, k)"""
+        iq, id, iex = iqde
+        psif, losskeys, lossf = self._interpolators()
+        xc, jac, hess = self._coords(iq, id, iex)
+        psi, dpsi, d2psi = _rgi_derivatives(psif, xc, jac, hess, order)
+        c = self.m*self.p/2
+        T = c*(psi[0]*iq - psi[1]*id)
+        dT = d2T = None
+        if order > 0:
+            dT = c*(dpsi[:, 0]*iq - dpsi[:, 1]*id)
+            dT[0] += c*psi[0]
+            dT[1] -= c*psi[1]
+        if order > 1:
+            d2T = c*(d2psi[:, :, 0]*iq - d2psi[:, :, 1]*id)
+            for k, s in ((0, c), (1, -c)):
+                d2T[k] += s*dpsi[:, k]
+                d2T[:, k] += s*dpsi[:, k]
+        if n is not None:
+            # loss torque (see tloss_iqd)
+            n = np.broadcast_to(n, np.shape(iq))
+            nx = np.where(n > 1e-3, n, 1)
+            T = T - np.where(n > 1e-3, self.pfric(nx)/(2*np.pi*nx), 0)
+            if lossf is not None:
+                kw = np.where(n > 1e-3, self.kpfe/(2*np.pi*nx), 0)*np.array(
+                    [(self.p*nx/self.fo)**self.plexp[k][0]
+                     for k in losskeys])
+                pl, dpl, d2pl = _rgi_derivatives(lossf, xc, jac, hess, order)
+                T = T - np.sum(kw*pl, axis=0)
+                if order > 0:
+                    dT -= np.sum(kw*dpl, axis=1)
+                if order > 1:
+                    d2T -= np.sum(kw*d2pl, axis=2)
+        r = [(T, dT, d2T)]
+        if w1 is not None:
+            w1 = np.broadcast_to(w1, np.shape(iq))
+            r1 = self.rstat(w1)
+            uq, ud = r1*iq + w1*psi[0], r1*id - w1*psi[1]
+            dU = d2U = None
+            if order > 0:
+                duq, dud = w1*dpsi[:, 0], -w1*dpsi[:, 1]
+                duq[0] += r1
+                dud[1] += r1
+                dU = 2*(uq*duq + ud*dud)
+            if order > 1:
+                d2U = 2*(duq[:, None]*duq + dud[:, None]*dud
+                         + w1*(uq*d2psi[:, :, 0] - ud*d2psi[:, :, 1]))
+            r.append((uq**2 + ud**2, dU, d2U))
+        return r
+
+    def _culoss_grad(self, iqde):
+        """return the gradient of culoss"""
+        r1, r2 = self.rstat(0), self.rrot(0)
+        return np.array((3*r1*iqde[0], 3*r1*iqde[1], 2*r2*iqde[2]))
+
+    def _iqd_constraints(self, torque, n=None, w1=None, u1max=0):
+        """return the equality constraints with jacobians of the torque
+        (shaft torque at speed n if n is not None) and of the voltage
+        u1max at frequency w1 (if w1 is not None) for minimize
+        (without jacobians if the interpolators have no derivatives)"""
+        def values(iqde, order):
+            return [(r[0][0], None if r[1] is None else r[1][:, 0])
+                    for r in self._derivatives(
+                            np.reshape(iqde, (3, 1)), order, n, w1)]
+        constraints = [
+            {'type': 'eq',
+             'fun': lambda iqde: values(iqde, 0)[0][0] - torque,
+             'jac': lambda iqde: values(iqde, 1)[0][1]}]
+        if w1 is not None:
+            def ujac(iqde):
+                U, dU = values(iqde, 1)[1]
+                return -dU/2/np.sqrt(U)
+            constraints.append(
+                {'type': 'eq',
+                 'fun': lambda iqde: u1max*np.sqrt(2) - np.sqrt(
+                     values(iqde, 0)[1][0]),
+                 'jac': ujac})
+        if not _RGI_NU:  # minimize uses finite differences
+            for c in constraints:
+                del c['jac']
+        return constraints
+
+    def iqd_tmech(self, torque, n, disp=False, maxiter=500, iqd0=None):
+        """return currents for shaft torque with minimal losses
+        (starting at currents iqd0 if not None)"""
+        if iqd0 is not None:
+            startvals = iqd0
+        elif torque > 0:
             startvals = self.bounds[0][1]/2, 0, self.bounds[-1][1]
         else:
             startvals = -self.bounds[0][1]/2, 0, self.bounds[-1][1]
@@ -446,11 +594,8 @@ class SynchronousMachine(object):
 
             res = so.minimize(
                 self.culoss, startvals, method='SLSQP',  # trust-constr
-                bounds=self.bounds,
-                #            jac=gradient_respecting_bounds(self.bounds, self.culoss),
-                constraints=[
-                    {'type': 'eq',
-                     'fun': lambda iqd: self.tmech_iqd(*iqd, n) - torque}])
+                bounds=self.bounds, jac=self._culoss_grad,
+                constraints=self._iqd_constraints(torque, n))
             #options={'disp': disp, 'maxiter': maxiter})
             if res['success']:
                 return res.x
@@ -460,9 +605,12 @@ class SynchronousMachine(object):
                        startvals)
         raise ValueError(res['message'])
 
-    def iqd_torque(self, torque, disp=False, maxiter=500):
-        """return currents for torque with minimal losses"""
-        if torque > 0:
+    def iqd_torque(self, torque, disp=False, maxiter=500, iqd0=None):
+        """return currents for torque with minimal losses
+        (starting at currents iqd0 if not None)"""
+        if iqd0 is not None:
+            startvals = iqd0
+        elif torque > 0:
             startvals = self.bounds[0][1]/2, 0, self.bounds[-1][1]
         else:
             startvals = -self.bounds[0][1]/2, 0, self.bounds[-1][1]
@@ -475,11 +623,8 @@ class SynchronousMachine(object):
                 return pcu
             res = so.minimize(
                 self.culoss, startvals, method='SLSQP',  # trust-constr
-                bounds=self.bounds,
-                #            jac=gradient_respecting_bounds(self.bounds, self.culoss),
-                constraints=[
-                    {'type': 'eq',
-                     'fun': lambda iqd: self.torque_iqd(*iqd) - torque}])
+                bounds=self.bounds, jac=self._culoss_grad,
+                constraints=self._iqd_constraints(torque))
             #options={'disp': disp, 'maxiter': maxiter})
             if res['success']:
                 return res.x
@@ -488,30 +633,111 @@ class SynchronousMachine(object):
                        startvals)
         raise ValueError(res['message'])
 
-    def mtpa(self, i1max):
-        """return iq, id, iex currents and maximum torque per current """
+    def __setattr__(self, name, value):
+        # changed parameters invalidate the mtpa tables and interpolators
+        if not name.startswith('_'):
+            self.__dict__.pop('_tables', None)
+        object.__setattr__(self, name, value)
+
+    def clear_tables(self):
+        """remove the mtpa tables and interpolators. They are removed
+        automatically if a parameter is set but must be cleared explicitly
+        if the flux or loss functions are changed in place."""
+        self.__dict__.pop('_tables', None)
+
+    def mtpa_table(self, maxtorque=True, nsamples=20):
+        """return the mtpa table of motor (maxtorque=True) or generator
+        operation as dict of arrays T, i1, iq, id, iex with the currents
+        of minimal losses (see iqd_torque). The table is calculated once
+        up to the torque of the max current."""
+        return self._table(('mtpa', maxtorque, nsamples),
+                           lambda: self._mtpa_table(maxtorque, nsamples))
+
+    def _mtpa_table(self, maxtorque, nsamples):
+        i1max = self.i1range[1] if maxtorque else -self.i1range[1]
+        tmax = self.torque_iqd(np.sqrt(2)*i1max, 0, self.bounds[-1][1])
+        r = dict(T=[0], iq=[0], id=[0], iex=[0])
+        for tq in np.linspace(0, tmax, nsamples + 1)[1:]:
+            try:
+                iqde = self.iqd_torque(tq)
+            except ValueError:
+                break
+            if betai1(*iqde[:2])[1] > self.i1range[1]:
+                break
+            for k, x in zip(('T', 'iq', 'id', 'iex'), (tq, *iqde)):
+                r[k].append(x)
+        if len(r['T']) < 3:
+            return None
+        r = {k: np.array(r[k]) for k in r}
+        r['i1'] = betai1(r['iq'], r['id'])[1]
+        if np.any(np.diff(r['i1']) <= 0):
+            return None
+        r['iex'][0] = r['iex'][1]
+        return r
+
+    def _mtpa_lookup(self, i1max):
+        """return the mtpa table index k with i1[k-1] < i1max <= i1[k]
+        and the interpolated torque and currents (None if out of range)"""
+        tab = self.mtpa_table(i1max > 0)
+        if tab is None or not 0 < abs(i1max) <= tab['i1'][-1]:
+            return None
+        k = np.searchsorted(tab['i1'], abs(i1max))
+        return k, tuple(np.interp(abs(i1max), tab['i1'], tab[x])
+                        for x in ('T', 'iq', 'id', 'iex'))
+
+    def _mtpa_torque(self, i1tq, i1max, T0, tloss=None):
+        """return the torque of current i1max (root of i1tq) within
+        the bracket of the mtpa table or starting at T0"""
+        tab = self.mtpa_table(i1max > 0)
+        lookup = self._mtpa_lookup(i1max)
+        if lookup is not None:
+            k = lookup[0]
+            T = [tab['T'][j] - (tloss(tab['iq'][j], tab['id'][j],
+                                      tab['iex'][j]) if tloss else 0)
+                 for j in (k - 1, k)]
+            try:
+                return so.brentq(i1tq, *T, xtol=1e-6*max(abs(T[1]), 1))
+            except ValueError:
+                pass  # no sign change
+        return so.fsolve(i1tq, T0)[0]
+
+    def mtpa(self, i1max, exact=True):
+        """return iq, id, iex currents and maximum torque per current
+        (solved within the torque range of the mtpa table, see
+        mtpa_table. The table values are returned if exact is False)"""
+        lookup = self._mtpa_lookup(i1max)
+        if lookup is not None and not exact:
+            return (*lookup[1][1:], lookup[1][0])
         T0 = self.torque_iqd(np.sqrt(2)*i1max, 0, self.bounds[-1][1])
         def i1tq(tq):
             return abs(i1max) - np.linalg.norm(self.iqd_torque(tq)[:2])/np.sqrt(2)
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            tq = so.fsolve(i1tq, T0)[0]
+            tq = self._mtpa_torque(i1tq, i1max, T0)
             iq, id, iex = self.iqd_torque(tq)
         return iq, id, iex, tq
 
-    def mtpa_tmech(self, i1max, n):
-        """return iq, id, iex currents and maximum torque per current """
+    def mtpa_tmech(self, i1max, n, exact=True):
+        """return iq, id, iex currents and maximum torque per current
+        (solved within the torque range of the mtpa table, see mtpa)"""
+        lookup = self._mtpa_lookup(i1max)
+        if lookup is not None and not exact:
+            return (*lookup[1][1:],
+                    lookup[1][0] - self.tloss_iqd(*lookup[1][1:], n))
         T0 = self.torque_iqd(np.sqrt(2)*i1max, 0, self.bounds[-1][1])
         def i1tq(tq):
             return i1max - np.linalg.norm(self.iqd_tmech(tq, n)[:2])/np.sqrt(2)
-        tq = so.fsolve(i1tq, T0)[0]
+        tq = self._mtpa_torque(i1tq, i1max, T0,
+                               lambda iq, id, iex:
+                               self.tloss_iqd(iq, id, iex, n))
         iq, id, iex = self.iqd_tmech(tq, n)
         return iq, id, iex, tq
 
-    def iqd_tmech_umax(self, torque, w1, u1max, log=0, **kwargs):
+    def iqd_tmech_umax(self, torque, w1, u1max, log=0, iqd0=None, **kwargs):
         """return currents and shaft torque at stator frequency and
-         with minimal losses at max voltage"""
-        iqde = self.iqd_tmech(torque, w1/2/np.pi/self.p)
+         with minimal losses at max voltage
+         (starting at currents iqd0 if not None)"""
+        iqde = self.iqd_tmech(torque, w1/2/np.pi/self.p, iqd0=iqd0)
         if np.linalg.norm(
                 self.uqd(w1, *iqde)) <= u1max*np.sqrt(2):
             if log:
@@ -534,13 +760,8 @@ class SynchronousMachine(object):
 
             res = so.minimize(
                 self.culoss, io, method='SLSQP',  # trust-constr
-                bounds=self.bounds,
-                constraints=[
-                    {'type': 'eq',
-                     'fun': lambda iqd: torque - self.tmech_iqd(*iqd, n)},
-                    {'type': 'eq',
-                     'fun': lambda iqd: u1max*np.sqrt(2)
-                       - np.linalg.norm(self.uqd(w1, *iqd))}])
+                bounds=self.bounds, jac=self._culoss_grad,
+                constraints=self._iqd_constraints(torque, n, w1, u1max))
             #if res['success']:
             if log:
                 log(res.x)
@@ -551,9 +772,11 @@ class SynchronousMachine(object):
         #return [float('nan')]*4
 
     def iqd_torque_umax(self, torque, w1, u1max,
-                        disp=False, maxiter=500, log=0, **kwargs):
-        """return currents for torque with minimal losses"""
-        iqde = self.iqd_torque(torque, disp, maxiter)
+                        disp=False, maxiter=500, log=0, iqd0=None,
+                        **kwargs):
+        """return currents for torque with minimal losses
+        (starting at currents iqd0 if not None)"""
+        iqde = self.iqd_torque(torque, disp, maxiter, iqd0=iqd0)
         if np.linalg.norm(
                 self.uqd(w1, *iqde)) <= u1max*np.sqrt(2):
                 if log:
@@ -570,15 +793,10 @@ class SynchronousMachine(object):
 
             res = so.minimize(
                 self.culoss, io, method='SLSQP',  # trust-constr
-                bounds=self.bounds,
+                bounds=self.bounds, jac=self._culoss_grad,
                 #options={'disp': disp, 'maxiter': maxiter},
-                #            jac=gradient_respecting_bounds(self.bounds, self.culoss),
-                constraints=[
-                    {'type': 'eq',
-                     'fun': lambda iqd: self.torque_iqd(*iqd) - torque},
-                    {'type': 'eq',
-                     'fun': lambda iqd: u1max*np.sqrt(2) - np.linalg.norm(
-                         self.uqd(w1, *iqd))}])
+                constraints=self._iqd_constraints(torque, w1=w1,
+                                                  u1max=u1max))
             #if res['success']:
             if log:
                 log(res.x)
@@ -587,6 +805,130 @@ class SynchronousMachine(object):
             #               res['message'], w1, torque, u1max, io)
             #raise ValueError(res['message'])
 
+    def iqd_tmech_umax_batch(self, torque, w1, u1max, log_fallback=0,
+                            **kwargs):
+        """return arrays of d-q currents, excitation current and shaft
+        torque at stator frequency and max voltage with minimal losses
+        (vectorized iqd_tmech_umax)
+
+        Args:
+          torque: array of shaft torque values (Nm)
+          w1: array of stator frequencies (rad/s)
+          u1max: max phase voltage (V)
+          log_fallback: called with the number of points that are solved
+            with iqd_tmech_umax
+        """
+        return self._iqd_umax_batch(torque, w1, u1max, True, log_fallback)
+
+    def iqd_torque_umax_batch(self, torque, w1, u1max, log_fallback=0,
+                             **kwargs):
+        """return arrays of d-q currents, excitation current and torque
+        at stator frequency and max voltage with minimal losses
+        (vectorized iqd_torque_umax, see iqd_tmech_umax_batch)"""
+        return self._iqd_umax_batch(torque, w1, u1max, False, log_fallback)
+
+    def _iqd_umax_batch(self, torque, w1, u1max, with_tmech, log_fallback=0):
+        """solve the minimal loss problem of all operating points:
+        the torque constraint is solved starting at the mtpa table,
+        the voltage constraint is added at the points that exceed u1max.
+        The operating points that do not converge are solved with the
+        scalar methods."""
+        torque, w1 = np.broadcast_arrays(np.asarray(torque, dtype=float),
+                                         np.asarray(w1, dtype=float))
+        shape = torque.shape
+        torque, w1 = torque.ravel(), w1.ravel()
+        n = w1/2/np.pi/self.p if with_tmech else None
+        iqde0 = self._mtpa_start(torque)
+        if _RGI_NU:
+            iqde, ok = self._kkt_solve(iqde0, torque, n)
+        else:  # no derivatives: all points are solved with the scalar methods
+            iqde, ok = iqde0.copy(), np.zeros(len(torque), dtype=bool)
+        umax2 = 2*u1max**2
+        U = self._derivatives(iqde, 0, w1=w1)[1][0]
+        sel = np.flatnonzero(ok & (U > umax2))
+        if sel.size:
+            iqde[:, sel], ok[sel] = self._kkt_solve(
+                iqde[:, sel], torque[sel], n if n is None else n[sel],
+                w1[sel], umax2)
+        failed = np.flatnonzero(~ok)
+        if failed.size:
+            if log_fallback:
+                log_fallback(failed.size)
+            iqd_umax = self.iqd_tmech_umax if with_tmech else self.iqd_torque_umax
+            for i in failed:
+                x0 = iqde0[:, i] if np.all(np.isfinite(iqde0[:, i])) else None
+                iqde[:, i] = iqd_umax(torque[i], w1[i], u1max, iqd0=x0)[:3]
+        T = self._derivatives(iqde, 0, n)[0][0]
+        return tuple(np.reshape(x, shape) for x in (*iqde, T))
+
+    def _mtpa_start(self, torque):
+        """return the currents (3, k) of torque interpolated in the mtpa
+        tables (nan if there is no table)"""
+        iqde = np.full((3, len(torque)), np.nan)
+        for maxtorque, sel in ((True, torque >= 0), (False, torque < 0)):
+            tab = self.mtpa_table(maxtorque) if np.any(sel) else None
+            if tab is not None:
+                iqde[:, sel] = [np.interp(np.abs(torque[sel]),
+                                          np.abs(tab['T']), tab[k])
+                                for k in ('iq', 'id', 'iex')]
+        return iqde
+
+    def _kkt_solve(self, iqde, torque, n=None, w1=None, umax2=0,
+                   maxiter=50):
+        """return the currents of minimal losses and the convergence flags
+        of all points (Newton iterations of the KKT conditions with
+        torque and squared voltage umax2 (if w1 is not None) as equality
+        constraints and the active bounds as fixed variables)"""
+        lower, upper = np.array(self.bounds, dtype=float).T[:, :, None]
+        scale = upper - lower
+        r1, r2 = self.rstat(0), self.rrot(0)
+        hcu = np.array((3*r1, 3*r1, 2*r2))[:, None]  # hessian of culoss
+        ncon = 1 if w1 is None else 2
+        iqde = np.clip(iqde, lower, upper)
+        lam = np.zeros((ncon, iqde.shape[1]))
+        ok = np.zeros(iqde.shape[1], dtype=bool)
+        act = np.flatnonzero(np.all(np.isfinite(iqde), axis=0))
+        for _ in range(maxiter):
+            if not act.size:
+                break
+            x = iqde[:, act]
+            r = self._derivatives(x, 2, n if n is None else n[act],
+                                  w1 if w1 is None else w1[act])
+            c = np.array([r[0][0] - torque[act]] +
+                         [u[0] - umax2 for u in r[1:]])
+            J = np.array([u[1] for u in r])
+            H = hcu[:, None]*np.eye(3)[:, :, None] - np.einsum(
+                'mk,mvwk->vwk', lam[:, act], np.array([u[2] for u in r]))
+            g = hcu*x
+            gL = g - np.einsum('mvk,mk->vk', J, lam[:, act])
+            fixed = (((x <= lower + 1e-9*scale) & (gL > 0)) |
+                     ((x >= upper - 1e-9*scale) & (gL < 0)))
+            K = np.zeros((act.size, 3 + ncon, 3 + ncon))
+            K[:, :3, :3] = H.transpose(2, 0, 1)
+            K[:, :3, 3:] = -J.transpose(2, 1, 0)
+            K[:, 3:, :3] = J.transpose(2, 0, 1)
+            rhs = np.concatenate((-g, -c)).T
+            k, v = np.nonzero(fixed.T)
+            K[k, v] = 0
+            K[k, v, v] = 1
+            rhs[k, v] = 0
+            try:
+                s = np.linalg.solve(K, rhs[:, :, None])[:, :, 0]
+            except np.linalg.LinAlgError:
+                s = (np.linalg.pinv(K) @ rhs[:, :, None])[:, :, 0]
+            d = s[:, :3].T
+            dmax = np.max(np.abs(d)/scale, axis=0)
+            # limit the step to a quarter of the current ranges
+            alpha = np.minimum(1, 0.25/np.maximum(dmax, 1e-300))
+            iqde[:, act] = np.clip(x + alpha*d, lower, upper)
+            lam[:, act] = s[:, 3:].T
+            conv = ((dmax < 1e-8) &
+                    (np.abs(c[0]) <= 1e-6*np.maximum(1, np.abs(torque[act]))) &
+                    np.all(np.abs(c[1:]) <= 1e-6*umax2, axis=0))
+            ok[act[conv]] = True
+            act = act[~conv & np.all(np.isfinite(iqde[:, act]), axis=0)]
+        return iqde, ok
+
     def w1_imax_umax(self, i1max, u1max):
         """return frequency w1 and shaft torque at voltage u1max and current i1max
 
@@ -690,15 +1032,17 @@ class SynchronousMachine(object):
                  beta=[], plfe1=[], plfe2=[], plcu1=[], plcu2=[])
         # add type speed to result dict
         r['n_type'] = wmType/2/np.pi
+        iqd0 = None  # start at the currents of the previous speed
         for wm, tq in zip(wmtab, [tload(wx) for wx in wmtab]):
             w1 = wm*self.p
             if with_tmech:
                 iq, id, iex, tqx = self.iqd_tmech_umax(
-                        tq, w1, u1max)
+                        tq, w1, u1max, iqd0=iqd0)
             else:
                 iq, id, iex, tqx = self.iqd_torque_umax(
-                        tq, w1, u1max)
+                        tq, w1, u1max, iqd0=iqd0)
                 tqx -= self.tfric
+            iqd0 = iq, id, iex
             uq, ud = self.uqd(w1, iq, id, iex)
             u1 = np.linalg.norm((uq, ud))/np.sqrt(2)
             f1 = w1/2/np.pi
@@ -829,6 +1173,14 @@ class SynchronousMachinePsidq(SynchronousMachine):
                 'rotor_hyst', 'rotor_eddy')}
 
 
+    def _coords(self, iq, id, iex):
+        """return the coordinates iex, iq, id of the flux and loss maps
+        with their first and second derivatives (see _rgi_derivatives)"""
+        jac = np.zeros((3, 3) + np.shape(iq))
+        jac[0, 2] = jac[1, 0] = jac[2, 1] = 1
+        return (np.array((iex, iq, id)), jac,
+                np.zeros((3, 3, 3) + np.shape(iq)))
+
     def psi(self, iq, id, iex):
         """return psid, psiq of currents iq, id"""
         try:
@@ -949,6 +1301,26 @@ class SynchronousMachineLdq(SynchronousMachine):
                 'rotor_hyst', 'rotor_eddy')}
             pass
 
+    def _coords(self, iq, id, iex):
+        """return the coordinates iex, beta, i1 of the flux and loss maps
+        with their first and second derivatives (see _rgi_derivatives)"""
+        beta = np.arctan2(id, iq)
+        beta[beta > 0] -= 2*np.pi
+        r2 = np.maximum(iq**2 + id**2, 1e-20)
+        r = np.sqrt(r2)
+        jac = np.zeros((3, 3) + np.shape(iq))
+        jac[0, 2] = 1
+        jac[1, 0], jac[1, 1] = -id/r2, iq/r2
+        jac[2, 0], jac[2, 1] = iq/r/np.sqrt(2), id/r/np.sqrt(2)
+        hess = np.zeros((3, 3, 3) + np.shape(iq))
+        hess[1, 0, 0], hess[1, 1, 1] = 2*iq*id/r2**2, -2*iq*id/r2**2
+        hess[1, 0, 1] = hess[1, 1, 0] = (id**2 - iq**2)/r2**2
+        hess[2, 0, 0], hess[2, 1, 1] = (id**2/r**3/np.sqrt(2),
+                                        iq**2/r**3/np.sqrt(2))
+        hess[2, 0, 1] = hess[2, 1, 0] = -iq*id/r**3/np.sqrt(2)
+        return (np.array((iex, beta, np.sqrt(iq**2 + id**2)/np.sqrt(2))),
+                jac, hess)
+
     def psi(self, iq, id, iex):
         """return psid, psiq of currents iq, id"""
         beta = np.arctan2(id, iq)
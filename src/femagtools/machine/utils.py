@@ -76,12 +76,13 @@ def kskinl(xi, nl):
                  ((nl2-1)/(nl2*xi)*(np.sinh(xi)+np.sin(xi)) /
                           (np.cosh(xi)+np.cos(xi))))
     else:
-        xi2 = xi2[xi > EPS]
-        k = np.ones(np.asarray(xi).shape)
-        k[xi > 1e-12] = (3 / (nl2*xi2)*(np.sinh(xi2) - np.sin(xi2)) /
-                         (np.cosh(xi2)-np.cos(xi2)) +
-                         ((nl2-1)/(nl2*xi)*(np.sinh(xi)+np.sin(xi)) /
-                          (np.cosh(xi)+np.cos(xi))))
+        sel = xi > EPS
+        xi, xi2 = xi[sel], xi2[sel]
+        k = np.ones(np.asarray(sel).shape)
+        k[sel] = (3 / (nl2*xi2)*(np.sinh(xi2) - np.sin(xi2)) /
+                  (np.cosh(xi2)-np.cos(xi2)) +
+                  ((nl2-1)/(nl2*xi)*(np.sinh(xi)+np.sin(xi)) /
+                   (np.cosh(xi)+np.cos(xi))))
     return k
 
 
@@ -244,6 +245,29 @@ def iqd(beta, i1):
                                      np.sin(beta)])
 
 
+def illinois(f, a, b, xtol, maxiter=100):
+    """return roots of the vectorized function f within the brackets
+    a, b (regula falsi with Illinois modification). The result is nan
+    where f(a), f(b) have the same sign."""
+    fa, fb = f(a), f(b)
+    valid = fa*fb <= 0
+    a, b = np.where(valid, a, np.nan), np.where(valid, b, np.nan)
+    step = np.full(np.shape(b), np.inf)
+    for k in range(maxiter):
+        done = ~((np.abs(b - a) > xtol) & (step > xtol)) | (fb == 0)
+        if np.all(done):
+            break
+        with np.errstate(divide='ignore', invalid='ignore'):
+            c = np.where(fb != fa, b - fb*(b - a)/(fb - fa), (a + b)/2)
+        c = np.where(done, b, c)
+        step = np.abs(c - b)
+        fc = f(c)
+        swap = fc*fb < 0
+        a, fa = np.where(swap, b, a), np.where(swap, fb, fa/2)
+        b, fb = c, fc
+    return b
+
+
 def puconv(dqpar, p, NR, UR, IR):
     """convert dqpar to per unit
     arguments:
@@ -7,22 +7,119 @@
 """
 import logging
 import warnings
+import numpy as np
 import netCDF4
 from femagtools import isa7
 
 logger = logging.getLogger('femagtools.nc')
 
 
+class Variable(object):
+    """
+    Read access on demand to a netCDF variable with reversed dimensions
+    (same as the transposed array) and scaled values.
+    Only the requested sub-range is read from file.
+
+    Arguments:
+        var: netCDF4 variable
+        divisor: values are divided by divisor
+    """
+
+    def __init__(self, var, divisor=1):
+        self.var = var
+        self.divisor = divisor
+        self._ds = var.group()
+        while self._ds.parent is not None:
+            self._ds = self._ds.parent
+        self.shape = var.shape[::-1]
+        self.dtype = np.dtype(float)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def limit(self, n, axis=1):
+        """restrict the size of axis to n"""
+        self.shape = self.shape[:axis] + (min(n, self.shape[axis]),) + \
+            self.shape[axis+1:]
+
+    def __array__(self, dtype=None, copy=None):
+        a = self[...]
+        return a if dtype is None else a.astype(dtype)
+
+    def __getitem__(self, index):
+        if not isinstance(index, tuple):
+            index = (index,)
+        if index and index[0] is Ellipsis:
+            index = index[1:]
+        index = index + (slice(None),)*(len(self.shape) - len(index))
+        arrays = [np.ndim(i) > 0 for i in index]
+        if len(index) > len(self.shape) or sum(arrays) > 1 or any(
+                isinstance(i, slice) and (i.step or 1) < 0 for i in index):
+            # not supported: read the whole array
+            return self[...][index]
+        sel, take = [], []
+        for i, n in zip(index, self.shape):
+            if isinstance(i, slice):
+                sel.append(slice(*i.indices(n)))
+            elif np.ndim(i) > 0:
+                i = np.asarray(i)
+                if i.dtype == bool:
+                    i = np.nonzero(i)[0]
+                i = np.where(i < 0, i + n, i)
+                # netCDF requires a sorted sequence
+                u, inv = np.unique(i, return_inverse=True)
+                sel.append(u)
+                take.append(inv)
+            else:
+                i = int(i)
+                sel.append(i + n if i < 0 else i)
+        a = np.asarray(self.var[tuple(sel[::-1])]).T
+        if take:  # restore the requested order
+            axis = sum(isinstance(i, slice)
+                       for i in index[:arrays.index(True)])
+            a = np.take(a, take[0], axis=axis)
+        return a/self.divisor
+
+    def close(self):
+        """close the file (values cannot be read afterwards)"""
+        if self._ds.isopen():
+            self._ds.close()
+
+    def __getstate__(self):
+        return dict(filename=self.var.group().filepath(),
+                    path=self.var.group().path, name=self.var.name,
+                    divisor=self.divisor, shape=self.shape)
+
+    def __setstate__(self, state):
+        ds = netCDF4.Dataset(state['filename'])
+        grp = ds[state['path']] if state['path'] != '/' else ds
+        self.var = grp.variables[state['name']]
+        self._ds = ds
+        self.divisor = state['divisor']
+        self.shape = state['shape']
+        self.dtype = np.dtype(float)
+
+
 class Reader(object):
     """
     Open and Read NetCDF file
 
     Arguments:
         filename: name of NetCDF nc file to be read
+        lazy: (bool) keep the file open and read the element induction
+          and eddy current vector potential arrays on demand (see Variable).
+          The file must be closed with close() or by using the reader
+          as context manager.
     """
 
-    def __init__(self, filename):
+    def __init__(self, filename, lazy=False):
         ds = netCDF4.Dataset(filename)
+        self.lazy = lazy
+        self._ds = ds
         node_temperature = None
         self.POINT_ISA_POINT_REC_PT_CO_X = []
         self.POINT_ISA_POINT_REC_PT_CO_Y = []
@@ -240,14 +337,26 @@ class Reader(object):
 
         if 'el_induction' in ds.groups:
             grp = ds.groups['el_induction']
-            (self.pos_el_fe_induction,
-             self.el_fe_induction_1,
-             self.el_fe_induction_2,
-             self.eddy_cu_vpot) = [grp.variables[k][:] if k in grp.variables else []
-                                   for k in ('position',
-                                             'fe_induction_1',
-                                             'fe_induction_2',
-                                             'eddy_cu_vpot')]
+            if lazy:
+                flx_fac = 1000 if grp.variables[
+                    'fe_induction_1'].dtype == 'int16' else 1
+                self.pos_el_fe_induction = grp.variables['position'][:]
+                self.el_fe_induction_1 = Variable(
+                    grp.variables['fe_induction_1'], flx_fac)
+                self.el_fe_induction_2 = Variable(
+                    grp.variables['fe_induction_2'], flx_fac)
+                self.eddy_cu_vpot = (
+                    Variable(grp.variables['eddy_cu_vpot'], 1000)
+                    if 'eddy_cu_vpot' in grp.variables else [])
+            else:
+                (self.pos_el_fe_induction,
+                 self.el_fe_induction_1,
+                 self.el_fe_induction_2,
+                 self.eddy_cu_vpot) = [grp.variables[k][:] if k in grp.variables else []
+                                       for k in ('position',
+                                                 'fe_induction_1',
+                                                 'fe_induction_2',
+                                                 'eddy_cu_vpot')]
             logger.debug('el_fe_induction %d', len(self.pos_el_fe_induction))
         else:
             self.pos_el_fe_induction = []
@@ -358,20 +467,41 @@ class Reader(object):
                 "shapefactor": shapefactor
             }
             self.iron_loss_coefficients.append(coeffdict)
-        ds.close()
+        if not lazy:
+            ds.close()
+
+    def close(self):
+        """close the file of a lazy reader"""
+        if self._ds.isopen():
+            self._ds.close()
 
-def read(filename):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read(filename, columnar=False, lazy=False):
     """
     Read nc file and return NcModel object.
 
     Arguments:
         filename: name of nc file to be read
+        columnar: (bool) create mesh objects on first access only
+        lazy: (bool) read the element induction arrays on demand.
+          The file stays open until the model is closed::
+
+            with nc.read(filename, lazy=True) as isa:
+                ...
+
+          or isa.close(). The induction arrays cannot be read afterwards.
     """
     import pathlib
     ncfile = pathlib.Path(filename)
     if ncfile.suffix != '.nc':
         ncfile = ncfile.with_suffix('.nc')
-    return isa7.Isa7(Reader(str(ncfile)))
+    return isa7.Isa7(Reader(str(ncfile), lazy), columnar)
 
 
 if __name__ == "__main__":
@@ -110,6 +110,303 @@ def losscoeff_frequency_to_time(B0, f0, c, exp):
     return c/(B0**exp*f0**exp)/((2*np.pi)**exp * y)
 
 
+def _ohm_lossenergy(cd_vec, time, area, ff, conduc, temp_corr, selength):
+    """return the ohmic loss energy per arm length of an element
+    with current densities cd_vec at time (see Losses.ohm_lossenergy_el)"""
+    ellossenergy = 0.0
+    for j in range(len(time)-1):
+        cd = (cd_vec[j]+cd_vec[j+1])/2
+        dt = time[j+1]-time[j]
+        ellossenergy = ellossenergy + dt*cd**2*area/ff / \
+            conduc*temp_corr*selength
+    return ellossenergy
+
+
+def _ohm_powerlosses_fft(cd_vec_0, times, area, ff, conduc, temp_corr,
+                         selength):
+    """return the ohmic power losses per arm length of an element with
+    current densities cd_vec_0 (see Losses.ohm_powerlosses_fft_el)"""
+    elpowerlosses = 0.0
+    if not times.equidistant:
+        cd_vec = np.interp(times.vector_equi,
+                           times.vector, cd_vec_0,
+                           period=1.0/times.freq)
+    else:
+        cd_vec = cd_vec_0
+    cd_spec = abs(np.fft.fft(cd_vec))/(len(cd_vec)/2)
+    for j in range(int(len(cd_vec)/2)):
+        elpowerlosses = elpowerlosses + \
+            cd_spec[j]**2/2*area/ff / \
+            conduc*temp_corr*selength
+    return elpowerlosses
+
+
+def _interp_periodic(x, xp, fp, period):
+    """periodic linear interpolation of fp (..., len(xp)) at x
+    (same as np.interp(x, xp, f, period=period) for each row f of fp)"""
+    xp = np.asarray(xp) % period
+    i = np.argsort(xp, kind='stable')
+    xp = np.concatenate(([xp[i[-1]] - period], xp[i], [xp[i[0]] + period]))
+    fp = np.asarray(fp)[..., i]
+    fp = np.concatenate((fp[..., -1:], fp, fp[..., :1]), axis=-1)
+    x = np.asarray(x) % period
+    k = np.clip(np.searchsorted(xp, x, side='right') - 1, 0, len(xp) - 2)
+    w = (x - xp[k])/(xp[k+1] - xp[k])
+    return fp[..., k]*(1 - w) + fp[..., k+1]*w
+
+
+def _waterfall_hysteresis(time, br, bt, kh, chbe, khml):
+    """return the hysteresis loss energy (array) of the flux densities
+    br, bt (elements x time) in main direction by the waterfall method
+    (see Losses.iron_lossenergy_time_el)
+
+    All elements are processed in lockstep: the major loops are counted
+    at the zero crossings of br and the reversal points of the minor
+    loops are kept in a stack array (elements x depth).
+    """
+    b = np.sqrt(br**2 + bt**2)
+    nel = b.shape[0]
+    rows = np.arange(nel)
+    # major loops
+    zero = br[:, 0] >= 0
+    bpeak_p = b[:, 0].copy()
+    bpeak = np.zeros(nel)
+    tp_end = np.zeros(nel)
+    tp = np.zeros(nel)
+    nzeros = np.zeros(nel, dtype=int)
+    major = np.zeros(nel)
+    # minor loops
+    up = br[:, 1] > br[:, 0]
+    stack = np.zeros((nel, 8))
+    depth = np.zeros(nel, dtype=int)
+    bm = np.zeros(nel)
+    db = np.zeros(nel)
+    has_bm = np.zeros(nel, dtype=bool)
+    minor = np.zeros(nel)
+    for i in range(1, len(time)):
+        b1, b2 = b[:, i-1], b[:, i]
+        bpeak_p = np.maximum(bpeak_p, b2)
+        cross = zero != (br[:, i] >= 0)
+        if np.any(cross):
+            zero = zero ^ cross
+            tp_beg = np.where(cross, tp_end, 0.0)
+            tp_end = np.where(cross, time[i], tp_end)
+            counted = cross & (tp_beg > 0.0)
+            nzeros = nzeros + counted
+            tp = np.where(counted, 2*(tp_end - tp_beg), tp)
+            first = counted & (nzeros == 1)
+            major += np.where(counted, kh*bpeak_p**chbe, 0.0)*np.where(
+                first, (tp_end - time[0])/np.where(first, tp, 1.0), 0.5)
+            bpeak = np.where(counted, bpeak_p, bpeak)
+            bpeak_p = np.where(counted, 0.0, bpeak_p)
+            depth[cross] = 0
+        # reversal points
+        push = np.where(up, b2 < b1, b2 > b1)
+        if np.any(push):
+            if np.max(depth[push]) >= stack.shape[1]:
+                stack = np.concatenate((stack, np.zeros_like(stack)), axis=1)
+            stack[rows[push], depth[push]] = b1[push]
+            depth = depth + push
+        up = b2 > b1
+        ok = (depth >= 2) & (b2 > 0)
+        if not np.any(ok):
+            continue
+        top = stack[rows, np.maximum(depth - 1, 0)]
+        sec = stack[rows, np.maximum(depth - 2, 0)]
+        closed = ok & up & (b2 > sec)
+        bm = np.where(closed, np.abs(sec + top)/2, bm)
+        db = np.where(closed, np.abs(sec - top), db)
+        has_bm = has_bm | closed
+        closed = closed | (ok & ~up & (top > sec) & has_bm)
+        minor += np.where(closed, bm, 1.0)**(chbe - 1)*np.where(closed, db, 0)/2
+        # remove the first occurrences of both values (as list.remove)
+        below = np.arange(stack.shape[1]) < (depth - 2)[:, None]
+        dup = closed & np.any(below & ((stack == sec[:, None]) |
+                                       (stack == top[:, None])), axis=1)
+        for r in np.nonzero(dup)[0]:
+            bx = stack[r, :depth[r]].tolist()
+            bx.remove(bx[-2])
+            bx.remove(bx[-1])
+            stack[r, :len(bx)] = bx
+        depth = depth - 2*closed
+
+    major += np.where(nzeros >= 1, kh*bpeak**chbe, 0.0)*(
+        time[-1] - tp_end)/np.where(nzeros >= 1, tp, 1.0)
+    return major + kh*khml*minor
+
+
+def _iron_losses_fft(b, idx, area, c, length, times):
+    """return the iron losses (dict of arrays) of the elements with
+    indexes idx of the flux density b (time x elements x components)
+    (see Losses.iron_losses_fft_elements)"""
+    bf, bb = c['base_frequency'], c['base_induction']
+    sw = c['spec_weight']*1000
+    ff = c['fillfactor']
+
+    freq = times.freq
+    bxy = np.moveaxis(b[:, idx, :2], 0, -1).astype(float)  # E x 2 x T
+    if not times.equidistant:
+        bxy = _interp_periodic(times.vector_equi,
+                               times.vector, bxy,
+                               1.0/times.freq)
+    bxy = bxy/ff
+    bx_vec, by_vec = bxy[:, 0], bxy[:, 1]
+    n = bxy.shape[-1]
+    sp = np.fft.rfft(bxy, axis=-1)
+    bxy_spec = np.abs(sp)/(n/2)
+    bxy_spec[..., 0] = bxy_spec[..., 0]/2
+    bxy_phi = np.arctan2(sp.imag, sp.real)
+    b_spec = np.sqrt(np.sum(bxy_spec**2, axis=1))
+
+    # correction factor for rotating fields
+    i_max = np.argmax(b_spec, axis=1)
+    rows = np.arange(len(idx))
+    dphi = bxy_phi[rows, 0, i_max] - bxy_phi[rows, 1, i_max]
+    dphi = (dphi + np.pi/2) % np.pi - np.pi/2
+    b_dc = np.max(np.abs(bxy_spec[:, :, 0]), axis=1)
+    j_max = np.argmax(bx_vec**2 + by_vec**2, axis=1)
+    phi = np.arctan2(by_vec[rows, j_max], bx_vec[rows, j_max])[:, None]
+    max_bxt = np.max(np.abs(np.cos(phi)*bx_vec + np.sin(phi)*by_vec),
+                     axis=1)
+    max_byt = np.max(np.abs(np.sin(phi)*bx_vec - np.cos(phi)*by_vec),
+                     axis=1)
+    axis = np.where(max_byt > 1.0e-3,
+                    max_bxt/np.where(max_byt > 1.0e-3, max_byt, 1), 0.0)
+    axis = np.where(axis > 1.0, 1.0/np.where(axis > 1.0, axis, 1), axis)
+    kz = np.where((np.abs(dphi) > np.pi/3) & (axis > 0.3), 1.55, 1.0)
+    kz = np.where(b_dc > 0.2, 1.0 + 0.65*b_dc**2.1, kz)
+    kz = np.where(np.max(b_spec, axis=1) > 1.85, 1.1, kz)
+
+    fj = np.arange(int(n/2))*freq/bf
+    bj = b_spec[:, :int(n/2)]/bb
+    scale = area*length*ff*sw
+    hystlosses = kz*c['ch']*np.sum(
+        fj**c['ch_freq_exp']*bj**c['ch_ind_exp'], axis=1)*scale
+    eddylosses = c['cw']*np.sum(
+        fj**c['cw_freq_exp']*bj**c['cw_ind_exp'], axis=1)*scale
+    excelosses = c['ce']*np.sum(
+        fj**c['ce_freq_exp']*bj**c['ce_ind_exp'], axis=1)*scale
+
+    return {'total': hystlosses + eddylosses + excelosses,
+            'hysteresis': hystlosses,
+            'eddycurrent': eddylosses,
+            'excess': excelosses}
+
+
+def _iron_lossenergy_time(b, idx, area, c, length, time):
+    """return the iron loss energies (dict of arrays) of the elements
+    with indexes idx of the flux density b (time x elements x components)
+    (see Losses.iron_lossenergy_time_elements)"""
+    sw = c['spec_weight']*1000
+    ff = c['fillfactor']
+
+    time = np.asarray(time, dtype=float)
+    hystenergy = np.empty(len(idx))
+    eddyenergy = np.empty(len(idx))
+    exceenergy = np.empty(len(idx))
+    dt = np.diff(time)
+    chunksize = max(1, 2**22 // len(time))
+    for k in range(0, len(idx), chunksize):
+        sl = slice(k, k + chunksize)
+        bk = b[:, idx[sl]]
+        bx_vec = bk[:, :, 0].T.astype(float)/ff
+        by_vec = bk[:, :, 1].T.astype(float)/ff
+        # direction of the main field
+        rows = np.arange(bx_vec.shape[0])
+        j_max = np.argmax(np.sqrt(bx_vec**2 + by_vec**2), axis=1)
+        phi = np.arctan2(by_vec[rows, j_max],
+                         bx_vec[rows, j_max])[:, None]
+        br_vec = np.cos(phi)*bx_vec + np.sin(phi)*by_vec
+        bt_vec = np.sin(phi)*bx_vec - np.cos(phi)*by_vec
+
+        hystenergy[sl] = _waterfall_hysteresis(
+            time, br_vec, bt_vec, c['kh'], c['ch_ind_exp'], c['khml'])
+        dbdt = np.sqrt(np.diff(br_vec)**2 + np.diff(bt_vec)**2)/dt
+        eddyenergy[sl] = c['kw']*np.sum(dbdt**c['cw_ind_exp']*dt,
+                                        axis=1)
+        exceenergy[sl] = c['ke']*np.sum(dbdt**c['ce_ind_exp']*dt,
+                                        axis=1)
+
+    scale = area*length*ff*sw
+    hystenergy *= scale
+    eddyenergy *= scale
+    exceenergy *= scale
+    return {'total': hystenergy + eddyenergy + exceenergy,
+            'hysteresis': hystenergy,
+            'eddycurrent': eddyenergy,
+            'excess': exceenergy}
+
+
+def _lossdensity(task, arrays, common):
+    """return keys and loss density of the elements of a task
+    (see Losses.export_lossdensity)
+
+    Args:
+      task: dict with element range (start, stop) and material data
+      arrays: dict of arrays: element keys, row index, area, temperature,
+        current density curd and flux density b (time x cells x comp)
+      common: dict of methode, arm length and time range
+
+    The ohmic losses are calculated element by element with the
+    functions of Losses.ohm_lossenergy_el and ohm_powerlosses_fft_el
+    (same arguments, same results).
+    """
+    methode, length, times = (common['methode'], common['length'],
+                              common['times'])
+    sl = slice(task['start'], task['stop'])
+    keys = arrays['keys'][sl]
+    idx = arrays['index'][sl]
+    area = arrays['area'][sl]
+    time = times.vector[-1] - times.vector[0]
+    lossdensity = np.zeros(len(keys))
+    if task['conduc'] > 0.0:
+        cd_vecs = arrays['curd'][:, idx, 0].T.tolist()
+        for i, (cd_vec, temperature) in enumerate(
+                zip(cd_vecs, arrays['temperature'][sl].tolist())):
+            temp_corr = 1+task['temp_coef']*(temperature-20)
+            args = (area[i], task['fillfactor'], task['conduc'],
+                    temp_corr, task['selength'])
+            if methode == "time":
+                ellossenergy = _ohm_lossenergy(
+                    cd_vec, times.vector, *args)*length
+                lossdensity[i] = ellossenergy / (time * area[i] * length)
+            else:
+                ellosses = _ohm_powerlosses_fft(
+                    cd_vec, times, *args)*length
+                lossdensity[i] = ellosses / (area[i] * length)
+
+    if task['iron'] is not None:
+        if methode == "time":
+            ironlosses = _iron_lossenergy_time(
+                arrays['b'], idx, area, task['iron'], length,
+                times.vector)['total'] / time
+        else:
+            ironlosses = _iron_losses_fft(
+                arrays['b'], idx, area, task['iron'], length,
+                times)['total']
+        lossdensity += ironlosses / (area * length)
+    return keys, lossdensity
+
+
+# arrays and common data of the worker processes of export_lossdensity
+_shared = {}
+
+
+def _attach_shared(specs, common):
+    """attach the shared memory blocks in a worker process"""
+    from multiprocessing import shared_memory
+    for name, (shmname, shape, dtype) in specs.items():
+        # the blocks are unlinked by the parent process
+        shm = shared_memory.SharedMemory(name=shmname)
+        _shared[name] = (shm, np.ndarray(shape, dtype, buffer=shm.buf))
+    _shared['common'] = common
+
+
+def _shared_lossdensity(task):
+    return _lossdensity(task, {k: v[1] for k, v in _shared.items()
+                               if k != 'common'}, _shared['common'])
+
+
 class TimeRange(object):
     def __init__(self, vtu_data, nc_model):
         '''Read time vector in and generate an equidistant vector if necessary.
@@ -149,17 +446,29 @@ class TimeRange(object):
 
 
 class Losses(object):
-    def __init__(self, modelname, dirname):
+    def __init__(self, modelname, dirname, cache=False, subregions=None):
         '''Loss calculation for FEMAG-TS simulations
         Parameters
         ----------
         dirname : str
             Name of the model (nc-file)
         ncmodel : object
+        cache : bool
+            store the vtu point and cell data as memory-mapped npy files
+            (see vtu.Reader)
+        subregions : list of str
+            names of the subregions whose cell data is kept in memory
+            (optional, default: all elements). Only the losses of
+            these subregions can be calculated.
 
         '''
-        self.vtu_data = vtu.read(dirname)
+        self.vtu_data = vtu.read(dirname, cache=cache)
         self.nc_model = femagtools.nc.read(modelname)
+        if subregions is not None:
+            self.vtu_data.select_cells(
+                [el.key for srname in subregions
+                 for se in self.nc_model.get_subregion(srname).superelements
+                 for el in se.elements])
         # Read iron losses coefficients
         self.iron_loss_coefficients = self.nc_model.iron_loss_coefficients
         for c in self.iron_loss_coefficients:
@@ -173,6 +482,22 @@ class Losses(object):
                     'Waterfall method not possible, specify parameter kw')
                 kw = 0.0
 
+    def _selected(self, superelements):
+        '''return the superelements whose cell data is kept in memory
+        (all unless subregions are selected)'''
+        if self.vtu_data.cells is None:
+            return list(superelements)
+        return [se for se in superelements
+                if np.all(self.vtu_data.selected(
+                    [el.key for el in se.elements]))]
+
+    def _subregions(self):
+        '''return the subregions whose cell data is kept in memory'''
+        if self.vtu_data.cells is None:
+            return self.nc_model.subregions
+        return [sr for sr in self.nc_model.subregions
+                if self._selected(sr.superelements)]
+
     def ohm_lossenergy_el(self, el, supel):
         '''Ohmic loss energy of an element
         Parameters
@@ -196,14 +521,42 @@ class Losses(object):
             ff = 1.0
 
         temp_corr = 1+supel.temp_coef*(el.temperature-20)
-        ellossenergy = 0.0
         cd_vec = self.vtu_data.get_data_vector('curd', el.key)
-        for j in range(len(time)-1):
-            cd = (cd_vec[j]+cd_vec[j+1])/2
-            dt = time[j+1]-time[j]
-            ellossenergy = ellossenergy + dt*cd**2*el.area/ff / \
-                supel.conduc*temp_corr*supel.length
-        return ellossenergy*length
+        return _ohm_lossenergy(cd_vec, time, el.area, ff, supel.conduc,
+                               temp_corr, supel.length)*length
+
+    def ohm_lossenergy_se(self, se):
+        '''Ohmic loss energy of a superelement
+        Parameters
+        ----------
+        se: object
+            Superelement
+
+        Returns
+        -------
+        selossenergy : float
+            Ohmic loss energy of the superelement
+
+        Same as the sum of ohm_lossenergy_el of all elements but
+        integrated over the current density matrix (elements x time)
+        at once.
+        '''
+        length = self.nc_model.arm_length
+        time = np.asarray(self.times.vector)
+
+        ff = se.fillfactor
+        if ff == 0.0:
+            ff = 1.0
+
+        keys = [el.key for el in se.elements]
+        area = np.array([el.area for el in se.elements])
+        temp_corr = 1+se.temp_coef*(
+            np.array([el.temperature for el in se.elements])-20)
+        cd = self.vtu_data.get_array('curd', keys)[:, :, 0].T
+        cd = (cd[:, :-1] + cd[:, 1:])/2
+        ellossenergy = (cd**2).dot(np.diff(time))
+        return float(np.sum(ellossenergy*area/ff/se.conduc *
+                            temp_corr*se.length))*length
 
     def ohm_lossenergy_sr(self, sr):
         '''Ohmic loss energy of a subregion
@@ -223,13 +576,9 @@ class Losses(object):
         scale_factor = self.nc_model.scale_factor()
         srlossenergy = 0.0
         for se in sr.superelements:
-            selossenergy = 0.0
             if se.conduc > 0.0:
-                for el in se.elements:
-                    ellossenergy = self.ohm_lossenergy_el(el, se)
-                    selossenergy = selossenergy + ellossenergy * scale_factor
-
-            srlossenergy = srlossenergy + selossenergy
+                srlossenergy = srlossenergy + \
+                    self.ohm_lossenergy_se(se) * scale_factor
 
         return srlossenergy
 
@@ -254,8 +603,8 @@ class Losses(object):
         If start and end are not specified, the time window of the
         previous calculation is used.
         '''
-        data_list = ['time [s]', 'curd']
-        self.vtu_data.read_data(data_list)
+        self.vtu_data.read_data(['time [s]'])
+        self.vtu_data.read_arrays(['curd'])
 
         if start != 0.0 or end != 0.0:
             self.vtu_data.set_time_window(start, end)
@@ -314,8 +663,8 @@ class Losses(object):
         previous calculation is used.
         '''
 
-        data_list = ['time [s]', 'curd']
-        self.vtu_data.read_data(data_list)
+        self.vtu_data.read_data(['time [s]'])
+        self.vtu_data.read_arrays(['curd'])
 
         if start != 0.0 or end != 0.0:
             self.vtu_data.set_time_window(start, end)
@@ -323,7 +672,7 @@ class Losses(object):
         self.times = TimeRange(self.vtu_data, self.nc_model)
 
         loss_data = []
-        for sr in self.nc_model.subregions:
+        for sr in self._subregions():
             srlossenergy = self.ohm_lossenergy_sr(sr)
 
             srname = sr.name
@@ -358,8 +707,8 @@ class Losses(object):
         previous calculation is used.
         '''
 
-        data_list = ['time [s]', 'curd']
-        self.vtu_data.read_data(data_list)
+        self.vtu_data.read_data(['time [s]'])
+        self.vtu_data.read_arrays(['curd'])
 
         if start != 0.0 or end != 0.0:
             self.vtu_data.set_time_window(start, end)
@@ -369,7 +718,7 @@ class Losses(object):
         time = self.times.vector[-1]-self.times.vector[0]
 
         loss_data = []
-        for sr in self.nc_model.subregions:
+        for sr in self._subregions():
             srlossenergy = self.ohm_lossenergy_sr(sr)
             srpowerlosses = srlossenergy / time
 
@@ -408,21 +757,10 @@ class Losses(object):
             ff = 1.0
 
         temp_corr = 1+supel.temp_coef*(el.temperature-20)
-        elpowerlosses = 0.0
         cd_vec_0 = self.vtu_data.get_data_vector('curd', el.key)
-        if not self.times.equidistant:
-            cd_vec = np.interp(self.times.vector_equi,
-                               self.times.vector, cd_vec_0,
-                               period=1.0/self.times.freq)
-        else:
-            cd_vec = cd_vec_0
-        cd_spec = abs(np.fft.fft(cd_vec))/(len(cd_vec)/2)
-        for j in range(int(len(cd_vec)/2)):
-            elpowerlosses = elpowerlosses + \
-                cd_spec[j]**2/2*el.area/ff / \
-                supel.conduc*temp_corr*supel.length
-
-        return elpowerlosses*length
+        return _ohm_powerlosses_fft(cd_vec_0, self.times, el.area, ff,
+                                    supel.conduc, temp_corr,
+                                    supel.length)*length
 
     def ohm_powerlosses_fft_sr(self, sr):
         '''Power dissipation of a subregion
@@ -517,7 +855,7 @@ class Losses(object):
         self.times = TimeRange(self.vtu_data, self.nc_model)
 
         loss_data = []
-        for sr in self.nc_model.subregions:
+        for sr in self._subregions():
             srpowerlosses = self.ohm_powerlosses_fft_sr(sr)
 
             srname = sr.name
@@ -683,6 +1021,54 @@ class Losses(object):
                 'eddycurrent': eleddylosses,
                 'excess': elexcelosses}
 
+    def iron_losses_fft_elements(self, elements, se):
+        '''Iron losses of elements of a superelement
+        Parameters
+        ----------
+        elements: list
+            Elements of the superelement
+        se: object
+            Superelement of the elements (for material data)
+
+        Returns
+        -------
+        ironlosses : dict
+            Arrays of the iron losses of the elements
+
+        Same as iron_losses_fft_el for each element but with a single
+        FFT of the flux densities of all elements (elements x time)
+        and the Bertotti formula evaluated for all harmonics at once.
+        '''
+        zeros = np.zeros(len(elements))
+        if not elements or not (
+                (se.elements[0].reluc[0] < 1.0 or
+                 se.elements[0].reluc[1] < 1.0) and
+                (se.elements[0].mag[0] == 0.0 and
+                 se.elements[0].mag[1] == 0.0)):
+            return {'total': zeros,
+                    'hysteresis': zeros,
+                    'eddycurrent': zeros,
+                    'excess': zeros}
+
+        c = self.iron_loss_coefficients[self._iron_loss_coeff_index(se)]
+        return _iron_losses_fft(
+            self.vtu_data.get_array('b'),
+            self.vtu_data.cell_index([el.key for el in elements]),
+            np.array([el.area for el in elements]),
+            c, self.nc_model.arm_length, self.times)
+
+    def _iron_loss_coeff_index(self, se):
+        """return index of the iron loss coefficients of superelement se"""
+        if se.mcvtype > 0:
+            return se.mcvtype-1
+        center_pnt = se.elements[0].center
+        try:
+            if (np.sqrt(center_pnt[0]**2+center_pnt[1]**2) > self.nc_model.FC_RADIUS):
+                return len(self.iron_loss_coefficients)-2  # outside
+        except:
+            pass
+        return len(self.iron_loss_coefficients)-1  # inside
+
     def iron_losses_fft_se(self, se):
         '''Iron losses of a superelement
         Parameters
@@ -708,13 +1094,10 @@ class Losses(object):
         seexcelosses = 0.0
         if (se.elements[0].reluc[0] < 1.0 or se.elements[0].reluc[1] < 1.0) and \
                 (se.elements[0].mag[0] == 0.0 and se.elements[0].mag[1] == 0.0):
-            for el in se.elements:
-                ellosses = self.iron_losses_fft_el(el, se)
-                sehystlosses = sehystlosses + \
-                    ellosses['hysteresis'] * scale_factor
-                seeddylosses = seeddylosses + \
-                    ellosses['eddycurrent'] * scale_factor
-                seexcelosses = seexcelosses + ellosses['excess'] * scale_factor
+            ellosses = self.iron_losses_fft_elements(se.elements, se)
+            sehystlosses = float(np.sum(ellosses['hysteresis'])) * scale_factor
+            seeddylosses = float(np.sum(ellosses['eddycurrent'])) * scale_factor
+            seexcelosses = float(np.sum(ellosses['excess'])) * scale_factor
 
         setotallosses = sehystlosses + seeddylosses + seexcelosses
 
@@ -745,8 +1128,7 @@ class Losses(object):
         if start != 0.0 or end != 0.0:
             self.vtu_data.set_time_window(start, end)
 
-        data_list = ['b']
-        self.vtu_data.read_data(data_list)
+        self.vtu_data.read_arrays(['b'])
         self.times = TimeRange(self.vtu_data, self.nc_model)
 
         srtotallosses = 0.0
@@ -790,13 +1172,12 @@ class Losses(object):
         if start != 0.0 or end != 0.0:
             self.vtu_data.set_time_window(start, end)
 
-        data_list = ['b']
-        self.vtu_data.read_data(data_list)
+        self.vtu_data.read_arrays(['b'])
         self.times = TimeRange(self.vtu_data, self.nc_model)
 
         losseslist = []
 
-        for se in self.nc_model.superelements:
+        for se in self._selected(self.nc_model.superelements):
             selosses = self.iron_losses_fft_se(se)
 
             if se.subregion:
@@ -1005,6 +1386,41 @@ class Losses(object):
                 'eddycurrent': eleddyenergy,
                 'excess': elexceenergy}
 
+    def iron_lossenergy_time_elements(self, elements, se):
+        '''Iron losses of elements of a superelement in time domain
+        Parameters
+        ----------
+        elements: list
+            Elements of the superelement
+        se: object
+            Superelement of the elements (for material data)
+
+        Returns
+        -------
+        lossenergies : dict
+            Arrays of the iron loss energies of the elements
+
+        Same as iron_lossenergy_time_el for each element but evaluated
+        for all elements at once (in chunks to limit the memory usage).
+        '''
+        zeros = np.zeros(len(elements))
+        if not elements or not (
+                (se.elements[0].reluc[0] < 1.0 or
+                 se.elements[0].reluc[1] < 1.0) and
+                (se.elements[0].mag[0] == 0.0 and
+                 se.elements[0].mag[1] == 0.0)):
+            return {'total': zeros,
+                    'hysteresis': zeros,
+                    'eddycurrent': zeros,
+                    'excess': zeros}
+
+        c = self.iron_loss_coefficients[self._iron_loss_coeff_index(se)]
+        return _iron_lossenergy_time(
+            self.vtu_data.get_array('b'),
+            self.vtu_data.cell_index([el.key for el in elements]),
+            np.array([el.area for el in elements]),
+            c, self.nc_model.arm_length, self.times.vector)
+
     def iron_lossenergy_time_se(self, se):
         '''Iron losses of a superelement in time domain
         Parameters
@@ -1030,13 +1446,10 @@ class Losses(object):
         seexceenergy = 0.0
         if (se.elements[0].reluc[0] < 1.0 or se.elements[0].reluc[1] < 1.0) and \
                 (se.elements[0].mag[0] == 0.0 and se.elements[0].mag[1] == 0.0):
-            for el in se.elements:
-                elenergy = self.iron_lossenergy_time_el(el, se)
-                sehystenergy = sehystenergy + \
-                    elenergy['hysteresis'] * scale_factor
-                seeddyenergy = seeddyenergy + \
-                    elenergy['eddycurrent'] * scale_factor
-                seexceenergy = seexceenergy + elenergy['excess'] * scale_factor
+            elenergy = self.iron_lossenergy_time_elements(se.elements, se)
+            sehystenergy = float(np.sum(elenergy['hysteresis'])) * scale_factor
+            seeddyenergy = float(np.sum(elenergy['eddycurrent'])) * scale_factor
+            seexceenergy = float(np.sum(elenergy['excess'])) * scale_factor
 
         setotalenergy = sehystenergy + seeddyenergy + seexceenergy
 
@@ -1067,8 +1480,7 @@ class Losses(object):
         if start != 0.0 or end != 0.0:
             self.vtu_data.set_time_window(start, end)
 
-        data_list = ['b']
-        self.vtu_data.read_data(data_list)
+        self.vtu_data.read_arrays(['b'])
         self.times = TimeRange(self.vtu_data, self.nc_model)
 
         srtotalenergy = 0.0
@@ -1145,15 +1557,28 @@ class Losses(object):
         if start != 0.0 or end != 0.0:
             self.vtu_data.set_time_window(start, end)
 
-        data_list = ['b']
-        self.vtu_data.read_data(data_list)
+        self.vtu_data.read_arrays(['b'])
         self.times = TimeRange(self.vtu_data, self.nc_model)
 
-        energylist = []
+        return self._subregion_energies(
+            [(se, self.iron_lossenergy_time_se(se))
+             for se in self._selected(self.nc_model.superelements)])
 
-        for se in self.nc_model.superelements:
-            selossenergy = self.iron_lossenergy_time_se(se)
+    def _subregion_energies(self, selosses):
+        '''add up the iron losses of superelements per subregion
+        Parameters
+        ----------
+        selosses: list
+            Tuples of superelement and its iron losses (dict)
+
+        Returns
+        -------
+        energies : list
+            Iron losses of the subregions (see iron_lossenergy_time)
+        '''
+        energylist = []
 
+        for se, selossenergy in selosses:
             if se.subregion:
                 for sr in self.nc_model.subregions:
                     if se in sr.superelements:
@@ -1223,7 +1648,74 @@ class Losses(object):
 
         return losseslist
 
-    def export_lossdensity(self,  filename, methode="fft", start=0.0, end=0.0):
+    def _lossdensity(self, methode, processes=1):
+        '''return iterator of element keys and loss densities
+        of all superelements (see export_lossdensity)'''
+        superelements = self._selected(self.nc_model.superelements)
+        elements = [el for se in superelements
+                    for el in se.elements]
+        arrays = dict(
+            keys=np.array([el.key for el in elements], dtype=int),
+            index=self.vtu_data.cell_index([el.key for el in elements]),
+            area=np.array([el.area for el in elements]),
+            temperature=np.array([el.temperature for el in elements]))
+        common = dict(methode=methode, length=self.nc_model.arm_length,
+                      times=self.times)
+        chunksize = len(elements)
+        if processes > 1:
+            chunksize = max(256, len(elements)//(4*processes))
+        tasks = []
+        start = 0
+        for se in superelements:
+            iron = None
+            if (se.elements[0].reluc[0] < 1.0 or se.elements[0].reluc[1] < 1.0) and \
+               (se.elements[0].mag[0] == 0.0 and se.elements[0].mag[1] == 0.0):
+                iron = self.iron_loss_coefficients[
+                    self._iron_loss_coeff_index(se)]
+            if se.conduc > 0.0 or iron is not None:
+                for k in range(start, start+len(se.elements), chunksize):
+                    tasks.append(dict(
+                        start=k,
+                        stop=min(k+chunksize, start+len(se.elements)),
+                        conduc=se.conduc,
+                        fillfactor=se.fillfactor or 1.0,
+                        temp_coef=se.temp_coef,
+                        selength=se.length,
+                        iron=iron))
+            start += len(se.elements)
+        if any(t['conduc'] > 0.0 for t in tasks):
+            arrays['curd'] = self.vtu_data.get_array('curd')
+        if any(t['iron'] is not None for t in tasks):
+            arrays['b'] = self.vtu_data.get_array('b')
+
+        if processes <= 1 or len(tasks) < 2:
+            for t in tasks:
+                yield _lossdensity(t, arrays, common)
+            return
+
+        import concurrent.futures
+        from multiprocessing import shared_memory
+        shms, specs = [], {}
+        try:
+            for name, a in arrays.items():
+                shm = shared_memory.SharedMemory(create=True,
+                                                 size=max(a.nbytes, 1))
+                shms.append(shm)
+                np.ndarray(a.shape, a.dtype, buffer=shm.buf)[...] = a
+                specs[name] = (shm.name, a.shape, a.dtype.str)
+            with concurrent.futures.ProcessPoolExecutor(
+                    min(processes, len(tasks)),
+                    initializer=_attach_shared,
+                    initargs=(specs, common)) as pool:
+                for r in pool.map(_shared_lossdensity, tasks):
+                    yield r
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+    def export_lossdensity(self,  filename, methode="fft", start=0.0, end=0.0,
+                           processes=1):
         '''Export the loss density of elements in a vtu -file
 
         Args:
@@ -1233,6 +1725,9 @@ class Losses(object):
             methode="time": calculate the losses in time domain
         start: float  Start of the time window (optional)
         end : float  End of the time window (optional)
+        processes: int  Number of worker processes (optional, default=1)
+            The flux and current densities are passed to the workers
+            in shared memory.
 
         Returns:
           The losses density in each element is calculated and stored in a vtu-file.
@@ -1283,31 +1778,11 @@ class Losses(object):
         cell_data.SetNumberOfComponents(1)
         cell_data.SetName("lossdensity [W/m3]")
         cell_data.SetNumberOfValues(num_cells)
+        cell_data.Fill(0.0)
 
-        for se in self.nc_model.superelements:
-            for el in se.elements:
-                ellossdensity = 0
-                if se.conduc > 0.0:
-                    if methode == "time":
-                        ellossenergy = self.ohm_lossenergy_el(el, se)
-                        ellossdensity = ellossenergy / \
-                            (time * el.area * length)
-                    else:
-                        ellosses = self.ohm_powerlosses_fft_el(el, se)
-                        ellossdensity = ellosses / (el.area * length)
-
-                if (se.elements[0].reluc[0] < 1.0 or se.elements[0].reluc[1] < 1.0) and \
-                   (se.elements[0].mag[0] == 0.0 and se.elements[0].mag[1] == 0.0):
-                    if methode == "time":
-                        ellossenergy = self.iron_lossenergy_time_el(el, se)
-                        ellossdensity = ellossdensity + \
-                            ellossenergy['total'] / (time * el.area * length)
-                    else:
-                        ellosses = self.iron_losses_fft_el(el, se)
-                        ellossdensity = ellossdensity + \
-                            ellosses['total'] / (el.area * length)
-
-                cell_data.InsertValue(el.key-1, ellossdensity)
+        for keys, lossdensity in self._lossdensity(methode, processes):
+            for k, d in zip(keys.tolist(), lossdensity.tolist()):
+                cell_data.InsertValue(k-1, d)
 
         dest_grid.GetCellData().AddArray(cell_data)
 
@@ -1318,3 +1793,222 @@ class Losses(object):
         writer.Write()
 
         return
+
+
+class LossMonitor(Losses):
+    def __init__(self, modelname, dirname, cache=False):
+        '''Incremental loss calculation of a running FEMAG-TS simulation
+        Parameters
+        ----------
+        modelname : str
+            Name of the model (nc-file)
+        dirname : str
+            Directory of the vtu-files (at least one must exist)
+        cache : bool
+            see Losses
+
+        The vtu-files are ingested as they are written (see update),
+        files without a later time are skipped. The ohmic, eddy current and excess loss energies of all
+        elements are integrated step by step. The hysteresis losses
+        depend on the main field direction of the whole time range and
+        are calculated on demand from the steps ingested so far.
+        '''
+        super(LossMonitor, self).__init__(modelname, dirname, cache=cache)
+        length = self.nc_model.arm_length
+        self.scale_factor = self.nc_model.scale_factor()
+
+        # conductor elements
+        self.conductors = [se for se in self.nc_model.superelements
+                           if se.conduc > 0.0]
+        elements = [el for se in self.conductors for el in se.elements]
+        self._ckeys = np.array([el.key for el in elements], dtype=int)
+        self._cfactor = np.concatenate(
+            [[el.area/(se.fillfactor or 1.0)/se.conduc *
+              (1+se.temp_coef*(el.temperature-20))*se.length*length
+              for el in se.elements] for se in self.conductors] + [[]])
+        self._csplit = np.cumsum(
+            [len(se.elements) for se in self.conductors], dtype=int)[:-1]
+
+        # iron elements
+        self.ironparts = [
+            se for se in self.nc_model.superelements
+            if (se.elements[0].reluc[0] < 1.0 or
+                se.elements[0].reluc[1] < 1.0) and
+            (se.elements[0].mag[0] == 0.0 and se.elements[0].mag[1] == 0.0)]
+        coeffs = [self.iron_loss_coefficients[self._iron_loss_coeff_index(se)]
+                  for se in self.ironparts]
+        nel = [len(se.elements) for se in self.ironparts]
+        self._ikeys = np.array([el.key for se in self.ironparts
+                                for el in se.elements], dtype=int)
+        self._iscale = np.concatenate(
+            [[el.area*length*c['fillfactor']*c['spec_weight']*1000
+              for el in se.elements]
+             for se, c in zip(self.ironparts, coeffs)] + [[]])
+        self._icoeffs = {
+            k: np.repeat([c[k] for c in coeffs], nel)
+            for k in ('fillfactor', 'kw', 'cw_ind_exp', 'ke', 'ce_ind_exp')}
+        self._isplit = np.cumsum(nel, dtype=int)[:-1]
+
+        # keep only the conductor and iron elements
+        self.vtu_data.select_cells(np.concatenate((self._ckeys, self._ikeys)))
+        self._cidx = self.vtu_data.cell_index(self._ckeys)
+        self._iidx = self.vtu_data.cell_index(self._ikeys)
+
+        self.time = []
+        self._ohm = np.zeros(len(self._ckeys))
+        self._eddy = np.zeros(len(self._ikeys))
+        self._exce = np.zeros(len(self._ikeys))
+        self._cd = self._b = None
+        self._skipped = set()
+        self.vtu_data.filenames = []
+        self.update()
+
+    def update(self):
+        '''Ingest the vtu-files written since the last update
+        Returns
+        -------
+        numsteps : int
+            Number of new time steps
+        '''
+        data_list = [d for d in ('time [s]', 'curd', 'b')
+                     if d in self.vtu_data.get_data_names()]
+        new = [f for f in self.vtu_data.update() if f not in self._skipped]
+        numsteps = 0
+        for filename in new:
+            d = self.vtu_data.read_file(filename, data_list)
+            t = float(d['time [s]'][0])
+            cd = d['curd'][self._cidx, 0] if 'curd' in d else \
+                np.zeros(len(self._ckeys))
+            b = d['b'][self._iidx, :2].astype(float) / \
+                self._icoeffs['fillfactor'][:, None] if 'b' in d else \
+                np.zeros((len(self._ikeys), 2))
+            if self.time:
+                dt = t - self.time[-1]
+                if dt <= 0:
+                    logger.warning("%s: time %g not after %g (skipped)",
+                                   filename, t, self.time[-1])
+                    self._skipped.add(filename)
+                    continue
+                self._ohm += ((self._cd + cd)/2)**2*dt
+                dbdt = np.sqrt(np.sum((b - self._b)**2, axis=1))/dt
+                self._eddy += self._icoeffs['kw'] * \
+                    dbdt**self._icoeffs['cw_ind_exp']*dt
+                self._exce += self._icoeffs['ke'] * \
+                    dbdt**self._icoeffs['ce_ind_exp']*dt
+            self.time.append(t)
+            self._cd, self._b = cd, b
+            numsteps += 1
+        # the skipped files are excluded from the hysteresis losses
+        self.vtu_data.filenames = [f for f in self.vtu_data.filenames
+                                   if f not in self._skipped]
+        if numsteps:
+            logger.debug("%d new steps (%d), t=%g",
+                         numsteps, len(self.time), self.time[-1])
+        return numsteps
+
+    def watch(self, interval=1.0, timeout=60.0):
+        '''Ingest new vtu-files until no file is written within timeout
+        Parameters
+        ----------
+        interval : float
+            Polling interval in seconds
+        timeout : float
+            Max waiting time for a new file in seconds
+
+        Returns
+        -------
+        iterator of this object after each update with new steps
+        (stop the iteration to abort early)
+        '''
+        import time
+        last = time.time()
+        while True:
+            if self.update():
+                last = time.time()
+                yield self
+            elif time.time() - last > timeout:
+                return
+            else:
+                time.sleep(interval)
+
+    def ohm_lossenergy(self):
+        '''Ohmic loss energy of all subregions of the steps ingested so far
+        Returns
+        -------
+        loss_data: dict
+            Dictonary of subregions and ohmic loss energy of it
+        '''
+        seenergy = dict(zip(
+            [se.key for se in self.conductors],
+            [np.sum(e)*self.scale_factor
+             for e in np.split(self._ohm*self._cfactor, self._csplit)]))
+        loss_data = []
+        for sr in self.nc_model.subregions:
+            srlossenergy = float(sum(seenergy.get(se.key, 0.0)
+                                     for se in sr.superelements))
+            srname = sr.name
+            if sr.wb_key >= 0:
+                if srname == '    ':
+                    srname = "wdg "+str(sr.wb_key+1)
+
+            loss_data.append(
+                {'key': sr.key, 'name': srname, 'losses': srlossenergy})
+        return loss_data
+
+    def ohm_powerlosses(self):
+        '''Averaged ohmic loss dissipation of all subregions
+        of the steps ingested so far (see ohm_lossenergy),
+        0 until two steps are ingested
+        '''
+        time = self.time[-1] - self.time[0] if self.time else 0
+        loss_data = self.ohm_lossenergy()
+        for sr in loss_data:
+            # no losses before two steps are ingested
+            sr['losses'] = sr['losses']/time if time > 0 else 0.0
+        return loss_data
+
+    def iron_lossenergy_time(self, hysteresis=True):
+        '''Iron losses of all subregion of the steps ingested so far
+        Parameters
+        ----------
+        hysteresis: bool
+            calculate the hysteresis losses (requires to read the flux
+            density of all steps again) otherwise they are 0
+
+        Returns
+        -------
+        energies : dict
+            Iron losses enegies of the subregion
+        '''
+        if hysteresis:
+            self.times = TimeRange(self.vtu_data, self.nc_model)
+        selosses = []
+        for se, eddy, exce in zip(
+                self.ironparts,
+                np.split(self._eddy*self._iscale, self._isplit),
+                np.split(self._exce*self._iscale, self._isplit)):
+            hyst = 0.0
+            if hysteresis:
+                hyst = np.sum(self.iron_lossenergy_time_elements(
+                    se.elements, se)['hysteresis'])
+            sehyst, seeddy, seexce = [
+                float(np.sum(x))*self.scale_factor
+                for x in (hyst, eddy, exce)]
+            selosses.append((se, {'total': sehyst + seeddy + seexce,
+                                  'hysteresis': sehyst,
+                                  'eddycurrent': seeddy,
+                                  'excess': seexce}))
+        return self._subregion_energies(selosses)
+
+    def iron_losses_time(self, hysteresis=True):
+        '''Averaged iron losses of all subregion of the steps
+        ingested so far (see iron_lossenergy_time),
+        0 until two steps are ingested
+        '''
+        time = self.time[-1] - self.time[0] if self.time else 0
+        # no losses before two steps are ingested
+        losseslist = self.iron_lossenergy_time(hysteresis and time > 0)
+        for sr in losseslist:
+            for k in ('total', 'hysteresis', 'eddycurrent', 'excess'):
+                sr[k] = sr[k]/time if time > 0 else 0.0
+        return losseslist
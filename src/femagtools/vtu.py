@@ -1,23 +1,37 @@
 """Read FEMAG vtu files
 
 """
+import os
+import re
+import zlib
 import logging
 import pathlib
 import numpy as np
 import vtk
 from vtkmodules.util.numpy_support import vtk_to_numpy
 
+logger = logging.getLogger(__name__)
 
 class Reader(object):
     '''read vtu-files
 
         Args:
           pathname : str Directory of result files (vtu-files) or a single vtu file
+          cache : bool Read point and cell data into dense arrays
+            (timesteps x points/cells x components) which are stored as
+            memory-mapped npy files next to the vtu files and reused as
+            long as no vtu file is newer
+          cells : list of int (optional) Keys of the cells to keep
+            in the arrays of cell data (see select_cells)
 
     '''
 
-    def __init__(self, pathname):
+    def __init__(self, pathname, cache=False, cells=None):
         self.data = {}
+        self.arrays = {}
+        self.time_axis = None
+        self.cache = cache
+        self.cells = None
 
         self.reader = vtk.vtkXMLUnstructuredGridReader()
         self.output = self.reader.GetOutput()
@@ -26,6 +40,7 @@ class Reader(object):
         self.point_data_names = []
         self.cell_data_names = []
         assert pathlib.Path(pathname).exists(), f"{pathname} not found"
+        self.pathname = pathlib.Path(pathname)
         if pathlib.Path(pathname).suffix == '.vtu':
             self.filenames = [pathlib.Path(pathname)]
         else:
@@ -45,6 +60,135 @@ class Reader(object):
             for i in range(self.output.GetCellData().GetNumberOfArrays())]
 
         self.set_time_window(0.0, 0.0)
+        if cells is not None:
+            self.select_cells(cells)
+
+    def select_cells(self, keys):
+        '''Keep only the values of the given cells in the arrays of
+        cell data (such as the elements of a subregion or magnet).
+        The other rows are not held in memory and files with raw
+        appended data are read without VTK.
+
+        Args:
+          keys : list of int Keys of the cells (None: all cells)
+
+        '''
+        if keys is not None:
+            keys = np.unique(np.asarray(keys, dtype=int))
+        self.cells = keys
+        for data_name in self.cell_data_names:
+            self.arrays.pop(data_name, None)
+            self.data.pop(data_name, None)
+
+    def selected(self, keys):
+        '''return a mask of the cells whose values are kept in the
+        arrays of cell data (see select_cells)
+
+        Args:
+          keys : int or list of int Keys of cells
+
+        '''
+        keys = np.atleast_1d(np.asarray(keys, dtype=int))
+        if self.cells is None:
+            return np.ones(len(keys), dtype=bool)
+        idx = np.searchsorted(self.cells, keys)
+        valid = idx < len(self.cells)
+        valid[valid] = self.cells[idx[valid]] == keys[valid]
+        return valid
+
+    def cell_index(self, keys):
+        '''return the row indexes of cells in the arrays of cell data
+
+        Args:
+          keys : int or list of int Keys of cells
+
+        '''
+        keys = np.atleast_1d(keys)
+        if self.cells is None:
+            return keys - 1
+        valid = self.selected(keys)
+        if not np.all(valid):
+            raise ValueError('cells not selected: {}'.format(
+                keys[~valid][:10].tolist()))
+        return np.searchsorted(self.cells, keys)
+
+    def update(self):
+        '''Add the vtu files which were completely written since the
+        construction or the last update (such as by a running FEMAG-TS
+        simulation). The data read so far is dropped and the time window
+        is reset.
+
+        Returns:
+            List of the new vtu files
+
+        '''
+        if self.pathname.suffix == '.vtu':
+            return []
+        known = set(self.filenames)
+        new = []
+        for filename in sorted(self.pathname.glob("*.vtu")):
+            if filename in known:
+                continue
+            if not _complete(filename):
+                break
+            new.append(filename)
+        if new:
+            self.filenames += new
+            self.data = {}
+            self.arrays = {}
+            self.time_axis = None
+            self.istart = self.iend = None
+        return new
+
+    def read_file(self, filename, data_list):
+        '''Read data of a single vtu file
+
+        Args:
+          filename : str Name of vtu file
+          data_list : list of str Names of numeric field, point or cell data
+
+        Returns:
+            Dict of arrays (field data: values,
+            point and cell data: points/cells x components)
+
+        '''
+        for data_name in data_list:
+            if data_name not in self.get_data_names():
+                raise Exception('unknown data name "' + data_name+'"')
+        data = self._read_values(filename, data_list)
+        for data_name in data_list:
+            if data_name in self.field_data_names:
+                data[data_name] = data[data_name].ravel()
+        return data
+
+    def _read_values(self, filename, data_list):
+        '''return dict of arrays (rows x components) of a vtu file
+        with the selected rows of cell data'''
+        rows = {d: self.cells - 1 if self._selected(d) else None
+                for d in data_list}
+        values = {}
+        appended = _AppendedData.open(filename)
+        if appended:
+            for data_name in data_list:
+                if data_name in appended.arrays:
+                    values[data_name] = appended.read(data_name,
+                                                      rows[data_name])
+        rest = [d for d in data_list if d not in values]
+        if rest:
+            self.reader.SetFileName(str(filename))
+            self.reader.Update()
+            for data_name in rest:
+                if data_name in self.field_data_names:
+                    a = vtk_to_numpy(self.output.GetFieldData(
+                    ).GetAbstractArray(data_name))
+                else:
+                    a = vtk_to_numpy(self._data_array(data_name))
+                a = a.reshape((a.shape[0], -1))
+                if rows[data_name] is None:
+                    values[data_name] = a
+                else:
+                    values[data_name] = a[rows[data_name]]
+        return values
 
     def get_data_names(self):
         '''Read the list of values stored in the vtu files
@@ -64,6 +208,7 @@ class Reader(object):
           data_list : fist of str List of values to extract from vtu_files
 
         '''
+        data_list = [d for d in data_list if d not in self.data]
         for data_name in data_list:
             if data_name in self.field_data_names:
                 self.data[data_name] = []
@@ -73,6 +218,15 @@ class Reader(object):
                 self.data[data_name] = []
             else:
                 raise Exception('unknown data name "' + data_name+'"')
+        if not data_list:
+            return "done"
+
+        if self.cache or self.cells is not None:
+            self.read_arrays([d for d in data_list
+                              if d not in self.field_data_names])
+            data_list = [d for d in data_list if d in self.field_data_names]
+            if not data_list:
+                return "done"
 
         for filename in self.filenames:
             self.reader.SetFileName(str(filename))
@@ -91,6 +245,117 @@ class Reader(object):
 
         return "done"
 
+    def _cachefile(self, data_name):
+        slug = re.sub(r'\W+', '_', data_name).strip('_')
+        return self.filenames[0].with_name(
+            '{}.{}.npy'.format(self.filenames[0].stem.rsplit('_', 1)[0],
+                               slug))
+
+    def _data_array(self, data_name):
+        if data_name in self.point_data_names:
+            return self.output.GetPointData().GetAbstractArray(data_name)
+        return self.output.GetCellData().GetAbstractArray(data_name)
+
+    def read_arrays(self, data_list):
+        '''Read point or cell data of all vtu files into dense arrays
+        (timesteps x points/cells x components) in a single pass.
+        If cache is enabled the arrays are stored as npy files and
+        memory-mapped. If cells are selected only their rows of the
+        cell data are kept (and taken from existing cache files).
+
+        Args:
+          data_list : list of str Names of point or cell data
+
+        '''
+        missing = []
+        mtime = max(f.stat().st_mtime_ns for f in self.filenames)
+        for data_name in data_list:
+            if data_name in self.arrays:
+                continue
+            if (data_name not in self.point_data_names and
+                    data_name not in self.cell_data_names):
+                raise Exception('unknown data name "' + data_name+'"')
+            cachefile = self._cachefile(data_name)
+            if self.cache and cachefile.exists() and \
+               cachefile.stat().st_mtime_ns >= mtime:
+                try:
+                    a = np.load(cachefile, mmap_mode='r')
+                    if a.shape[0] == len(self.filenames):
+                        logger.debug("Read cache %s", cachefile)
+                        if self._selected(data_name):
+                            a = np.array(a[:, self.cells - 1])
+                        self.arrays[data_name] = a
+                        continue
+                except (OSError, ValueError) as e:
+                    logger.warning("Cannot read cache %s: %s",
+                                   cachefile, e)
+            missing.append(data_name)
+        if not missing:
+            return
+
+        arrays = {}
+        try:
+            for i, filename in enumerate(self.filenames):
+                values = self._read_values(filename, missing)
+                for data_name in missing:
+                    a = values[data_name]
+                    if i == 0:
+                        shape = (len(self.filenames),) + a.shape
+                        if self.cache and not self._selected(data_name):
+                            tmpfile = '{}.{}.tmp'.format(
+                                self._cachefile(data_name), os.getpid())
+                            arrays[data_name] = (
+                                np.lib.format.open_memmap(
+                                    tmpfile, mode='w+', dtype=a.dtype,
+                                    shape=shape),
+                                tmpfile)
+                        else:
+                            arrays[data_name] = (
+                                np.empty(shape, dtype=a.dtype), None)
+                    arrays[data_name][0][i] = a
+        except Exception:
+            for a, tmpfile in arrays.values():
+                if tmpfile:
+                    del a
+                    os.remove(tmpfile)
+            raise
+
+        for data_name in missing:
+            a, tmpfile = arrays.pop(data_name)
+            if tmpfile:
+                a.flush()
+                del a
+                cachefile = self._cachefile(data_name)
+                os.replace(tmpfile, cachefile)
+                a = np.load(cachefile, mmap_mode='r')
+            self.arrays[data_name] = a
+
+    def _selected(self, data_name):
+        return self.cells is not None and data_name in self.cell_data_names
+
+    def get_array(self, data_name, keys=None):
+        '''Read point or cell data of all vtu files as array
+
+        Args:
+          data_name : str Name of point or cell data
+          keys : int or list of int (optional) Keys of points or cells
+            (default: all or the selected cells)
+
+        Returns:
+          Array (timesteps x points/cells x components) of the values
+          within the time window
+
+        '''
+        if data_name not in self.arrays:
+            self.read_arrays([data_name])
+        start, end = self.istart or 0, self.iend or len(self.filenames)
+        a = self.arrays[data_name][start:end]
+        if keys is None:
+            return a
+        if data_name in self.cell_data_names:
+            return a[:, self.cell_index(keys)]
+        return a[:, np.atleast_1d(keys) - 1]
+
     def set_time_window(self, start, end):
         '''Set time window
 
@@ -108,27 +373,61 @@ class Reader(object):
 
         '''
         try:
-            if "time [s]" not in self.data:
-                self.read_data(['time [s]'])
-
-            if start == 0 or start <= self.data['time [s]'][0].GetValue(0):
+            time = self.get_time_axis()
+            if start == 0 or start <= time[0]:
                 self.istart = 0
             else:
-                self.istart = 0
-                for i in range(len(self.data['time [s]'])):
-                    if start >= self.data['time [s]'][i].GetValue(0):
-                        self.istart = i+1
-            if end == 0 or end >= self.data['time [s]'][-1].GetValue(0):
-                self.iend = len(self.data['time [s]'])
+                self.istart = int(np.searchsorted(time, start, side='right'))
+            if end == 0 or end >= time[-1]:
+                self.iend = len(time)
             else:
-                self.iend = 0
-                for i in range(len(self.data['time [s]'])):
-                    if end <= self.data['time [s]'][i].GetValue(0):
-                        self.iend = i
+                self.iend = int(np.searchsorted(time, end, side='right'))
         except:
             self.istart = None
             self.iend = None
 
+    def get_time_axis(self):
+        '''Read the time values of all vtu files
+
+        Returns:
+            Array of time values (s)
+
+        '''
+        if self.time_axis is None:
+            if "time [s]" not in self.data:
+                self.read_data(['time [s]'])
+            self.time_axis = np.array(
+                [a.GetValue(0) for a in self.data['time [s]']])
+        return self.time_axis
+
+    def sliding_window(self, data_name, width, step=0, keys=None):
+        '''Iterate over time windows within the time window
+        (such as each period of a long transient simulation)
+
+        Args:
+          data_name : str Name of point or cell data
+          width : float Length of each window (s)
+          step : float Shift of the windows (s) (default: width)
+          keys : int or list of int (optional) Keys of points or cells
+
+        Returns:
+          Iterator of tuples of time values and data array
+          (timesteps x points/cells x components) of each window.
+          Both are views (without copies) of the same buffers.
+
+        '''
+        a = self.get_array(data_name, keys)
+        start, end = self.istart or 0, self.iend or len(self.filenames)
+        time = self.get_time_axis()[start:end]
+        step = step or width
+        eps = 1e-3*np.min(np.diff(time)) if len(time) > 1 else 0
+        t0 = time[0]
+        while t0 + width <= time[-1] + eps:
+            i0 = np.searchsorted(time, t0 - eps)
+            i1 = np.searchsorted(time, t0 + width + eps, side='right')
+            yield time[i0:i1], a[i0:i1]
+            t0 += step
+
     def get_field_vector(self, field_data) -> list:
         '''Read field data
 
@@ -138,6 +437,9 @@ class Reader(object):
         Returns:
             List of field values within the time window
         '''
+        if field_data == 'time [s]':
+            start, end = self.istart or 0, self.iend or len(self.filenames)
+            return self.get_time_axis()[start:end].tolist()
         if field_data not in self.data:
             self.read_data([field_data])
 
@@ -168,8 +470,10 @@ class Reader(object):
           List of point values within the time window
 
         '''
-        if pnt_data not in self.data:
+        if pnt_data not in self.data and pnt_data not in self.arrays:
             self.read_data([pnt_data])
+        if pnt_data in self.arrays:
+            return self.get_array(pnt_data, pnt)[:, 0, 0].tolist()
 
         if self.istart:
             start = self.istart
@@ -193,11 +497,30 @@ class Reader(object):
           cell : int Key of cell
 
         Returns:
-            List of cell values within the time window
+            List of cell values within the time window or
+            (cell <= 0) array of the values of all cells of the last
+            file. If cells are selected the values of the other cells
+            are nan.
 
         '''
+        if cell_data in self.arrays:
+            if cell <= 0:
+                a = self.arrays[cell_data][-1]
+                if self._selected(cell_data):
+                    sel = a
+                    a = np.full((self.output.GetNumberOfCells(),)
+                                + sel.shape[1:], np.nan,
+                                dtype=np.result_type(sel.dtype, float))
+                    a[self.cells - 1] = sel
+                return a[:, 0] if a.shape[1] == 1 else np.asarray(a)
+            a = self.get_array(cell_data, cell)[:, 0]
+            if a.shape[1] == 1:
+                return a[:, 0].tolist()
+            return a.T.tolist()
         if cell_data not in self.data:
             self.read_data([cell_data])
+            if cell_data in self.arrays:
+                return self.get_cell_vector(cell_data, cell)
 
         if cell<=0:
             return vtk_to_numpy(
@@ -316,11 +639,140 @@ class Reader(object):
         return '\n'.join(fmt)
 
 
-def read(filename) -> Reader:
+_vtk_types = {'Int8': 'i1', 'UInt8': 'u1', 'Int16': 'i2', 'UInt16': 'u2',
+              'Int32': 'i4', 'UInt32': 'u4', 'Int64': 'i8', 'UInt64': 'u8',
+              'Float32': 'f4', 'Float64': 'f8'}
+
+
+class _AppendedData(object):
+    """direct access to the data arrays of a vtu file with raw
+    appended data (uncompressed or zlib compressed blocks)"""
+
+    def __init__(self, filename, start, arrays, header_type, compressed):
+        self.filename = filename
+        self.start = start  # file position of the appended data
+        self.arrays = arrays  # name: (dtype, components, offset)
+        self.header_type = header_type
+        self.compressed = compressed
+
+    @classmethod
+    def open(cls, filename, blocksize=65536):
+        """return the appended data of the file or None if the
+        file has no (supported) raw appended data"""
+        head = b''
+        with open(filename, 'rb') as f:
+            while True:
+                chunk = f.read(blocksize)
+                head += chunk
+                pos = head.find(b'<AppendedData')
+                if pos >= 0:
+                    m = re.compile(rb'<AppendedData([^>]*)>\s*_').search(
+                        head, pos)
+                    if m:
+                        break
+                if not chunk or (pos < 0 and
+                                 b'</UnstructuredGrid>' in head):
+                    return None
+        attrs = dict(re.findall(rb'(\w+)="([^"]*)"', m.group(1)))
+        if attrs.get(b'encoding') != b'raw':
+            return None
+        vtkfile = dict(re.findall(
+            rb'(\w+)="([^"]*)"',
+            re.search(rb'<VTKFile([^>]*)>', head).group(1)))
+        byteorder = '>' if vtkfile.get(b'byte_order') == b'BigEndian' \
+            else '<'
+        compressor = vtkfile.get(b'compressor', b'')
+        if compressor not in (b'', b'vtkZLibDataCompressor'):
+            return None
+        header_type = np.dtype(byteorder + _vtk_types[
+            vtkfile.get(b'header_type', b'UInt32').decode()])
+
+        arrays = {}
+        section = None
+        for tag, attrs in re.findall(rb'<(/?\w+)([^>]*)>', head[:pos]):
+            if tag in (b'FieldData', b'PointData', b'CellData',
+                       b'Points', b'Cells'):
+                section = tag
+            elif tag.startswith(b'/'):
+                if tag[1:] == section:
+                    section = None
+            elif tag == b'DataArray' and section in (
+                    b'FieldData', b'PointData', b'CellData'):
+                a = dict(re.findall(rb'(\w+)="([^"]*)"', attrs))
+                if a.get(b'format') != b'appended' or \
+                   a.get(b'type', b'').decode() not in _vtk_types:
+                    continue
+                arrays.setdefault(a[b'Name'].decode(), (
+                    np.dtype(byteorder + _vtk_types[a[b'type'].decode()]),
+                    int(a.get(b'NumberOfComponents', 1)),
+                    int(a[b'offset'])))
+        return cls(filename, m.end(), arrays, header_type,
+                   compressor != b'')
+
+    def read(self, data_name, rows=None):
+        """return the array (rows x components) of data_name
+
+        Args:
+          data_name: name of data array
+          rows: indexes of the rows to read (default: all)
+        """
+        dtype, ncomp, offset = self.arrays[data_name]
+        rowsize = dtype.itemsize*ncomp
+        with open(self.filename, 'rb') as f:
+            f.seek(self.start + offset)
+            if not self.compressed:
+                nbytes = int(np.fromfile(f, self.header_type, 1)[0])
+                shape = (nbytes//rowsize, ncomp)
+                if rows is None:
+                    return np.fromfile(f, dtype, shape[0]*ncomp).reshape(
+                        shape)
+                return np.array(np.memmap(f, dtype, 'r', offset=f.tell(),
+                                          shape=shape)[rows])
+
+            nblocks, blocksize, lastsize = np.fromfile(
+                f, self.header_type, 3).astype(int)
+            sizes = np.fromfile(f, self.header_type, nblocks).astype(int)
+            offsets = f.tell() + np.concatenate(([0], np.cumsum(sizes)))
+            nbytes = 0
+            if nblocks > 0:
+                nbytes = (nblocks - 1)*blocksize + (lastsize or blocksize)
+            if rows is None:
+                blocks = range(nblocks)
+            else:
+                rows = np.asarray(rows)
+                blocks = np.unique(np.concatenate((
+                    rows*rowsize//blocksize,
+                    ((rows + 1)*rowsize - 1)//blocksize)))
+            buf = np.empty(nbytes, dtype=np.uint8)
+            for j in blocks:
+                f.seek(offsets[j])
+                block = zlib.decompress(f.read(sizes[j]))
+                buf[j*blocksize:j*blocksize + len(block)] = np.frombuffer(
+                    block, dtype=np.uint8)
+        a = buf.view(dtype).reshape((nbytes//rowsize, ncomp))
+        if rows is None:
+            return a
+        return a[rows]
+
+
+def _complete(filename):
+    """return True if the vtu file is completely written"""
+    try:
+        with open(filename, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 64))
+            return b'</VTKFile>' in f.read()
+    except OSError:
+        return False
+
+
+def read(filename, cache=False, cells=None) -> Reader:
     """
     Read vtu file and return Reader object.
 
     Args:
         filename: name of vtu file to be read
+        cache: store point and cell data as memory-mapped npy files
+        cells: keys of the cells to keep in the arrays of cell data
     """
-    return Reader(filename)
+    return Reader(filename, cache=cache, cells=cells)
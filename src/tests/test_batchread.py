@@ -0,0 +1,45 @@
+import os
+import shutil
+import pytest
+import femagtools.batchread
+
+
+def _torque(bch):
+    return bch.machine['torque']
+
+
+def test_read_bch(tmp_path):
+    datadir = os.path.join(os.path.split(__file__)[0], 'data')
+    dirs = []
+    for i, f in enumerate(('pmsim.BATCH', 'relsim.BATCH', 'pmsim-9.BATCH')):
+        d = tmp_path / str(i)
+        d.mkdir()
+        shutil.copy(os.path.join(datadir, f), d / 'femag_001.BATCH')
+        dirs.append(d)
+    calls = []
+    results = dict(femagtools.batchread.read(
+        dirs, 'bch', processes=2, maxpending=2,
+        progress=lambda n, tot, p: calls.append((n, tot))))
+    assert sorted(results) == sorted(str(d) for d in dirs)
+    assert [c[0] for c in calls] == [1, 2, 3]
+    assert all(c[1] == 3 for c in calls)
+    expected = femagtools.bch.read(str(dirs[0] / 'femag_001.BATCH'))
+    assert results[str(dirs[0])].machine == expected.machine
+    torques = dict(femagtools.batchread.read(dirs, func=_torque,
+                                             processes=1))
+    assert torques[str(dirs[0])] == expected.machine['torque']
+
+
+def test_read_nc():
+    ncfile = os.path.join(os.path.split(__file__)[0], 'data', 'minimal.nc')
+    (p, r), = femagtools.batchread.read([ncfile], 'nc')
+    assert p == ncfile
+    assert len(r.elements) == 822
+
+
+def test_read_invalid_kind():
+    # raised at the call, not when iterating
+    with pytest.raises(ValueError):
+        femagtools.batchread.read(['x'], 'xyz')
+    with pytest.raises(ValueError):
+        femagtools.batchread.read(['x'], 'vtu')
@@ -336,6 +336,59 @@ class BchReaderTest(unittest.TestCase):
         self.assertEqual(bch.ldq['losses']['styoke_hyst'][0],  [0.0, 0.0, 0.0, 0.0])
         self.assertEqual(bch.ldq['losses']['rotor_eddy'][0],  [0.05937, 0.4195, 1.74, 2.705])
         self.assertEqual(bch.ldq['losses']['rotor_hyst'][0],  [0.0, 0.0, 0.0, 0.0])
+    def test_read_cache(self):
+        import shutil
+        import tempfile
+        testPath = os.path.join(os.path.split(__file__)[0], 'data')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bchfile = os.path.join(tmpdir, 'ldq.BATCH')
+            shutil.copy(os.path.join(testPath, 'ldq.BATCH'), bchfile)
+            bch = femagtools.bch.read(bchfile, cache=True)
+            self.assertTrue(os.path.exists(bchfile + '.cache'))
+            cached = femagtools.bch.read(bchfile, cache=True)
+            self.assertEqual(str(cached), str(bch))
+            self.assertEqual(cached.ldq['ld'], bch.ldq['ld'])
+            # changed content invalidates the cache
+            with open(bchfile, 'a') as f:
+                f.write('\n')
+            os.utime(bchfile, ns=(0, 0))
+            self.assertIsNone(femagtools.bch._read_cache(bchfile))
+            # unreadable or foreign cache files are ignored
+            for content in (b'\x80\x04\x95', b'{"version": 2}',
+                            b'\x80\x04\x95\x1a\x00\x00\x00\x00\x00\x00\x00'
+                            b'\x8c\x08nomodule\x94\x8c\x03Obj\x94\x93\x94.'):
+                with open(bchfile + '.cache', 'wb') as f:
+                    f.write(content)
+                self.assertIsNone(femagtools.bch._read_cache(bchfile))
+                bch = femagtools.bch.read(bchfile, cache=True)
+                self.assertEqual(str(femagtools.bch.read(bchfile, cache=True)),
+                                 str(bch))
+
+    def test_floatnan_table(self):
+        m = femagtools.bch.floatnan_table(['1.0\t-2.5e-3\t****',
+                                           '4\t5.5\t6'], 3)
+        self.assertEqual(m.shape, (2, 3))
+        self.assertTrue(np.isnan(m[0, 2]))
+        self.assertEqual(m[1].tolist(), [4.0, 5.5, 6.0])
+        m = femagtools.bch.floatnan_table(['1  2', ' 3 4'], 2, sep=None)
+        self.assertEqual(m.tolist(), [[1.0, 2.0], [3.0, 4.0]])
+
+    def test_read_lazy(self):
+        testPath = os.path.join(os.path.split(__file__)[0], 'data')
+        for f in ('psidq-losses.BATCH', 'ldlq_outer_rotor.BATCH',
+                  'cogging.BATCH', 'pmsim.BATCH'):
+            filename = os.path.join(testPath, f)
+            bch = femagtools.bch.read(filename)
+            lazy = femagtools.bch.read(filename, lazy=True)
+            self.assertTrue('losses' not in lazy.__dict__)
+            self.assertEqual(str(lazy), str(bch))
+            self.assertEqual(lazy.external_rotor, bch.external_rotor)
+
+        bch = femagtools.bch.read(os.path.join(testPath, 'psidq-losses.BATCH'),
+                                  sections=['machine'])
+        self.assertEqual(bch.machine['p'], 4)
+        self.assertEqual(bch.psidq, {})
+
 
 if __name__ == '__main__':
     unittest.main()
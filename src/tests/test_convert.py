@@ -1,5 +1,6 @@
 import meshio
-from femagtools import convert, isa7
+import numpy as np
+from femagtools import convert, isa7, nc
 import xml.etree.ElementTree as ET
 
 
@@ -133,6 +134,59 @@ def test_vtu(tmpdir):
         assert m.cells[2].data.shape == (1506, 4)
 
 
+def test_vtu_nc(tmpdir):
+    vtu = str(tmpdir.join("pm_model.vtu"))
+    convert.to_vtu("src/tests/data/zzz_pm_model_ts.nc", vtu)
+
+    isa = nc.read("src/tests/data/zzz_pm_model_ts.nc")
+    m = meshio.read(vtu)
+    assert len(m.points) == len(isa.nodes)
+    assert [(c.type, len(c)) for c in m.cells] == [
+        ("line", 646), ("triangle", 10654), ("quad", 180)]
+    triangles = [e for e in isa.elements if len(e.vertices) == 3]
+    np.testing.assert_allclose(
+        m.cell_data["b"][1][:, :2],
+        [e.flux_density() for e in triangles], rtol=1e-6, atol=1e-9)
+    np.testing.assert_allclose(
+        m.cell_data["Demagnetization"][1],
+        [e.demagnetization(isa.MAGN_TEMPERATURE) for e in triangles],
+        rtol=1e-6)
+
+
+def test_vtu_appended(tmpdir):
+    vtu = str(tmpdir.join("pm_model.vtu"))
+    raw = str(tmpdir.join("pm_model_raw.vtu"))
+    isa = nc.read("src/tests/data/zzz_pm_model_ts.nc", columnar=True)
+    convert.to_vtu(isa, vtu)
+    convert.to_vtu(isa, raw, appended=True)
+
+    with open(raw, 'rb') as f:
+        assert b'<AppendedData encoding="raw">' in f.read()
+    m, r = meshio.read(vtu), meshio.read(raw)
+    np.testing.assert_array_equal(r.points, m.points)
+    np.testing.assert_array_equal(r.point_data["potential"],
+                                  m.point_data["potential"])
+    assert [(c.type, len(c)) for c in r.cells] == [
+        (c.type, len(c)) for c in m.cells]
+    for c, d in zip(r.cells, m.cells):
+        np.testing.assert_array_equal(c.data, d.data)
+    assert r.cell_data.keys() == m.cell_data.keys()
+    for k in m.cell_data:
+        for c, d in zip(r.cell_data[k], m.cell_data[k]):
+            np.testing.assert_array_equal(c, d)
+
+
+def test_columnar_model(tmpdir):
+    isa = nc.read("src/tests/data/zzz_pm_model_ts.nc", columnar=True)
+    convert.to_vtu(isa, str(tmpdir.join("pm_model.vtu")))
+    convert.to_msh(isa, str(tmpdir.join("pm_model.msh")))
+    # the model is still columnar: no mesh objects were created
+    assert '_mesh' in vars(isa)
+    for name in ('nodes', 'nodechains', 'elements', 'superelements',
+                 'subregions', 'windings'):
+        assert not any(getattr(isa, name).items)
+
+
 def test_vtu_triangles(tmpdir):
     vtu = str(tmpdir.join("triangles.vtu"))
     convert.to_vtu("src/tests/data/convert/triangles.ISA7", vtu)
@@ -1,9 +1,18 @@
 #!/usr/bin/env python
 #
+import pathlib
+import numpy as np
 import pytest
+import femagtools.bch
+import femagtools.machine
 import femagtools.machine.effloss
 
 
+@pytest.fixture
+def data_dir():
+    return pathlib.Path(__file__).with_name('data')
+
+
 @pytest.fixture
 def impars():
     return {'p': 2, 'm': 3, 'f1ref': 50, 'u1ref': 230.94, 'rotor_mass': 12.19, 'kfric_b': 1,
@@ -31,3 +40,33 @@ def test_imeffloss(impars):
          -10.8, -0.5, 0.4, 10.1,
          -8.0, -0.5, 0.4, 7.4,
          -6.4, -0.5, 0.4, 6.0], abs=1e-1)
+
+
+def test_iqdpool(data_dir):
+    bch = femagtools.bch.read(str(data_dir / 'ldq-losses.BATCH'))
+    pm = femagtools.machine.create(bch, r1=0.05, ls=1e-4)
+    ntmesh = np.array([[10, 10, 10, 50, 50, 100],
+                       [20, 80, 150, 20, 80, 20]], dtype=float)
+    iq, id, _ = pm.iqd_tmech_umax_batch(ntmesh[1],
+                                        2*np.pi*ntmesh[0]*pm.p, 200)
+    messages = []
+    with femagtools.machine.effloss.IqdPool(2) as pool:
+        for u1 in (200, 200):  # reused pool
+            iqd = femagtools.machine.effloss.iqd_tmech_umax_multi(
+                2, ntmesh, pm, u1, True, publish=messages.append,
+                pool=pool, batchsize=4)
+            assert iqd == pytest.approx(np.array([iq, id]))
+    assert messages[-1] == ('progress_logger', '6:6 of 6:100')
+
+
+def test_effloss_progress(data_dir):
+    bch = femagtools.bch.read(str(data_dir / 'ldq-losses.BATCH'))
+    pm = femagtools.machine.create(bch, r1=0.05, ls=1e-4)
+    messages = []
+    r = femagtools.machine.effloss.efficiency_losses_map(
+        pm, 200, 100, (90, 90), 4000/60, npoints=(10, 8),
+        progress=messages.append)
+    nsamples = len(r['n'])
+    assert len(messages) == 15
+    assert messages[-1] == ('progress_logger',
+                            f'{nsamples}:{nsamples} of {nsamples}:100')
@@ -21,3 +21,15 @@ def test_im(im):
     s = 0.01
     torque = im.torqueu(2*np.pi*f1, u1, 2*np.pi*(1-s)*f1/im.p)
     assert pytest.approx(torque, rel=0.01) == 17.77
+
+
+def test_im_w1_psi(im):
+    u1 = 230
+    tload = np.array([10.0, 20.0, 10.0])
+    wm = 2*np.pi*np.array([20.0, 20.0, 60.0])
+    w1, psi = im.w1_psi(u1, im.psiref, tload, wm)
+    for k in range(len(w1)):
+        assert pytest.approx(im.w1(u1, psi[k], tload[k], wm[k]),
+                             rel=1e-5) == w1[k]
+        assert pytest.approx(im.tmech(w1[k], psi[k], wm[k]),
+                             rel=1e-5) == tload[k]
@@ -117,3 +117,21 @@ def test_windings(disp_stat):
     for sr in wd.subregions:
         assert type(sr) == isa7.SubRegion
     assert wd.num_turns == 100
+
+
+def test_next_block():
+    import struct
+    data = b''.join([struct.pack('=ihh4sf', 1, -3, 4, b'Stat', 0.25),
+                     struct.pack('=ihh4sf', 0, 7, -8, b'Rot ', 1.5)])
+    reader = isa7.Reader.__new__(isa7.Reader)
+    reader.file = struct.pack('=i', len(data)) + data + struct.pack(
+        '=i', len(data))
+    reader.pos = 0
+    valid, a, b, name, x = reader.next_block('?hh4sf')
+    assert reader.pos == len(reader.file)
+    assert valid.tolist() == [True, False]
+    assert a.tolist() == [-3, 7]
+    assert b.tolist() == [4, -8]
+    assert name == ['Stat', 'Rot ']
+    assert x.dtype == float
+    assert x.tolist() == [0.25, 1.5]
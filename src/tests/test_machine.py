@@ -335,3 +335,101 @@ def test_wdg_resistance():
     sigma = 58e6  # conductivity 1/Ohm m (copper at 20°C)
     assert pytest.approx(0.3156, rel=1e-1) == wdg_resistance(
         wdg, n, g, aw, da1, hs, lfe, sigma)
+
+
+def test_psi_array():
+    import numpy as np
+    beta = np.linspace(-90, 0, 7)
+    i1 = np.linspace(0, 200, 6)
+    b, i = np.meshgrid(beta, i1, indexing='ij')
+    pm = femagtools.machine.PmRelMachineLdq(
+        3, 4,
+        psim=0.11*(1 - 0.0005*i) + 0.001*b/90,
+        ld=1.2e-3*(1 - 0.001*i) + 1e-5*b/90,
+        lq=3e-3*(1 - 0.002*i),
+        r1=0.05, beta=beta, i1=i1)
+    iq, id = femagtools.machine.iqd(
+        np.linspace(-1.4, -0.1, 8)[:, None], np.linspace(10, 190, 5))
+    psid, psiq = pm.psi(iq, id)
+    assert psid.shape == iq.shape
+    for k in np.ndindex(iq.shape):
+        assert (psid[k], psiq[k]) == pm.psi(iq[k], id[k])
+    # out of range
+    psid, psiq = pm.psi(np.array([1000.0, 10.0]), np.array([0.0, -10.0]))
+    assert np.isnan(psid[0]) and np.isnan(psiq[0])
+    assert not np.isnan(psid[1])
+
+
+def test_iqd_tmech_umax_batch(data_dir):
+    import numpy as np
+    bch = femagtools.bch.read(str(data_dir / 'ldq-losses.BATCH'))
+    pm = femagtools.machine.create(bch, r1=0.05, ls=1e-4)
+    u1max = 200
+    torque = np.array([0, 50, 150, 50, 100])
+    w1 = 2*np.pi*np.array([1000, 1000, 1000, 6000, 4000])/60*pm.p
+    iq, id, tq = pm.iqd_tmech_umax_batch(torque, w1, u1max)
+    assert tq[1:] == pytest.approx(torque[1:], abs=1e-4)
+    for k in range(len(torque)):
+        iqx, idx, _ = pm.iqd_tmech_umax(torque[k], w1[k], u1max)
+        assert (iq[k], id[k]) == pytest.approx((iqx, idx), rel=1e-4, abs=1e-6)
+    # voltage limited
+    uq, ud = pm.uqd(w1[3:], iq[3:], id[3:])
+    assert np.hypot(uq, ud)/np.sqrt(2) == pytest.approx(u1max, rel=1e-5)
+
+
+def test_mtpa_table(data_dir):
+    import numpy as np
+    bch = femagtools.bch.read(str(data_dir / 'ldq-losses.BATCH'))
+    pm = femagtools.machine.create(bch, r1=0.05, ls=1e-4)
+    tab = pm.mtpa_table()
+    assert pm.mtpa_table() is tab
+    i1 = 100
+    iq, id, tq = pm.mtpa(i1)
+    assert tq == pytest.approx(np.interp(i1, tab['i1'], tab['T']), rel=1e-3)
+    assert pm.mtpa(i1, exact=False)[2] == pytest.approx(tq, rel=1e-3)
+    # no larger torque at this current
+    assert tq >= max(pm.torque_iqd(*femagtools.machine.iqd(b, i1))
+                     for b in np.linspace(-np.pi/2, 0, 91))
+
+    w1, u1 = 4000, 200
+    iq, id, tq = pm.mtpv(w1, u1)
+    assert (iq, id) == pytest.approx(pm.mtpv(w1, u1, exact=False)[:2],
+                                     rel=5e-2)
+    # a new parameter invalidates the tables
+    pm.ls = 2e-4
+    assert pm.mtpa_table() is not tab
+    tab = pm.mtpv_table()
+    pm.clear_tables()
+    assert pm.mtpv_table() is not tab
+
+
+def test_psidq_transient_batch():
+    import numpy as np
+    iq = np.linspace(-1500, 1500, 13)
+    id = np.linspace(-1500, 0, 11)
+    q, d = np.meshgrid(iq, id, indexing='ij')
+    pm = femagtools.machine.PmRelMachinePsidq(
+        3, 4, psid=0.1 + 0.2*np.tanh(1.2e-3*d) - 2e-8*q**2,
+        psiq=0.35*np.tanh(1e-3*q)*(1 + 2e-4*d),
+        r1=0.05, id=id, iq=iq)
+    tload = [20, 50]
+    speed = [1000/60, 3000/60]
+    r = pm.transient_batch(150, tload, speed,
+                           tshort=0.005, tend=0.05, nsamples=200)
+    assert r['istat'].shape == (2, 3, 200)
+    for k in range(2):
+        rk = pm.transient(150, tload[k], speed[k],
+                          tshort=0.005, tend=0.05, nsamples=200)
+        imax = np.max(np.abs(rk['istat']))
+        assert np.max(np.abs(r['istat'][k] - rk['istat'])) < 5e-3*imax
+        assert r['peaks'][k]['ip'] == pytest.approx(rk['peaks']['ip'],
+                                                    rel=5e-3)
+    # 2 phase short circuit (id > 0: flux maps extended)
+    r = pm.transient_batch(150, tload, speed, fault_type=2,
+                           tshort=0.005, tend=0.05, nsamples=200)
+    assert np.max(r['id']) > 0
+    for k in range(2):
+        rk = pm.transient(150, tload[k], speed[k], fault_type=2,
+                          tshort=0.005, tend=0.05, nsamples=200)
+        imax = np.max(np.abs(rk['istat']))
+        assert np.max(np.abs(r['istat'][k] - rk['istat'])) < 2e-2*imax
@@ -28,6 +28,45 @@ def test_objects(model):
     assert len(model.superelements) == 3
     assert len(model.get_subregion('asdf').elements()) == 756
 
+def test_columnar(model):
+    import numpy as np
+    cm = nc.read('src/tests/data/minimal.nc', columnar=True)
+    assert cm.node_xy.shape == (1729, 2)
+    assert len(cm.element_node_ptr) == 822 + 1
+    assert cm.element_pos == pytest.approx(model.element_pos)
+    assert cm.element_area() == pytest.approx(
+        [e.area for e in model.elements])
+    assert np.all(cm.element_se == [e.se_key for e in model.elements])
+    assert not any(isinstance(v, nc.Reader) for v in vars(cm).values())
+    assert len(cm.elements) == 822
+    # only the superelement (with its subregion) of an element is created
+    e = cm.elements[5]
+    assert e.superelement.subregion.name == 'asdf'
+    assert sum(x is not None for x in cm.elements.items) == 756
+    assert sum(x is not None for x in cm.superelements.items) == 1
+    assert sum(x is not None for x in cm.nodechains.items) < 98
+    assert cm.nodechains[0].node1 is cm.nodes[
+        model.nodechains[0].node1.key - 1]
+    assert [e.se_key for e in cm.elements] == [
+        e.se_key for e in model.elements]
+    assert [se.nc_keys for se in cm.superelements] == [
+        se.nc_keys for se in model.superelements]
+    assert [v.key for v in cm.elements[5].vertices] == [
+        v.key for v in model.elements[5].vertices]
+
+
+def test_get_elements(model):
+    e = model.elements[100]
+    xy = [e.center, (1, 1)]
+    keys, weights = model.get_elements(xy)
+    assert keys.tolist() == [e.key, 0]
+    assert weights[0].sum() == pytest.approx(1)
+    assert weights[0][:len(e.vertices)].dot(
+        [v.xy for v in e.vertices]) == pytest.approx(e.center)
+    assert model.get_element(*e.center).key == e.key
+    assert model.get_super_element(*e.center).key == e.superelement.key
+
+
 def test_no_such_subregion(model):
     with pytest.raises(ValueError) as excinfo:
         n = 'foo'
@@ -124,6 +163,83 @@ def test_calc_iron_loss(pm):
     assert pfe['Stat'] == pytest.approx([5.61, 46.982, 15.92], abs=1e-2)
 
 
+def test_calc_iron_loss_batch():
+    import numpy as np
+    pm = nc.read('src/tests/data/zzz_pm_model_ts.nc')
+    pm.speed = 3000
+    # synthetic flux density with 5th and 7th harmonics
+    pm.pos_el_fe_induction = np.linspace(0, np.pi, 37)
+    x = 2*pm.pos_el_fe_induction
+    phi = np.linspace(0, 2*np.pi, len(pm.element_type))[:, None]
+    b = [np.cos(x + phi + a) + 0.3*np.cos(5*x + 2*phi) + 0.2*np.cos(7*x - a)
+         for a in (0, 1.3)]
+    pm.el_fe_induction_1 = b[0][:, :, None, None]
+    pm.el_fe_induction_2 = b[1][:, :, None, None]
+
+    pfe = pm.calc_iron_loss(0, 0, isa7.bertotti_pfe)
+    pfe_batch = pm.calc_iron_loss(0, 0, isa7.bertotti_pfe, batch=True)
+    assert pfe.keys() == pfe_batch.keys()
+    for k in pfe:
+        assert pfe_batch[k] == pytest.approx(pfe[k], rel=1e-6)
+
+    def pfe_total(Bxnu, Bynu, fnu, losscoeffs):
+        return [np.sum(fnu*(Bxnu**2 + Bynu**2))]*3
+    with pytest.raises(ValueError):
+        pm.calc_iron_loss(0, 0, pfe_total, batch=True)
+
+
+def test_lazy_induction(tmp_path):
+    import shutil
+    import pickle
+    import types
+    import netCDF4
+    import numpy as np
+    filename = str(tmp_path / 'minimal.nc')
+    shutil.copy('src/tests/data/minimal.nc', filename)
+    nel, npos, ncur = 822, 5, 3
+    b = np.arange(ncur*npos*nel, dtype='int16').reshape((1, ncur, npos, nel))
+    with netCDF4.Dataset(filename, 'a') as ds:
+        grp = ds.createGroup('el_induction')
+        for d, n in (('beta', 1), ('cur', ncur), ('pos', npos), ('el', nel)):
+            grp.createDimension(d, n)
+        grp.createVariable('position', 'f4', ('pos',))[:] = [0, 1, 2, 3, 3]
+        for k in ('fe_induction_1', 'fe_induction_2', 'eddy_cu_vpot'):
+            grp.createVariable(k, 'i2', ('beta', 'cur', 'pos', 'el'))[:] = b
+
+    full = nc.read(filename)
+    lazy = nc.read(filename, lazy=True)
+    assert isinstance(lazy.el_fe_induction_1, nc.Variable)
+    assert lazy.el_fe_induction_1.shape == full.el_fe_induction_1.shape
+    assert lazy.el_fe_induction_1.shape == (nel, 4, ncur, 1)
+    keys = np.array([7, 2, 2, 800])
+    for index in ((keys, slice(None), 1, 0), (3, slice(0, 2), -1, 0),
+                  (slice(None), 0, 2, 0), (5,)):
+        np.testing.assert_equal(lazy.el_fe_induction_2[index],
+                                full.el_fe_induction_2[index])
+    np.testing.assert_equal(np.asarray(lazy.el_fe_induction_1),
+                            full.el_fe_induction_1)
+    np.testing.assert_equal(lazy.eddy_cu_vpot[keys, 1, 0, 0],
+                            full.eddy_cu_vpot[keys, 1, 0, 0])
+    v = pickle.loads(pickle.dumps(lazy.el_fe_induction_1))
+    np.testing.assert_equal(v[keys, :, 0, 0],
+                            full.el_fe_induction_1[keys, :, 0, 0])
+    v.close()
+    lazy.close()
+    with pytest.raises(RuntimeError):
+        lazy.el_fe_induction_1[keys, 0, 0, 0]
+
+    closed = []
+    with nc.read(filename, columnar=True, lazy=True) as isa:
+        np.testing.assert_equal(isa.el_fe_induction_1[keys, 0, 0, 0],
+                                full.el_fe_induction_1[keys, 0, 0, 0])
+        # other attributes are not closed
+        isa.log = types.SimpleNamespace(close=lambda: closed.append(1))
+    with pytest.raises(RuntimeError):
+        isa.el_fe_induction_1[keys, 0, 0, 0]
+    assert not closed
+    full.close()
+
+
 def test_superelements(model):
     se = model.superelements[0]
 
@@ -1140,3 +1140,39 @@ def test_sm(sm):
     iqdf = sm.iqd_torque(120)
 
     assert pytest.approx(iqdf, rel=0.1) == np.array([276.9, -26.5,   5.3])
+
+
+def test_sm_mtpa(sm):
+    tab = sm.mtpa_table()
+    assert tab['i1'][-1] <= sm.i1range[1]
+    assert len(sm.mtpa_table(nsamples=10)['T']) < len(tab['T'])
+    i1 = 150
+    iq, id, iex, tq = sm.mtpa(i1)
+    assert np.linalg.norm((iq, id))/np.sqrt(2) == pytest.approx(i1, rel=1e-4)
+    assert tq == pytest.approx(85.4, rel=1e-2)
+    assert sm.mtpa(i1, exact=False)[-1] == pytest.approx(tq, rel=1e-2)
+
+
+def test_sm_iqd_tmech_umax_batch(sm):
+    u1 = 60  # voltage limit at the higher speeds
+    n = np.array([10, 30, 60, 90])
+    T = np.array([80, 60, 40, 20])
+    w1 = 2*np.pi*n*sm.p
+    iq, id, iex, tq = sm.iqd_tmech_umax_batch(T, w1, u1)
+    for i in range(len(n)):
+        iqde = sm.iqd_tmech_umax(T[i], w1[i], u1)
+        assert sm.culoss((iq[i], id[i], iex[i])) == pytest.approx(
+            sm.culoss(iqde[:3]), rel=1e-4)
+        assert tq[i] == pytest.approx(iqde[-1], rel=1e-4)
+
+
+def test_sm_without_rgi_derivatives(sm, monkeypatch):
+    # scipy < 1.13: RegularGridInterpolator has no derivatives
+    iqde = sm.iqd_torque(120)
+    monkeypatch.setattr(femagtools.machine.sm, '_RGI_NU', False)
+    assert 'jac' not in sm._iqd_constraints(120)[0]
+    assert sm.iqd_torque(120) == pytest.approx(iqde, rel=1e-3)
+    iq, id, iex, tq = sm.iqd_tmech_umax_batch([80, 20], [600, 4000], 60)
+    iqde = sm.iqd_tmech_umax(20, 4000, 60)
+    assert sm.culoss((iq[1], id[1], iex[1])) == pytest.approx(
+        sm.culoss(iqde[:3]), rel=1e-4)
@@ -43,3 +43,147 @@ def test_read(losses):
         {'key': 5, 'name': '', 'losses': 0.101086}, abs=1e-5) == p[4]
     assert pytest.approx(
         {'key': 6, 'name': '', 'losses': 0.101086}, abs=1e-5) == p[5]
+
+
+def test_ohm_lossenergy_se(losses):
+    losses.ohm_lossenergy(0.0, 0.0)
+    for sr in losses.nc_model.subregions:
+        for se in sr.superelements:
+            if se.conduc > 0.0:
+                expected = sum(losses.ohm_lossenergy_el(el, se)
+                               for el in se.elements)
+                assert losses.ohm_lossenergy_se(se) == pytest.approx(
+                    expected, rel=1e-5)
+
+
+def test_iron_losses_fft(losses):
+    import numpy as np
+    r = losses.iron_losses_fft()
+    assert [s['subregion'] for s in r] == ['stfe', 'rofe', 'wefe']
+    assert r[0]['total'] == pytest.approx(13.2312, abs=1e-3)
+    assert r[1]['total'] == pytest.approx(0.25744, abs=1e-4)
+    se = losses.nc_model.superelements[1]
+    ellosses = losses.iron_losses_fft_elements(se.elements, se)
+    for k in ('hysteresis', 'eddycurrent', 'excess', 'total'):
+        np.testing.assert_allclose(
+            ellosses[k], [losses.iron_losses_fft_el(el, se)[k]
+                          for el in se.elements], rtol=1e-6, atol=1e-12)
+
+
+def test_interp_periodic():
+    import numpy as np
+    xp = np.array([0.05, 0.1, 0.3, 0.45, 0.6])
+    fp = np.array([[1., 2., 0., -1., 3.], [0., 1., 2., 3., 4.]])
+    x = np.linspace(0, 1, 13)
+    np.testing.assert_allclose(
+        ts._interp_periodic(x, xp, fp, 0.7),
+        [np.interp(x, xp, f, period=0.7) for f in fp])
+
+
+def test_iron_lossenergy_time(losses):
+    import numpy as np
+    r = losses.iron_lossenergy_time()
+    assert [s['subregion'] for s in r] == ['stfe', 'rofe', 'wefe']
+    assert r[0]['total'] == pytest.approx(0.223838, abs=1e-5)
+    assert r[0]['hysteresis'] == pytest.approx(0.112793, abs=1e-5)
+    for k in (1, 18):
+        se = losses.nc_model.superelements[k]
+        elenergy = losses.iron_lossenergy_time_elements(se.elements, se)
+        for key in ('hysteresis', 'eddycurrent', 'excess', 'total'):
+            np.testing.assert_allclose(
+                elenergy[key],
+                [losses.iron_lossenergy_time_el(el, se)[key]
+                 for el in se.elements], rtol=1e-6, atol=1e-14)
+
+
+def test_loss_monitor(losses, tmp_path):
+    import shutil
+    import pathlib
+    dirname = pathlib.Path('src/tests/data/zzz_pm_model_ts_results_1')
+    vtufiles = sorted(dirname.glob('*.vtu'))
+    for f in vtufiles[:20]:
+        shutil.copy(f, tmp_path)
+    monitor = ts.LossMonitor('src/tests/data/zzz_pm_model_ts', tmp_path)
+    assert len(monitor.time) == 20
+    # incomplete file is skipped
+    (tmp_path / vtufiles[20].name).write_bytes(
+        vtufiles[20].read_bytes()[:5000])
+    assert monitor.update() == 0
+    for f in vtufiles[20:]:
+        shutil.copy(f, tmp_path)
+    assert monitor.update() == 20
+
+    e = monitor.ohm_lossenergy()
+    expected = losses.ohm_lossenergy()
+    assert [s['name'] for s in e] == [s['name'] for s in expected]
+    for s, x in zip(e, expected):
+        assert s['losses'] == pytest.approx(x['losses'], rel=1e-6)
+
+    e = monitor.iron_lossenergy_time()
+    expected = losses.iron_lossenergy_time()
+    assert [s['subregion'] for s in e] == [s['subregion'] for s in expected]
+    for s, x in zip(e, expected):
+        for k in ('hysteresis', 'eddycurrent', 'total'):
+            assert s[k] == pytest.approx(x[k], rel=1e-6)
+
+
+def test_loss_monitor_single_step(tmp_path):
+    import numpy as np
+    import shutil
+    import pathlib
+    dirname = pathlib.Path('src/tests/data/zzz_pm_model_ts_results_1')
+    vtufiles = sorted(dirname.glob('*.vtu'))
+    shutil.copy(vtufiles[0], tmp_path)
+    monitor = ts.LossMonitor('src/tests/data/zzz_pm_model_ts', tmp_path)
+    assert all(s['losses'] == 0 for s in monitor.ohm_powerlosses())
+    assert all(s['total'] == 0 for s in monitor.iron_losses_time())
+    # same time again is skipped
+    shutil.copy(vtufiles[0], tmp_path / vtufiles[1].name)
+    assert monitor.update() == 0
+    assert len(monitor.time) == 1
+    shutil.copy(vtufiles[2], tmp_path)
+    assert monitor.update() == 1
+    assert len(monitor.time) == 2
+    assert all(np.isfinite(s['total']) for s in monitor.iron_losses_time())
+
+
+@pytest.mark.parametrize('methode', ['fft', 'time'])
+def test_export_lossdensity(losses, tmp_path, methode):
+    import numpy as np
+    import meshio
+    losses.export_lossdensity(str(tmp_path / 'p1.vtu'), methode=methode)
+    losses.export_lossdensity(str(tmp_path / 'p2.vtu'), methode=methode,
+                              processes=2)
+    p1 = meshio.read(tmp_path / 'p1.vtu').cell_data['lossdensity [W/m3]']
+    p2 = meshio.read(tmp_path / 'p2.vtu').cell_data['lossdensity [W/m3]']
+    np.testing.assert_array_equal(np.concatenate(p1), np.concatenate(p2))
+    assert np.concatenate(p1).max() > 0
+    # reference: output of the element by element export
+    # (before the parallel export)
+    ref = np.load('src/tests/data/zzz_pm_model_ts_lossdensity.npz')
+    np.testing.assert_array_equal(np.concatenate(p1), ref[methode])
+
+
+def test_subregions(losses, tmp_path):
+    rotor = ts.Losses('src/tests/data/zzz_pm_model_ts',
+                      'src/tests/data/zzz_pm_model_ts_results_1',
+                      subregions=['rofe'])
+    assert rotor.vtu_data.get_array('b').shape == (40, 1076, 3)
+    for k in ('total', 'hysteresis', 'eddycurrent', 'excess'):
+        assert rotor.iron_losses_fft_subregion('rofe')[k] == pytest.approx(
+            losses.iron_losses_fft_subregion('rofe')[k], rel=1e-12)
+    with pytest.raises(ValueError):
+        rotor.iron_losses_fft_subregion('stfe')
+
+    r = rotor.iron_losses_fft()
+    assert [s['subregion'] for s in r] == ['rofe']
+    assert r[0]['total'] == pytest.approx(
+        losses.iron_losses_fft()[1]['total'], rel=1e-12)
+    assert [s['subregion'] for s in rotor.iron_lossenergy_time()] == ['rofe']
+    assert [s['name'] for s in rotor.ohm_lossenergy()] == ['rofe']
+    rotor.export_lossdensity(str(tmp_path / 'rofe.vtu'))
+    import meshio
+    import numpy as np
+    p = np.concatenate(meshio.read(tmp_path / 'rofe.vtu').cell_data[
+        'lossdensity [W/m3]'])
+    assert 0 < np.count_nonzero(p) <= 1076
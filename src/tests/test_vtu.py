@@ -1,5 +1,7 @@
 import pytest
 import pathlib
+import shutil
+import numpy as np
 from femagtools import vtu
 
 
@@ -29,6 +31,25 @@ def test_read(ts_data_dir):
     assert b[1] == pytest.approx([-0.00313], abs=1e-5)
     assert b[2] == [0.0]
 
+def test_cache(ts_data_dir, tmp_path):
+    dirname = tmp_path / 'results'
+    shutil.copytree(ts_data_dir, dirname)
+    vtu_data = vtu.read(dirname)
+    vtu_cache = vtu.read(dirname, cache=True)
+    vtu_cache.read_data(['b', 'curd'])
+    assert sorted(p.name for p in dirname.glob('*.npy')) == [
+        'zzz_pm_model_ts.b.npy', 'zzz_pm_model_ts.curd.npy']
+    for key in (1, 500, 10834):
+        assert vtu_cache.get_data_vector('b', key) == \
+            vtu_data.get_data_vector('b', key)
+        assert vtu_cache.get_data_vector('curd', key) == \
+            vtu_data.get_data_vector('curd', key)
+
+    b = vtu.read(dirname, cache=True).get_array('b')
+    assert b.shape == (40, 10834, 3)
+    assert b[:, 0, 0].tolist() == vtu_data.get_data_vector('b', 1)[0]
+
+
 def test_demag(demag_data_dir):
     vtu_data = vtu.read(demag_data_dir / 'PM_130_L10_0000.vtu')
     keys = [7412, 7413, 7414, 7415, 7416]
@@ -40,3 +61,62 @@ def test_demag(demag_data_dir):
     actual = vtu_data.demag(elements)
     assert len(actual) == 1
     assert actual[0] == pytest.approx(expected, abs=0.1)
+
+
+def test_time_window(ts_data_dir):
+    vtu_data = vtu.read(ts_data_dir)
+    time = vtu_data.get_time_axis()
+    assert len(time) == 40
+    vtu_data.set_time_window(time[3], time[30])
+    t = vtu_data.get_data_vector('time [s]')
+    assert t == time[4:31].tolist()
+    assert len(vtu_data.get_data_vector('curd', 1)) == 27
+
+    vtu_data.set_time_window(0.0, 0.0)
+    period = time[-1] - time[0]
+    windows = list(vtu_data.sliding_window('b', period/3))
+    assert [len(t) for t, b in windows] == [14, 14, 14]
+    assert windows[1][0][0] == windows[0][0][-1]
+    b = vtu_data.get_array('b')
+    for t, bw in windows:
+        assert bw.shape[1:] == (10834, 3)
+        assert np.shares_memory(bw, b)
+
+
+@pytest.mark.parametrize('compressor', ['None', 'ZLib'])
+def test_select_cells(ts_data_dir, tmp_path, compressor):
+    import vtk
+    # rewrite some files with raw appended data
+    for f in sorted(ts_data_dir.glob('*.vtu'))[:3]:
+        reader = vtk.vtkXMLUnstructuredGridReader()
+        reader.SetFileName(str(f))
+        reader.Update()
+        writer = vtk.vtkXMLUnstructuredGridWriter()
+        writer.SetFileName(str(tmp_path / f.name))
+        writer.SetInputData(reader.GetOutput())
+        writer.SetDataModeToAppended()
+        writer.EncodeAppendedDataOff()
+        getattr(writer, 'SetCompressorTypeTo' + compressor)()
+        writer.SetBlockSize(4096)
+        writer.Write()
+    assert 'b' in vtu._AppendedData.open(tmp_path / f.name).arrays
+
+    vtu_data = vtu.read(ts_data_dir)
+    b = vtu_data.get_array('b')[:3]
+    np.testing.assert_array_equal(vtu.read(tmp_path).get_array('b'), b)
+
+    keys = [10834, 1, 500, 501]
+    vtu_sel = vtu.read(tmp_path, cells=keys)
+    assert vtu_sel.get_array('b').shape == (3, 4, 3)
+    np.testing.assert_array_equal(vtu_sel.get_array('b', keys),
+                                  b[:, np.array(keys) - 1])
+    assert vtu_sel.get_data_vector('curd', 500) == \
+        vtu_data.get_data_vector('curd', 500)[:3]
+    curd = vtu_sel.get_cell_vector('curd')
+    assert curd.shape == (10834,)
+    np.testing.assert_array_equal(
+        curd[np.array(keys) - 1],
+        vtu.read(tmp_path).get_cell_vector('curd')[np.array(keys) - 1])
+    assert np.isnan(curd[1])
+    with pytest.raises(ValueError):
+        vtu_sel.get_array('b', 2)